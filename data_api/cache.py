@@ -0,0 +1,275 @@
+"""
+data_api 内存缓存
+按名称划分缓存区，每个区有独立的字节上限，超出时按 LRU 淘汰（最近写入的一项总是保留，单项超过上限时给出警告）；
+缓存项可绑定源文件，源文件修改（mtime/size 变化，可选再比较内容哈希）后自动失效；
+所有操作加锁，可在线程池中使用。
+
+用法:
+    region = cache.get_region('daily_index')
+    datas = region.get_or_load(key, loader, sources=[path])
+    cache.cache_stats()    # 各区命中/未命中/占用字节
+"""
+import hashlib
+import os
+import sys
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# 单个缓存区默认字节上限，可用环境变量 ASHARE_CACHE_MB 调整
+DEFAULT_MAX_BYTES = int(float(os.environ.get('ASHARE_CACHE_MB', 2048)) * 1024 ** 2)
+
+
+class CacheRegion:
+    """
+    单个命名缓存区 -- LRU + 字节上限 + 源文件失效
+    """
+    def __init__(self, name: str, max_bytes: int = DEFAULT_MAX_BYTES, validate: str = 'mtime'):
+        """
+        :param name: 缓存区名称
+        :param max_bytes: 字节上限，超出时淘汰最久未使用的项（至少保留最近的一项）
+        :param validate: 源文件校验方式 'mtime' 仅比较 (mtime, size) / 'hash' mtime 变化后再比较内容哈希
+        """
+        if validate not in ('mtime', 'hash'):
+            raise ValueError(f"validate 只能为 'mtime' 或 'hash': {validate}")
+        self.name = name
+        self.max_bytes = max_bytes
+        self.validate = validate
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        # key -> (value, nbytes, sources, signature)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        # 正在加载的 key -> Lock，避免多个线程同时加载同一项
+        self._loading = {}
+
+    def get(self, key, default=None):
+        """
+        读取缓存项（源文件已变化时视为不存在）
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_valid(entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def put(self, key, value, sources=()):
+        """
+        写入缓存项
+        :param key: 可哈希的键
+        :param value: 缓存对象（调用方不应原地修改）
+        :param sources: 绑定的源文件路径，任一文件变化后该项失效
+        :return: value
+        """
+        sources = tuple(sources)
+        signature = tuple(_file_signature(path, self.validate == 'hash') for path in sources)
+        nbytes = sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                # 单项超过上限：淘汰其余各项只保留这一项，否则每次读取都要重新加载
+                warnings.warn(f"缓存区 {self.name} 的缓存项 ({nbytes / 1024 ** 2:.1f} MB) 超过上限 "
+                              f"{self.max_bytes / 1024 ** 2:.1f} MB，只保留该项，可用 resize 或创建时的 max_bytes 调大上限",
+                              stacklevel=2)
+            self._entries[key] = (value, nbytes, sources, signature)
+            self.bytes += nbytes
+            self._evict()
+        return value
+
+    def get_or_load(self, key, loader, sources=()):
+        """
+        读取缓存项，不存在或已失效时调用 loader() 加载并缓存
+        :param key: 可哈希的键
+        :param loader: 无参加载函数
+        :param sources: 绑定的源文件路径
+        :return: 缓存对象（调用方不应原地修改）
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            # 等待期间可能已被其他线程加载
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and self._is_valid(entry):
+                    self._entries.move_to_end(key)
+                    self.misses -= 1
+                    self.hits += 1
+                    return entry[0]
+            try:
+                value = loader()
+                self.put(key, value, sources)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return value
+
+    def invalidate(self, key=None):
+        """
+        删除指定缓存项，key 为 None 时清空整个缓存区
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self.bytes = 0
+            elif key in self._entries:
+                self._remove(key)
+
+    def resize(self, max_bytes: int):
+        """
+        修改字节上限，立即按新上限淘汰
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes}
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and self._is_valid(entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry[1]
+
+    def _evict(self):
+        # 最近写入的一项不淘汰
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def _is_valid(self, entry) -> bool:
+        value, nbytes, sources, signature = entry
+        if not sources:
+            return True
+        current = tuple(_file_signature(path, False) for path in sources)
+        if all(cur[0] == old[0] for cur, old in zip(current, signature)):
+            return True
+        if self.validate != 'hash':
+            return False
+        # mtime 变化但内容未变（如被重新复制）时继续使用
+        for path, cur, old in zip(sources, current, signature):
+            if cur[0] != old[0] and (cur[0] is None or _file_hash(path) != old[1]):
+                return False
+        return True
+
+
+class CacheManager:
+    """
+    命名缓存区集合
+    """
+    def __init__(self, default_max_bytes: int = DEFAULT_MAX_BYTES):
+        self.default_max_bytes = default_max_bytes
+        self._regions = {}
+        self._lock = threading.Lock()
+
+    def region(self, name: str, max_bytes: int = None, validate: str = 'mtime') -> CacheRegion:
+        """
+        获取缓存区，不存在时创建
+        :param name: 缓存区名称
+        :param max_bytes: 创建时的字节上限，None 使用默认值；已存在的缓存区不受影响
+        :param validate: 创建时的源文件校验方式
+        """
+        with self._lock:
+            if name not in self._regions:
+                self._regions[name] = CacheRegion(
+                    name, self.default_max_bytes if max_bytes is None else max_bytes, validate)
+            return self._regions[name]
+
+    def stats(self) -> pd.DataFrame:
+        """
+        :return: DataFrame(index=region, col=['hits','misses','evictions','entries','bytes','max_bytes'])
+        """
+        with self._lock:
+            regions = list(self._regions.values())
+        stats = pd.DataFrame({r.name: r.stats() for r in regions}).T
+        return stats.rename_axis('region')
+
+    def clear(self, name: str = None):
+        """
+        清空指定缓存区，name 为 None 时清空全部
+        """
+        with self._lock:
+            regions = list(self._regions.values()) if name is None else \
+                [self._regions[name]] if name in self._regions else []
+        for r in regions:
+            r.invalidate()
+
+
+def sizeof(obj) -> int:
+    """
+    估算对象占用的字节数
+    """
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (tuple, list)):
+        return sys.getsizeof(obj) + sum(sizeof(o) for o in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(sizeof(k) + sizeof(v) for k, v in obj.items())
+    return sys.getsizeof(obj)
+
+
+def _file_signature(path: str, with_hash: bool):
+    """
+    :return: ((mtime_ns, size), 内容哈希)，文件不存在时为 (None, None)
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None, None
+    return (st.st_mtime_ns, st.st_size), (_file_hash(path) if with_hash else None)
+
+
+def _file_hash(path: str):
+    h = hashlib.md5()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+# 进程内共享的缓存管理器
+manager = CacheManager()
+
+
+def get_region(name: str, max_bytes: int = None, validate: str = 'mtime') -> CacheRegion:
+    return manager.region(name, max_bytes, validate)
+
+
+def cache_stats() -> pd.DataFrame:
+    return manager.stats()
+
+
+def clear_cache(name: str = None):
+    manager.clear(name)
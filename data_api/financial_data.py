@@ -1,6 +1,7 @@
 import pandas as pd
 from tools import quarter_tool
 from tools import datapath
+from data_api import cache
 
 
 def get_financial_data(date: str, quarter: str = '') -> pd.DataFrame:
@@ -14,17 +15,10 @@ def get_financial_data(date: str, quarter: str = '') -> pd.DataFrame:
         # 获取当前 date 属于的期
         quarter = quarter_tool.current_quarter(date)
 
-    # 从数据库读取当期财务数据
-    ret = pd.read_csv(datapath.financial_path(quarter))
-
-    # 修正股票代码
-    ret['股票代码'] = ret['股票代码'].astype(str).str.zfill(6)
-
-    # 修正公告日期 (完善年份)
-    ret['财报公告日期'] = quarter[0:2] + (ret['财报公告日期'].astype(str))
-
-    # 去重
-    ret = ret.drop_duplicates(subset='股票代码', keep='first')
+    # 从数据库读取当期财务数据（按期缓存）
+    path = datapath.financial_path(quarter)
+    ret = cache.get_region('financial').get_or_load(
+        path, lambda: _load_financial(path, quarter), sources=[path])
 
     # 根据日期筛选
     ret = ret.loc[ret['财报公告日期'] < date].reset_index(drop=True)
@@ -43,8 +37,35 @@ def get_financial_data_v2(date: str, quarter: str = '') -> pd.DataFrame:
         # 获取当前 date 属于的期
         quarter = quarter_tool.current_quarter(date)
 
-    # 从数据库读取当期财务数据
-    ret = pd.read_csv(datapath.financial_path_v2(quarter))
+    # 从数据库读取当期财务数据（按期缓存）
+    path = datapath.financial_path_v2(quarter)
+    ret = cache.get_region('financial').get_or_load(
+        path, lambda: _load_financial_v2(path), sources=[path])
+
+    # 根据日期筛选
+    ret = ret.loc[ret['公告日期'] < date].reset_index(drop=True)
+
+    return ret
+
+
+"""
+内部函数
+"""
+def _load_financial(path: str, quarter: str) -> pd.DataFrame:
+    ret = pd.read_csv(path)
+
+    # 修正股票代码
+    ret['股票代码'] = ret['股票代码'].astype(str).str.zfill(6)
+
+    # 修正公告日期 (完善年份)
+    ret['财报公告日期'] = quarter[0:2] + (ret['财报公告日期'].astype(str))
+
+    # 去重
+    return ret.drop_duplicates(subset='股票代码', keep='first')
+
+
+def _load_financial_v2(path: str) -> pd.DataFrame:
+    ret = pd.read_csv(path)
     print(ret)
 
     # 修正股票代码
@@ -54,10 +75,6 @@ def get_financial_data_v2(date: str, quarter: str = '') -> pd.DataFrame:
     ret = ret.drop_duplicates(subset='股票代码', keep='first')
 
     ret['公告日期'] = ret['公告日期'].astype(str)
-
-    # 根据日期筛选
-    ret = ret.loc[ret['公告日期'] < date].reset_index(drop=True)
-
     return ret
 
 if __name__ == "__main__":
@@ -1,64 +1,183 @@
+"""
+境外/外部标的数据 -- 按 (标的, 频率) 统一读取
+首次读取时解析CSV并保存为二进制缓存，之后直接读取缓存；同一进程内重复调用使用 foreign 缓存区
+"""
+import os
 import pandas as pd
+from tools import datapath
 from tools.datapath import data_path
-import os
+from data_api import cache
+
+# 外部标的数据源：(symbol, freq) -> (文件名, 日期格式)，日期格式为 None 时按 'YYYY-MM-DD' 处理
+FOREIGN_SOURCES = {
+    ('nsq', 'm'): ('ndq_m.csv', None),
+    ('nsq', 'd'): ('ndq_d.csv', None),
+    ('TSLA', 'd'): ('TSLA.csv', '%m/%d/%Y'),
+}
+
+def register_foreign(symbol: str, freq: str, file_name: str, date_format: str = None):
+    """
+    注册外部标的数据源
+    :param symbol: 标的名称
+    :param freq: 频率 'd' 日线 / 'm' 月线
+    :param file_name: 数据库目录下的CSV文件名，需包含列 ['date','open','close']
+    :param date_format: 日期格式，None 表示 'YYYY-MM-DD' 或 'YYYYMMDD'
+    """
+    FOREIGN_SOURCES[(symbol, freq)] = (file_name, date_format)
+
+
+def get_foreign(symbol: str, freq: str = 'd',
+                start_time: str = '19900101', end_time: str = '20991231',
+                code: str = None, align: bool = False,
+                ffill: bool = True, ffill_limit: int = None):
+    """
+    获取外部标的行情
+    :param symbol: 标的名称，需在 FOREIGN_SOURCES 中注册
+    :param freq: 'd' 日线（date=YYYYMMDD） / 'm' 月线（date=YYYYMM）
+    :param start_time: 开始时间 YYYYMMDD
+    :param end_time: 结束时间 YYYYMMDD
+    :param code: 返回数据中的 code 索引值，默认与 symbol 相同
+    :param align: 是否对齐到A股交易日历（删除A股休市日，补齐外部市场休市日）
+    :param ffill: 对齐后外部市场休市的日期是否用前值填充（否则删除该日期）
+    :param ffill_limit: 最多连续填充的期数，None 不限制
+    :return: DataFrame(index=(date, code), col=['open','close'])，数据文件不存在时返回 None
+    """
+    datas = _load_foreign(symbol, freq)
+    if datas is None:
+        return None
+
+    datas = datas.loc[(datas['date'] >= start_time) & (datas['date'] <= end_time)]
+    if freq == 'm':
+        datas = datas.assign(date=datas['date'].str.slice(0, 6))
+
+    if align:
+        calendar = get_trade_calendar(freq)
+        lo = start_time if freq == 'd' else start_time[0:6]
+        hi = end_time if freq == 'd' else end_time[0:6]
+        calendar = calendar[(calendar >= lo) & (calendar <= hi)]
+        datas = datas.drop_duplicates('date', keep='last').set_index('date')
+        datas = datas.reindex(datas.index.union(calendar))
+        if ffill:
+            datas = datas.ffill(limit=ffill_limit)
+        datas = datas.loc[datas.index.isin(calendar)].dropna(how='any')
+        datas = datas.rename_axis('date').reset_index()
+
+    datas = datas.assign(code=symbol if code is None else code)
+    return datas.set_index(['date', 'code'])
+
+
+def get_trade_calendar(freq: str = 'd') -> pd.Index:
+    """
+    获取A股交易日历
+    :param freq: 'd' 交易日 YYYYMMDD（取自 每日指标.csv） / 'm' 交易月 YYYYMM（取自上证指数月线）
+    :return: pd.Index(str)，升序
+    """
+    if freq == 'd':
+        source = datapath.con_daily_index_path
+    else:
+        source = datapath.pv_index_path('000001')
+    return cache.get_region('foreign').get_or_load(
+        source, lambda: _load_calendar(source, freq), sources=[source])
+
 
 def get_nsq_m(start_time:str='19900101', end_time:str='20991231'):
     """
     获取纳斯达克指数月线数据
     :param start_time:
     :param end_time:
-    :param attr:
-    :return: 
+    :return: DataFrame(index=(date, code), col=['open','close'])，code 全为 'nsq'
     """
-
-    datas = pd.DataFrame({
-        'date': pd.Series(dtype='str'),
-        'open': pd.Series(dtype='float'),
-        'close': pd.Series(dtype='float')
-    })
-
-    file_path = data_path + 'ndq_m.csv'
-    if not os.path.exists(file_path):
-        return None
-    data = pd.read_csv(file_path).loc[:,  ['date','open','close']]
-    data['date'] = data['date'].str.replace('-', '')
-    data = data.loc[(data['date'] >= start_time) & (data['date'] <= end_time)]
-    data['date'] = data.loc[:, 'date'].str.slice(0, 6)
-
-    datas = pd.concat([datas, data], ignore_index=True)
-    datas['code'] = 'nsq'  # 添加date列，所有行赋值为'all'
-    datas = datas.set_index(['date', 'code'])  # 将date设为索引，保持原有索引
-    return datas
+    return get_foreign('nsq', 'm', start_time, end_time)
 
 
 def get_nsq_d(start_time:str='19900101', end_time:str='20991231'):
     """
-    获取纳斯达克指数月线数据
+    获取纳斯达克指数日线数据
     :param start_time:
     :param end_time:
-    :param attr:
-    :return:
+    :return: DataFrame(index=(date, code), col=['open','close'])，code 全为 'nsq'
     """
+    return get_foreign('nsq', 'd', start_time, end_time)
 
-    datas = pd.DataFrame({
-        'date': pd.Series(dtype='str'),
-        'open': pd.Series(dtype='float'),
-        'close': pd.Series(dtype='float')
-    })
 
-    file_path = data_path + 'ndq_d.csv'
+"""
+内部函数
+"""
+def _load_foreign(symbol: str, freq: str):
+    """
+    读取解析后的外部标的数据（foreign 缓存区 -> 二进制缓存 -> 原始CSV）
+    :return: DataFrame(col=['date','open','close'])，date 为 YYYYMMDD，升序
+    """
+    if (symbol, freq) not in FOREIGN_SOURCES:
+        raise KeyError(f"未注册的外部标的: {symbol} ({freq})")
+    file_name, date_format = FOREIGN_SOURCES[(symbol, freq)]
+    file_path = data_path + file_name
     if not os.path.exists(file_path):
         return None
-    data = pd.read_csv(file_path).loc[:,  ['date','open','close']]
-    data['date'] = data['date'].str.replace('-', '')
-    data = data.loc[(data['date'] >= start_time) & (data['date'] <= end_time)]
 
-    datas = pd.concat([datas, data], ignore_index=True)
-    datas['code'] = 'nsq'  # 添加date列，所有行赋值为'all'
-    datas = datas.set_index(['date', 'code'])  # 将date设为索引，保持原有索引
+    return cache.get_region('foreign').get_or_load(
+        file_path, lambda: _parse_foreign(symbol, freq, file_path, date_format), sources=[file_path])
+
+
+def _parse_foreign(symbol: str, freq: str, file_path: str, date_format: str):
+    sig = _file_signature(file_path)
+    cache_file = _cache_file(f"foreign_{symbol}_{freq}")
+    datas = _read_cache(cache_file, sig)
+    if datas is None:
+        datas = pd.read_csv(file_path).loc[:, ['date', 'open', 'close']]
+        if date_format is None:
+            datas['date'] = datas['date'].astype(str).str.replace('-', '')
+        else:
+            datas['date'] = pd.to_datetime(datas['date'], format=date_format).dt.strftime('%Y%m%d')
+        datas = datas.sort_values('date', kind='stable').reset_index(drop=True)
+        _write_cache(cache_file, sig, datas)
     return datas
 
 
+def _load_calendar(source: str, freq: str):
+    sig = _file_signature(source)
+    cache_file = _cache_file(f"calendar_{freq}")
+    calendar = _read_cache(cache_file, sig)
+    if calendar is None:
+        if freq == 'd':
+            dates = pd.read_csv(source, usecols=['date'], dtype={'date': str})['date']
+        else:
+            dates = pd.read_csv(source, usecols=['日期'], dtype={'日期': str})['日期']
+            dates = dates.str.replace('-', '').str.slice(0, 6)
+        calendar = pd.Index(sorted(dates.unique()), dtype=str, name='date')
+        _write_cache(cache_file, sig, calendar)
+    return calendar
+
+
+def _file_signature(path: str):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _cache_file(name: str) -> str:
+    return datapath.cache_path + f"{name}.pkl"
+
+
+def _read_cache(cache_file: str, sig):
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        cached_sig, datas = pd.read_pickle(cache_file)
+    except Exception:
+        return None
+    return datas if cached_sig == sig else None
+
+
+def _write_cache(cache_file: str, sig, datas):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        pd.to_pickle((sig, datas), cache_file)
+    except OSError:
+        # 数据库目录只读时仅使用进程内缓存
+        pass
+
+
 if __name__ == '__main__':
     datas = get_nsq_d('20161201','20260201')
-    print(datas)
\ No newline at end of file
+    print(datas)
+    print(get_foreign('nsq', 'd', '20161201', '20260201', align=True))
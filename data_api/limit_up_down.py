@@ -32,19 +32,21 @@ def build_month_open_limit_df(
     datas: pd.DataFrame,
     up_th: float = 0.099,      # 9.9%
     down_th: float = -0.099,   # -9.9%
+    save_path: str | None = None,
 ) -> pd.DataFrame:
     """
     计算每个股票每月 open / 上月 close - 1，并判断月初开盘是否触发涨跌停。
 
     参数:
         datas: MultiIndex=(date, code) 的月度不复权数据，至少包含 open, close
-        save_path: 输出文件路径（建议 parquet/csv/pkl 自选）
         up_th / down_th: 阈值，默认 9.9%/-9.9%
+        save_path: 输出文件路径（建议 parquet/csv/pkl 自选），默认 datapath.limit_path
 
     返回:
         out: MultiIndex=(date, code) 的结果 DataFrame
     """
-    save_path = datapath.limit_path
+    if save_path is None:
+        save_path = datapath.limit_path
     if not isinstance(datas.index, pd.MultiIndex) or datas.index.nlevels != 2:
         raise ValueError("datas.index 必须是 MultiIndex=(date, code)")
     if not {"open", "close"}.issubset(datas.columns):
@@ -1,6 +1,11 @@
 import os
 import pandas as pd
 from tools import datapath
+from data_api import cache
+
+# 每日指标整表的缓存上限：全市场整表约 222 B/行（3000 股 × 16 年约 2.4 GiB），超过默认的单区上限，
+# 单独设置，可用环境变量 ASHARE_DAILY_INDEX_CACHE_MB 调整
+DAILY_INDEX_MAX_BYTES = int(float(os.environ.get('ASHARE_DAILY_INDEX_CACHE_MB', 6144)) * 1024 ** 2)
 
 def get_monthly_hfq_change(start_time:str='20000101', end_time:str='20991231'):
     """
@@ -165,17 +170,23 @@ def get_monthly_index(codes:pd.Series=pd.Series(['000001'], name='代码'),
     return datas
 
 
-def update_daily_index(start_time:str= '19900101', end_time:str= '20991231'):
+def update_daily_index(start_time:str= '19900101', end_time:str= '20991231', skip_boards:bool=True):
+    """
+    合并各股票日指标为 每日指标.csv -- 逐只股票追加写入，不在内存中拼接全市场数据
+    :param start_time:
+    :param end_time:
+    :param skip_boards: 是否跳过 68/3/9 开头的股票（全市场分块计算时设为 False）
+    """
     stocks = pd.read_csv(datapath.stock_path, dtype={'股票代码': str})
-    datas = pd.DataFrame({
-        '交易日期': pd.Series(dtype='str'),
-        '股票代码': pd.Series(dtype='str'),
-    })
+    tmp_path = datapath.con_daily_index_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    columns = None
     for index, row in stocks.iterrows():
         code: str = row['TS代码']
 
         # 去除科创版
-        if code.startswith('68') or code.startswith('3') or code.startswith('9'):
+        if skip_boards and (code.startswith('68') or code.startswith('3') or code.startswith('9')):
             continue
 
         file_path = datapath.pv_daily_index_path(code)
@@ -188,12 +199,15 @@ def update_daily_index(start_time:str= '19900101', end_time:str= '20991231'):
         data['股票代码'] = data['股票代码'].str.split('.').str[0]
         data = data.loc[(data['交易日期'] >= start_time) & (data['交易日期'] <= end_time)]
 
-        datas = pd.concat([datas, data], ignore_index=True)
+        data = data.rename(columns={'交易日期': 'date', '股票代码': 'code'})
+        header = columns is None
+        if header:
+            columns = ['date', 'code'] + [c for c in data.columns if c not in ('date', 'code')]
+        data.reindex(columns=columns).to_csv(tmp_path, mode='a', header=header, index=False)
 
-    datas.rename(columns={'交易日期': 'date', '股票代码': 'code'}, inplace=True)
-    datas.set_index(['date', 'code'], inplace=True)
-    datas.to_csv(datapath.con_daily_index_path)
-    print(datas)
+    if columns is not None:
+        os.replace(tmp_path, datapath.con_daily_index_path)
+    print(datapath.con_daily_index_path)
 
 
 def get_daily_index(attr: list = ['开盘价', '收盘价']):
@@ -209,12 +223,12 @@ def get_daily_index(attr: list = ['开盘价', '收盘价']):
     fix_attr = ['date', 'code']
     attr = fix_attr + attr
 
-    # 使用函数属性作为缓存
-    if not hasattr(get_daily_index, '_cache'):
-        get_daily_index._cache = pd.read_csv(datapath.con_daily_index_path,
-                                             dtype={'date': str, 'code': str})
+    # 整表缓存在 daily_index 区，源文件修改后自动重新读取
+    path = datapath.con_daily_index_path
+    table = cache.get_region('daily_index', DAILY_INDEX_MAX_BYTES).get_or_load(
+        path, lambda: pd.read_csv(path, dtype={'date': str, 'code': str}), sources=[path])
 
-    datas = get_daily_index._cache.loc[:, attr]
+    datas = table.loc[:, attr]
     datas[['date', 'code']] = datas[['date', 'code']].astype(str)
     datas.set_index(['date', 'code'], inplace=True)
     return datas
@@ -18,7 +18,7 @@ def ic_report(
       ic_ts_df:   index=date, columns=因子名 的IC序列
     """
     vals = factor_lab.concat(vals)
-    change = factors.Change().get_data()
+    change = factors.Change().get_data(copy=False)
     out_dir: str = "./ic_result"
 
     if not isinstance(vals, pd.DataFrame):
@@ -52,38 +52,8 @@ def ic_report(
 
     factor_cols = list(vals.columns)
 
-    def _ic_one_group(g: pd.DataFrame) -> pd.Series:
-        # g 的index是 (code,date) 的子集，且同一date
-        y = g[change_name]
-        X = g[factor_cols]
-
-        # 对齐有效样本：每个因子自己dropna，同时y也要非空
-        out = {}
-        for c in factor_cols:
-            tmp = pd.concat([X[c], y], axis=1).dropna()
-            if tmp.shape[0] < min_obs_per_date:
-                out[c] = np.nan
-                continue
-
-            x1 = tmp.iloc[:, 0]
-            y1 = tmp.iloc[:, 1]
-
-            if method == "spearman":
-                # Spearman = rank 后做 Pearson
-                x1 = x1.rank(method="average")
-                y1 = y1.rank(method="average")
-
-            # 防止常数序列导致nan
-            if x1.nunique(dropna=True) <= 1 or y1.nunique(dropna=True) <= 1:
-                out[c] = np.nan
-            else:
-                out[c] = x1.corr(y1, method="pearson")
-        return pd.Series(out)
-
-    # 按date分组计算IC序列
-    ic_ts_df = common.groupby(level=date_level, sort=True).apply(_ic_one_group)
-    ic_ts_df.index.name = "date"
-    ic_ts_df = ic_ts_df.sort_index()
+    # 全部因子、全部日期的IC一次计算
+    ic_ts_df = _ic_matrix(common, date_level, factor_cols, change_name, method, min_obs_per_date)
 
     # 汇总统计
     summary_rows = []
@@ -139,6 +109,55 @@ def ic_report(
     return summary_df, ic_ts_df
 
 
+def _ic_matrix(common: pd.DataFrame, date_level, factor_cols: list, change_name: str,
+               method: str, min_obs_per_date: int) -> pd.DataFrame:
+    """
+    按日期计算每个因子与收益的截面相关系数，所有因子、所有日期一次完成
+    每个因子只用自身与收益都非空的样本（对收益按因子分别掩码）；spearman 在该样本内按日期分组排序后做 pearson。
+    样本数不足 min_obs_per_date 或任一方在该日为常数时记为 NaN。
+    :return: DataFrame(index=date 升序, col=factor_cols)
+    """
+    if common.empty:
+        return pd.DataFrame(columns=factor_cols, index=pd.Index([], name="date"), dtype=np.float64)
+
+    # 1.按日期排列为连续行段
+    date_idx, dates = pd.factorize(common.index.get_level_values(date_level), sort=True)
+    order = np.argsort(date_idx, kind='stable')
+    date_idx = date_idx[order]
+    starts = np.searchsorted(date_idx, np.arange(len(dates)))
+
+    x = common[factor_cols].to_numpy(dtype=np.float64)[order]
+    y = common[change_name].to_numpy(dtype=np.float64)[order]
+    valid = ~np.isnan(x) & ~np.isnan(y)[:, None]
+    x = np.where(valid, x, np.nan)
+    y = np.where(valid, y[:, None], np.nan)
+
+    # 2.spearman：组内平均排序（NaN 不参与）
+    if method == "spearman":
+        groups = pd.Index(date_idx, name='date')
+        x = pd.DataFrame(x, index=groups).groupby(level=0).rank(method="average").to_numpy()
+        y = pd.DataFrame(y, index=groups).groupby(level=0).rank(method="average").to_numpy()
+
+    # 3.按日期分段求和得到 pearson 相关
+    n = np.add.reduceat(valid.astype(np.float64), starts, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mx = np.add.reduceat(np.where(valid, x, 0.0), starts, axis=0) / n
+        my = np.add.reduceat(np.where(valid, y, 0.0), starts, axis=0) / n
+        dx = np.where(valid, x - mx[date_idx], 0.0)
+        dy = np.where(valid, y - my[date_idx], 0.0)
+        sxy = np.add.reduceat(dx * dy, starts, axis=0)
+        sxx = np.add.reduceat(dx * dx, starts, axis=0)
+        syy = np.add.reduceat(dy * dy, starts, axis=0)
+        ic = sxy / np.sqrt(sxx * syy)
+
+    # 4.样本不足或常数序列记为 NaN
+    constant = (np.fmin.reduceat(x, starts, axis=0) == np.fmax.reduceat(x, starts, axis=0)) | \
+               (np.fmin.reduceat(y, starts, axis=0) == np.fmax.reduceat(y, starts, axis=0))
+    ic[(n < min_obs_per_date) | constant] = np.nan
+
+    return pd.DataFrame(ic, index=pd.Index(dates, name="date"), columns=factor_cols)
+
+
 import matplotlib.pyplot as plt
 def plot_ic(df, save_path, figsize=(12, 6)):
     """
@@ -3,9 +3,9 @@
 在软件包内，使用 build 模块调用各指标计算方法，并记录计算结果CSV，同时在有新数据时更新
 在软件包外，使用获取接口直接从记录的数据中获取
 """
-from .factor import (Factor, Change, Market, Industry,
+from .factor import (Factor, clear_factors, Change, Market, Industry, IndustryCode,
                     Size, Turnover, Value, Momentum, FScore, FScore_fix,MScore,
-                     EP, BM, ROE, VOL, MAX, TO, ABTO, ILL, STR)
+                     EP, BM, ROE, VOL, MAX, TO, ABTO, ILL, STR, Neutral)
 
 import os
 current_file_path = os.path.dirname(os.path.abspath(__file__))
@@ -16,12 +16,22 @@ def wpath(name: str) -> str:
 def fpath(name: str) -> str:
     return current_file_path + f"/factor_data/{name}.csv"
 
+from .factor_store import spath, read_store
+from .factor_cache import clear_cache
+from .precision import set_precision, get_precision
+
 __all__ = ['wpath', # 获取权重文件路径
            'fpath', # 因子数据文件路径
+           'spath', # 因子按月分区存储目录
+           'read_store', # 读取按月分区存储的因子
+           'clear_cache', # 删除因子处理结果的磁盘缓存
+           'set_precision', 'get_precision', # 面板存放精度 float64/float32
            'Factor', # 因子抽象类
+           'clear_factors', # 清空共享的因子实例
            'Change', # 涨跌幅
            'Market', # 市场因子 不可用于预测
            'Industry', # 行业哑变量
+           'IndustryCode', # 整数行业代码
            'Size', # 规模因子
            'Turnover', # 换手率因子
            'Value', # 价值因子
@@ -39,4 +49,5 @@ __all__ = ['wpath', # 获取权重文件路径
            'ABTO',  # 换手，最近一个月日均换手率/最近12个月日均换手率
            'ILL',   # 流动性， (日绝对收益绝对值/日成交额)的月平均值
            'STR',   # 反转，最近1个月收益率
+           'Neutral', # 行业、市值中性化后的因子
            ]
@@ -1,9 +1,43 @@
+import inspect
 import os
 
 import numpy as np
 import pandas as pd
+from factors import factor_store, factor_cache, factor_standardize, precision
 
-class Factor:
+# 进程内共享的因子实例 {(类, 参数): 实例}
+_INSTANCES = {}
+
+
+class _Shared(type):
+    """
+    同一类、同一组参数的构造返回同一实例，例如多次 Change()、Momentum(12, 1) 只读取一次数据
+    verbose 不区分实例，传入时设置到共享实例上（以最近一次传入的为准）
+    """
+    def __call__(cls, *args, **kwargs):
+        try:
+            bound = inspect.signature(cls.__init__).bind(None, *args, **kwargs)
+            bound.apply_defaults()
+            params = tuple((k, v) for k, v in list(bound.arguments.items())[1:] if k != 'verbose')
+            key = (cls, params)
+            hash(key)
+        except TypeError:
+            return super().__call__(*args, **kwargs)
+        if key not in _INSTANCES:
+            _INSTANCES[key] = super().__call__(*args, **kwargs)
+        elif bound.arguments.get('verbose') is not None:
+            _INSTANCES[key].verbose = bound.arguments['verbose']
+        return _INSTANCES[key]
+
+
+def clear_factors():
+    """
+    清空共享的因子实例，之后的构造重新创建
+    """
+    _INSTANCES.clear()
+
+
+class Factor(metaclass=_Shared):
     """
     因子类（包括任何变量）
     Attributes:
@@ -16,113 +50,202 @@ class Factor:
                             注意'N_K'格式数据不随时间变化，date索引全为'all';'T_K'格式数据不随标的变化，code索引全为'all'.
         standardize(bool):是否需要去极值和标准化
         extremum(float):去除极值比例
+        method(str):去极值方法 'quantile' 分位数截断 / 'mad' 中位数±mad_k倍MAD截断 / 'rank_gauss' 排序正态化
+        transform(str):标准化前的变换 None / 'log' / 'log1p' / 'boxcox'（λ=boxcox_lambda），need_log=True 等同 'log'
+        verbose(bool):读取数据时是否打印，类属性为全局默认值；构造时传入则设置到共享实例上
+        use_cache(bool):是否使用处理结果的磁盘缓存（见 factor_cache），类属性为全局默认值
+    数据在第一次访问时读取（data / get_data 等），同一类、同一组参数的构造返回共享实例。
     Methods:
+        reload:丢弃已读取的数据，下次访问时重新读取
         get_name:获取变量名称
         get_dshape:获取数据形状
-        get_data:获取数据，可传入date索引
+        get_data:获取数据，可传入date索引，copy=False 时返回视图
+        get_cube:获取 date × code × k 的稠密数组
         get_date_index:获取数据所有date索引
         get_code_index:获取数据所有code索引
     """
+    verbose = True
+    use_cache = True
+
     def __init__(self, name:str, dshape:str,
                  standardize:bool=True, extremum:float=0.05,
-                 need_log:bool=False, log_bias:float=0.0):
+                 need_log:bool=False, log_bias:float=0.0,
+                 verbose:bool=None, use_cache:bool=None,
+                 method:str='quantile', transform:str=None,
+                 boxcox_lambda:float=0.5, mad_k:float=3.0):
         self.name = name
-        self.dshape = dshape # N_T, NT_K, N_K, T_K
-        self.data = None
+        self._source_dshape = dshape
+        self.dshape = 'NT_K' if dshape == 'N_T' else dshape # N_T 读取后为 NT_K
+        self._data = None
+        self._loaded = False
+        self._rows = None # 按期连续排列的行，见 _date_rows
+        self._cube = None # date × code × k 稠密数组，见 get_cube
         self.standardize = standardize
         self.extremum = extremum
         self.need_log = need_log
         self.log_bias = log_bias
+        self.method = method
+        self.transform = 'log' if need_log and transform is None else transform
+        self.boxcox_lambda = boxcox_lambda
+        self.mad_k = mad_k
+        if method not in factor_standardize.METHODS:
+            raise ValueError(f"不支持的标准化方法: {method}，可选 {factor_standardize.METHODS}")
+        if self.transform not in factor_standardize.TRANSFORMS:
+            raise ValueError(f"不支持的变换: {transform}，可选 {factor_standardize.TRANSFORMS}")
+        if verbose is not None:
+            self.verbose = verbose
+        if use_cache is not None:
+            self.use_cache = use_cache
+
+    @property
+    def data(self) -> pd.DataFrame:
+        if not self._loaded:
+            self._load()
+        return self._data
+
+    @data.setter
+    def data(self, value: pd.DataFrame):
+        self._data = value
+        self._rows = None
+        self._cube = None
+
+    def reload(self):
+        """
+        丢弃已读取的数据，下次访问时重新读取（源数据更新后调用）
+        """
+        self.data = None
+        self._loaded = False
 
-        print(f"读取变量 {self.name} -- {self.dshape}")
-        self._init_data()
-        print(self.data)
-        print()
+    def _load(self):
+        self._loaded = True
+        if self.verbose:
+            print(f"读取变量 {self.name} -- {self._source_dshape}")
+        try:
+            self._init_data()
+            self._data = precision.cast_frame(self._data)
+        except BaseException:
+            self.reload()
+            raise
+        if self.verbose:
+            print(self._data)
+            print()
 
     def _init_data(self):
+        """
+        读取并处理数据，源数据和处理参数未变化时直接读取磁盘缓存
+        """
+        if self._source_dshape == 'N_T':
+            # 宽表在上次同步后被更新时先同步分区存储，缓存键随之变化
+            factor_store.sync_store(self.name, self._data_file())
+        key = self._cache_key() if self.use_cache else None
+        if key is not None:
+            cached = factor_cache.read_cache(self.name, key)
+            if cached is not None:
+                self.data = cached
+                return
+
+        self._load_data()
+        if key is not None and self.data is not None:
+            factor_cache.write_cache(self.name, key, self.data)
+
+    def _cache_key(self, raw:bool=False):
+        """
+        处理结果的缓存键，源数据不存在时为 None
+        :param raw: True 为未处理的原始数据（含缺失值，各种标准化方法共用）
+        """
+        signature = self._source_signature()
+        if signature is None:
+            return None
+        if raw:
+            return factor_cache.cache_key(signature, dshape=self._source_dshape, raw=True)
+        if not self.standardize:
+            return factor_cache.cache_key(signature, dshape=self._source_dshape, standardize=False)
+        return factor_cache.cache_key(signature, dshape=self._source_dshape, standardize=True,
+                                      extremum=self.extremum, log_bias=self.log_bias, method=self.method,
+                                      transform=self.transform, boxcox_lambda=self.boxcox_lambda,
+                                      mad_k=self.mad_k)
+
+    def _source_signature(self):
+        return factor_cache.source_signature(self.name, self._data_file())
+
+    def _load_data(self):
+        self.data = self._raw_data()
+
+        # 2.去极值 和 标准化
+        if self.standardize:
+            self._standardize()
+
+        if self.data is not None:
+            self.data = self.data.dropna()
+
+    def _raw_data(self) -> pd.DataFrame:
+        """
+        未处理的原始数据；需要标准化时经磁盘缓存读取，切换标准化方法不必重新解析源文件
+        """
+        if not self.standardize:
+            return self._read_source()
+        key = self._cache_key(raw=True) if self.use_cache else None
+        if key is not None:
+            cached = factor_cache.read_cache(self.name, key)
+            if cached is not None:
+                return cached
+        data = self._read_source()
+        if key is not None and data is not None:
+            factor_cache.write_cache(self.name, key, data)
+        return data
+
+    def _read_source(self) -> pd.DataFrame:
         # 1.判断原始数据类型
-        if self.dshape == 'N_T':
+        dshape = self._source_dshape
+        if dshape == 'N_T' and factor_store.has_store(self.name):
+            # 按月分区存储，直接读取为 NT_K
+            return factor_store.read_store(self.name, 'NT_K')
+        elif dshape == 'N_T':
             data = pd.read_csv(self._factor_path(), dtype={'code': str})
             data = data.set_index(['code'])
             data = data.stack().reset_index()
             data.columns = ['code', 'date', self.name]
             data = data.set_index(['code','date'])
             data = data.reorder_levels(['code', 'date'])
-            self.dshape = 'NT_K'
-            self.data = data
-        elif self.dshape == 'NT_K':
+            return data
+        elif dshape == 'NT_K':
             data = pd.read_csv(self._factor_path(), index_col=(0, 1), dtype={'date': str, 'code': str})
             data = data.reorder_levels(['code', 'date'])
-            self.data = data
-        elif self.dshape == 'N_K':
+            return data
+        elif dshape == 'N_K':
             data = pd.read_csv(self._factor_path(), index_col=(0), dtype={'code': str})
             data['date'] = 'all'  # 添加date列，所有行赋值为'all'
             data = data.set_index('date', append=True)  # 将date设为索引，保持原有索引
             data = data.reorder_levels(['code', 'date'])
-            self.data = data
-        elif self.dshape == 'T_K':
+            return data
+        elif dshape == 'T_K':
             data = pd.read_csv(self._factor_path(), index_col=(0), dtype={'date': str})
             data['code'] = 'all'  # 添加code列，所有行赋值为'all'
             data = data.set_index('code', append=True)  # 将code设为索引，保持原有索引
             data = data.reorder_levels(['code', 'date'])
-            self.data = data
-        else:
-            self.data = None
+            return data
+        return None
 
-        # 2.去极值 和 标准化
-        if self.standardize:
-            self._standardize()
-
-        if self.data is not None:
-            self.data = self.data.dropna()
+    def _data_file(self):
+        current_file_path = os.path.dirname(os.path.abspath(__file__))
+        return current_file_path + f"/factor_data/{self.name}.csv"
 
     def _factor_path(self):
         """
         获取因子数据文件路径
         :return: 文件路径
         """
-        factor_name = self.name
-        current_file_path = os.path.dirname(os.path.abspath(__file__))
-        file_path = current_file_path + f"/factor_data/{factor_name}.csv"
+        file_path = self._data_file()
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"文件不存在: {file_path}")
         return file_path
 
     def _standardize(self):
         """
-        将因子数据去极值和标准化
-        :param data: DataFrame(col=['股票代码', xxx]), 因子数据
-        :param extremum: 去除 n分位的极值
-        :return: DataFrame(col=['股票代码', xxx]), 处理后的因子数据
+        将因子数据变换、去极值和标准化（逐期内核见 factor_standardize）
         """
-        extremum = self.extremum
-
-        result_list = []
-        for date, df in self.data.groupby(level='date'):
-            df_copy = df.copy()
-
-            # 对每个因子列进行处理
-            factor_cols = [col for col in df_copy.columns]
-
-            for col in factor_cols:
-                # 1. 取log
-                if self.need_log:
-                    df_copy[col] = np.log(df_copy[col]+self.log_bias)
-
-                # 2. 去极值
-                lower = df_copy[col].quantile(extremum)
-                upper = df_copy[col].quantile(1 - extremum)
-                df_copy[col] = df_copy[col].clip(lower=lower, upper=upper)
-
-                # 3. 标准化
-                mean_val = df_copy[col].mean()
-                std_val = df_copy[col].std()
-                if std_val > 0:
-                    df_copy[col] = (df_copy[col] - mean_val) / std_val
-                else:
-                    df_copy[col] = 0
-            result_list.append(df_copy)
-        self.data = pd.concat(result_list)
+        self.data = factor_standardize.standardize_frame(self.data, self.method, self.extremum, self.mad_k,
+                                                         self.transform, self.log_bias, self.boxcox_lambda)
 
     def get_name(self)->str:
         return self.name
@@ -130,25 +253,74 @@ class Factor:
     def get_dshape(self)->str:
         return self.dshape
 
-    def get_data(self, date:str=None)->pd.DataFrame:
+    def get_data(self, date:str=None, copy:bool=True)->pd.DataFrame:
         """
         获取因子数据
+        :param date: 日期，None 返回全部
+        :param copy: False 时不复制：全部数据返回写时复制的浅视图（修改不影响因子），按期取数返回只读视图
         :return: DataFrame(index=(code, date), column=['因子名'])
                 或 DataFrame(index=(code), column=['因子名'])
         """
-        try:
-            if date is None:
-                return self.data.copy()
-            else:
-                return self.data.xs(date, level='date').copy()
-        except:
+        data = self.data
+        if date is None:
+            return data.copy(deep=copy)
+        rows = self._date_rows()
+        t = rows['pos'].get(date)
+        if t is None:
             print(f"获取{self.name}失败: 索引{date}")
+            return None
+        start, stop = rows['bounds'][t], rows['bounds'][t + 1]
+        if t not in rows['index']:
+            rows['index'][t] = pd.Index(rows['codes'][start:stop], name='code')
+        ret = pd.DataFrame(rows['values'][start:stop], index=rows['index'][t], columns=data.columns, copy=False)
+        return ret.copy() if copy else ret
+
+    def get_cube(self) -> tuple:
+        """
+        获取稠密数组，缺失为 NaN
+        :return: (date Index 升序, code Index, 只读 ndarray(date, code, k))，浮点类型见 precision
+        """
+        if self._cube is None:
+            data = self.data
+            date_idx, dates = pd.factorize(data.index.get_level_values('date'), sort=True)
+            code_idx, codes = pd.factorize(data.index.get_level_values('code'))
+            cube = np.full((len(dates), len(codes), data.shape[1]), np.nan, dtype=precision.dtype())
+            cube[date_idx, code_idx] = data.to_numpy(dtype=precision.dtype())
+            cube.flags.writeable = False
+            self._cube = (pd.Index(dates, name='date'), pd.Index(codes, name='code'), cube)
+        return self._cube
+
+    def _date_rows(self) -> dict:
+        """
+        按期连续排列的行：第 t 期为 values[bounds[t]:bounds[t+1]]，按期取数只需切片
+        """
+        if self._rows is None:
+            data = self.data
+            date_idx, dates = pd.factorize(data.index.get_level_values('date'), sort=True)
+            order = np.argsort(date_idx, kind='stable')
+            values = data.to_numpy()[order]
+            values.flags.writeable = False
+            self._rows = {'pos': {d: t for t, d in enumerate(dates)},
+                          'bounds': np.searchsorted(date_idx[order], np.arange(len(dates) + 1)),
+                          'codes': np.asarray(data.index.get_level_values('code'))[order],
+                          'values': values,
+                          'index': {}}
+        return self._rows
 
     def get_date_index(self)->pd.Index:
-        return self.data.index.get_level_values('date').unique()
+        return self._level_unique('date')
 
     def get_code_index(self)->pd.Index:
-        return self.data.index.get_level_values('code').unique()
+        return self._level_unique('code')
+
+    def _level_unique(self, level:str)->pd.Index:
+        """
+        索引层按首次出现顺序去重，由层编码计算，不展开整列取值
+        """
+        index = self.data.index
+        i = index.names.index(level)
+        codes = pd.unique(index.codes[i])
+        return index.levels[i].take(codes[codes >= 0]).rename(level)
 
 
 class Change(Factor):
@@ -163,6 +335,13 @@ class Industry(Factor):
     def __init__(self):
         super().__init__(f"industry", "N_K", False)
 
+class IndustryCode(Factor):
+    """
+    整数行业代码（一列），代替 Industry 的行业哑变量列，回归时按行业组内去均值
+    """
+    def __init__(self):
+        super().__init__(f"industry_code", "N_K", False)
+
 class Size(Factor):
     def __init__(self):
         super().__init__("size", "N_T")
@@ -232,6 +411,36 @@ class STR(Momentum):
     def __init__(self):
         super().__init__(n=1, skip=0, extremum=0.01)
 
+class Neutral(Factor):
+    """
+    行业、市值中性化后的因子：对行业哑变量和对数流通市值逐期回归取残差（见 factor_lab.neutralize），
+    再标准化；结果与其他因子一样按输入数据签名缓存
+    """
+    def __init__(self, factor:Factor, industry:bool=True, size:bool=True, standardize:bool=True):
+        if factor.get_dshape() != 'NT_K':
+            raise ValueError(f"只能中性化随时间变化的因子: {factor.get_name()} -- {factor.get_dshape()}")
+        self.factor = factor
+        self.industry = industry
+        self.size = size
+        suffix = '_'.join(['ind'] * industry + ['size'] * size)
+        super().__init__(f"{factor.get_name()}_neutral_{suffix}", "NT_K", standardize, extremum=0)
+
+    def _source_signature(self):
+        from factors.factor_lab.neutralize import input_signature
+        base = self.factor._cache_key()
+        inputs = input_signature(self.industry, self.size)
+        if base is None or inputs is None:
+            return None
+        # 输入因子按存放精度参与计算，缓存按精度区分
+        return ('neutral', base, inputs, precision.get_precision())
+
+    def _load_data(self):
+        from factors.factor_lab.neutralize import neutralize
+        self.data = neutralize(self.factor.get_data(copy=False), self.industry, self.size)
+        if self.standardize:
+            self._standardize()
+        self.data = self.data.dropna()
+
 if __name__ == '__main__':
     factor1 = Change()
     factor2 = Momentum()
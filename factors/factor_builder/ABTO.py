@@ -7,6 +7,9 @@ import numpy as np
 from tools import month_tool
 from data_api import get_monthly_hfq, get_daily_index
 
+# 计算所需的 每日指标 列
+ABTO_ATTR = ['换手率(自由流通股)']
+
 
 def _compute_ABTO(codes: pd.Series, date: str):
     """
@@ -29,10 +32,10 @@ def _compute_ABTO(codes: pd.Series, date: str):
     # 获取日均换手率
     m_1 = month_tool.prev_month(date, 1)+'01'
     date = date + '01'
-    turnover_d = get_daily_index(['换手率(自由流通股)'])
+    turnover_d = get_daily_index(ABTO_ATTR)
     turnover_d = turnover_d[(turnover_d.index.get_level_values('date') >= m_1) & (turnover_d.index.get_level_values('date') <= date)]
-    turnover_d = turnover_d.groupby(level='code').mean()
-    turnover_d = turnover_d.reset_index().rename(columns={'code': '股票代码', '换手率(自由流通股)': 'TO_d'})
+    turnover_d = _ABTO_kernel(turnover_d)
+    turnover_d = turnover_d.reset_index().rename(columns={'code': '股票代码'})
 
     # 合并并计算
     datas = codes.merge(turnover_m, on='股票代码', how='left')
@@ -46,6 +49,15 @@ def _compute_ABTO(codes: pd.Series, date: str):
     return datas[['股票代码', 'ABTO']]
 
 
+def _ABTO_kernel(window: pd.DataFrame) -> pd.Series:
+    """
+    ABTO 的日频部分 -- 当月日均换手率
+    :param window: 当月窗口内的日数据 DataFrame(index=(date, code), col=ABTO_ATTR)
+    :return: Series(index=code, name='TO_d')
+    """
+    return window.groupby(level='code')['换手率(自由流通股)'].mean().rename('TO_d')
+
+
 from tools import datapath
 if __name__ == '__main__':
     codes = pd.read_csv(datapath.stock_path, dtype=str)['股票代码']
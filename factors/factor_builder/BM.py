@@ -7,6 +7,9 @@ import numpy as np
 from tools import month_tool
 from data_api import get_daily_index
 
+# 计算所需的 每日指标 列
+BM_ATTR = ['市净率']
+
 
 def _compute_BM(codes: pd.Series, date: str):
     """
@@ -22,13 +25,11 @@ def _compute_BM(codes: pd.Series, date: str):
     # 获取日收益率标准差
     m_1 = month_tool.prev_month(date, 1)+'01'
     date = date + '01'
-    ret = get_daily_index(['市净率'])
+    ret = get_daily_index(BM_ATTR)
     ret = ret[(ret.index.get_level_values('date') >= m_1) & (ret.index.get_level_values('date') <= date)]
 
-    last = ret.sort_index(level=0).groupby(level=1, group_keys=False).tail(1)
-    last["BM"] = (1 / last["市净率"]).where(last["市净率"].gt(0) & np.isfinite(last["市净率"]), None)
-
-    BM = last.reset_index().rename(columns={'code': '股票代码'})
+    BM = _BM_kernel(ret)
+    BM = BM.reset_index().rename(columns={'code': '股票代码'})
 
     # 合并
     datas = codes.merge(BM, on='股票代码', how='left')
@@ -36,6 +37,16 @@ def _compute_BM(codes: pd.Series, date: str):
     return datas[['股票代码', 'BM']]
 
 
+def _BM_kernel(window: pd.DataFrame) -> pd.Series:
+    """
+    :param window: 当月窗口内的日数据 DataFrame(index=(date, code), col=BM_ATTR)
+    :return: Series(index=code, name='BM')，取窗口内最后一个交易日
+    """
+    last = window.sort_index(level=0).groupby(level=1, group_keys=False).tail(1)
+    BM = (1 / last["市净率"]).where(last["市净率"].gt(0) & np.isfinite(last["市净率"]), None)
+    return BM.droplevel('date').rename('BM')
+
+
 from tools import datapath
 if __name__ == '__main__':
     codes = pd.read_csv(datapath.stock_path, dtype=str)['股票代码']
@@ -7,6 +7,9 @@ import numpy as np
 from tools import month_tool
 from data_api import get_daily_index
 
+# 计算所需的 每日指标 列
+EP_ATTR = ['市盈率TTM']
+
 
 def _compute_EP(codes: pd.Series, date: str):
     """
@@ -22,13 +25,11 @@ def _compute_EP(codes: pd.Series, date: str):
     # 获取日收益率标准差
     m_1 = month_tool.prev_month(date, 1)+'01'
     date = date + '01'
-    ret = get_daily_index(['市盈率TTM'])
+    ret = get_daily_index(EP_ATTR)
     ret = ret[(ret.index.get_level_values('date') >= m_1) & (ret.index.get_level_values('date') <= date)]
 
-    last = ret.sort_index(level=0).groupby(level=1, group_keys=False).tail(1)
-    last["EP"] = (1 / last["市盈率TTM"]).where(last["市盈率TTM"].gt(0) & np.isfinite(last["市盈率TTM"]), None)
-
-    EP = last.reset_index().rename(columns={'code': '股票代码'})
+    EP = _EP_kernel(ret)
+    EP = EP.reset_index().rename(columns={'code': '股票代码'})
 
     # 合并
     datas = codes.merge(EP, on='股票代码', how='left')
@@ -36,6 +37,16 @@ def _compute_EP(codes: pd.Series, date: str):
     return datas[['股票代码', 'EP']]
 
 
+def _EP_kernel(window: pd.DataFrame) -> pd.Series:
+    """
+    :param window: 当月窗口内的日数据 DataFrame(index=(date, code), col=EP_ATTR)
+    :return: Series(index=code, name='EP')，取窗口内最后一个交易日
+    """
+    last = window.sort_index(level=0).groupby(level=1, group_keys=False).tail(1)
+    EP = (1 / last["市盈率TTM"]).where(last["市盈率TTM"].gt(0) & np.isfinite(last["市盈率TTM"]), None)
+    return EP.droplevel('date').rename('EP')
+
+
 from tools import datapath
 if __name__ == '__main__':
     codes = pd.read_csv(datapath.stock_path, dtype=str)['股票代码']
@@ -7,6 +7,9 @@ import numpy as np
 from tools import month_tool
 from data_api import get_daily_index
 
+# 计算所需的 每日指标 列
+ILL_ATTR = ['涨跌幅', '成交额(千元)']
+
 
 def _compute_ILL(codes: pd.Series, date: str):
     """
@@ -22,22 +25,29 @@ def _compute_ILL(codes: pd.Series, date: str):
     # 获取日收益率标准差
     m_1 = month_tool.prev_month(date, 1)+'01'
     date = date + '01'
-    ret = get_daily_index(['涨跌幅', '成交额(千元)'])
+    ret = get_daily_index(ILL_ATTR)
     ret = ret[(ret.index.get_level_values('date') >= m_1) & (ret.index.get_level_values('date') <= date)]
 
-    ret['ILL'] = (ret['涨跌幅'].abs() / ret['成交额(千元)']).where(
-        (ret['成交额(千元)'] != 0) & ret[['涨跌幅', '成交额(千元)']].notna().all(axis=1))
-
-    ILL = ret.groupby('code')['ILL'].mean()
+    ILL = _ILL_kernel(ret)
     ILL = ILL.reset_index().rename(columns={'code': '股票代码'})
 
     # 合并
     datas = codes.merge(ILL, on='股票代码', how='left')
-
-    datas['ILL'] = datas['ILL'].where(datas['ILL'] >= 0, other=np.nan)
     return datas[['股票代码', 'ILL']]
 
 
+def _ILL_kernel(window: pd.DataFrame) -> pd.Series:
+    """
+    :param window: 当月窗口内的日数据 DataFrame(index=(date, code), col=ILL_ATTR)
+    :return: Series(index=code, name='ILL')
+    """
+    ill = (window['涨跌幅'].abs() / window['成交额(千元)']).where(
+        (window['成交额(千元)'] != 0) & window[['涨跌幅', '成交额(千元)']].notna().all(axis=1))
+
+    ill = ill.groupby(level='code').mean()
+    return ill.where(ill >= 0, other=np.nan).rename('ILL')
+
+
 from tools import datapath
 if __name__ == '__main__':
     codes = pd.read_csv(datapath.stock_path, dtype=str)['股票代码']
@@ -6,6 +6,9 @@ import pandas as pd
 from tools import month_tool
 from data_api import get_daily_index
 
+# 计算所需的 每日指标 列
+MAX_ATTR = ['涨跌幅']
+
 
 def _compute_MAX(codes: pd.Series, date: str):
     """
@@ -22,9 +25,9 @@ def _compute_MAX(codes: pd.Series, date: str):
     # 获取日收益率标准差
     m_1 = month_tool.prev_month(date, 1)+'01'
     date = date + '01'
-    change = get_daily_index(['涨跌幅'])
+    change = get_daily_index(MAX_ATTR)
     change = change[(change.index.get_level_values('date') >= m_1) & (change.index.get_level_values('date') <= date)]
-    change = change.groupby(level='code').apply(lambda x: x['涨跌幅'].nlargest(5).mean()).rename('MAX')
+    change = _MAX_kernel(change)
     change = change.reset_index().rename(columns={'code': '股票代码'})
 
     # 合并
@@ -33,6 +36,14 @@ def _compute_MAX(codes: pd.Series, date: str):
     return datas[['股票代码', 'MAX']]
 
 
+def _MAX_kernel(window: pd.DataFrame) -> pd.Series:
+    """
+    :param window: 当月窗口内的日数据 DataFrame(index=(date, code), col=MAX_ATTR)
+    :return: Series(index=code, name='MAX')
+    """
+    return window.groupby(level='code').apply(lambda x: x['涨跌幅'].nlargest(5).mean()).rename('MAX')
+
+
 from tools import datapath
 if __name__ == '__main__':
     codes = pd.read_csv(datapath.stock_path, dtype=str)['股票代码']
@@ -7,6 +7,9 @@ import numpy as np
 from tools import month_tool
 from data_api import get_daily_index
 
+# 计算所需的 每日指标 列
+VOL_ATTR = ['涨跌幅']
+
 
 def _compute_VOL(codes: pd.Series, date: str):
     """
@@ -23,18 +26,25 @@ def _compute_VOL(codes: pd.Series, date: str):
     # 获取日收益率标准差
     m_1 = month_tool.prev_month(date, 1)+'01'
     date = date + '01'
-    change = get_daily_index(['涨跌幅'])
+    change = get_daily_index(VOL_ATTR)
     change = change[(change.index.get_level_values('date') >= m_1) & (change.index.get_level_values('date') <= date)]
-    change = change.groupby(level='code').std()
-    change = change.reset_index().rename(columns={'code': '股票代码', '涨跌幅': 'VOL'})
+    change = _VOL_kernel(change)
+    change = change.reset_index().rename(columns={'code': '股票代码'})
 
     # 合并
     datas = codes.merge(change, on='股票代码', how='left')
-
-    datas['VOL'] = datas['VOL'].where(datas['VOL'] >= 0, other=np.nan)
     return datas[['股票代码', 'VOL']]
 
 
+def _VOL_kernel(window: pd.DataFrame) -> pd.Series:
+    """
+    :param window: 当月窗口内的日数据 DataFrame(index=(date, code), col=VOL_ATTR)
+    :return: Series(index=code, name='VOL')
+    """
+    vol = window.groupby(level='code')['涨跌幅'].std()
+    return vol.where(vol >= 0, other=np.nan).rename('VOL')
+
+
 from tools import datapath
 if __name__ == '__main__':
     codes = pd.read_csv(datapath.stock_path, dtype=str)['股票代码']
@@ -1,6 +1,13 @@
 from .build_factors import build_factors
 from .build_change import build_change
 from .build_market import build_market
-from .industry_dummy_variable import build_industry_dummies, build_industry_dummies_rm
+from .industry_dummy_variable import build_industry_dummies, build_industry_dummies_rm, build_industry_codes
+from .chunked import build_daily_factors_chunked
+from .panel import compute_panel, build_factors_panel, PanelInputs
+from .registry import build_all_factors, register_factor, FACTOR_REGISTRY
+from .daily_features import register_daily_feature, DAILY_FEATURES
 
-__all__ = ['build_factors', 'build_change', 'build_market', 'build_industry_dummies', 'build_industry_dummies_rm']
\ No newline at end of file
+__all__ = ['build_factors', 'build_change', 'build_market', 'build_industry_dummies', 'build_industry_dummies_rm',
+           'build_industry_codes',
+           'build_daily_factors_chunked', 'compute_panel', 'build_factors_panel', 'PanelInputs',
+           'build_all_factors', 'register_factor', 'FACTOR_REGISTRY', 'register_daily_feature', 'DAILY_FEATURES']
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+财务打分公式 -- F-Score 九项条件与 M-Score 八项比率
+输入为按股票（或 月份 × 股票）对齐的各期财务数据，列名沿用逐月计算时多期合并后的列名：
+当期为原列名，前一期、前两期分别加后缀 '_1'、'_2'。
+逐月计算（fscore / fscore_fixed / mscore）与面板批量计算（panel._panel_fscore 等）共用这里的公式。
+"""
+import numpy as np
+
+from tools import safe_div
+
+# F-Score 所需 (列名, 滞后期数)
+FSCORE_INPUTS = [
+    ('归属于母公司所有者的净利润', 0), ('资产总计', 0), ('经营活动产生的现金流量净额', 0),
+    ('非流动负债合计', 0), ('流动资产合计', 0), ('流动负债合计', 0), ('总股本', 0),
+    ('其中：营业收入', 0), ('其中：营业成本', 0),
+    ('归属于母公司所有者的净利润', 1), ('资产总计', 1), ('非流动负债合计', 1), ('流动资产合计', 1),
+    ('流动负债合计', 1), ('总股本', 1), ('其中：营业收入', 1), ('其中：营业成本', 1),
+    ('资产总计', 2),
+]
+
+# M-Score 所需列（当期与前一期）
+MSCORE_COLS = [
+    '其中：营业收入', '其中：营业成本',
+    '应收票据', '应收账款', '其他应收款', '应收关联公司款', '应收利息', '应收股利',
+    '流动资产合计', '固定资产', '在建工程', '工程物资', '生产性生物资产', '交易性金融资产', '资产总计',
+    '固定资产折旧、油气资产折耗、生产性生物资产折旧',
+    '销售费用', '管理费用',
+    '长期借款', '应付债券', '长期应付款', '流动负债合计',
+    '归属于母公司所有者的净利润', '经营活动产生的现金流量净额',
+]
+MSCORE_INPUTS = [(c, 0) for c in MSCORE_COLS] + [(c, 1) for c in MSCORE_COLS[:-2]]
+
+
+def input_name(col: str, lag: int) -> str:
+    """
+    多期合并后的列名
+    """
+    return col if lag == 0 else f"{col}_{lag}"
+
+
+def fscore(x) -> np.ndarray:
+    """
+    F-Score 九项条件之和，缺失数据须已填 0
+    :param x: {列名: ndarray} 或 DataFrame，包含 FSCORE_INPUTS 的全部列
+    :return: int ndarray，形状与输入列相同
+    """
+    v = lambda c: np.asarray(x[c], dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # c1
+        ROA = np.where(v('资产总计_1') != 0, v('归属于母公司所有者的净利润') / v('资产总计_1'), 0)
+        c1 = np.where(ROA > 0, 1, 0)
+
+        # c2
+        c2 = np.where(v('经营活动产生的现金流量净额') > 0, 1, 0)
+
+        # c3
+        ROA_1 = np.where(v('资产总计_2') != 0, v('归属于母公司所有者的净利润_1') / v('资产总计_2'), 0)
+        c3 = np.where((ROA != 0) & (ROA_1 != 0) & (ROA > ROA_1), 1, 0)
+
+        # c4
+        CFO_scaled = np.where(v('资产总计_1') != 0, v('经营活动产生的现金流量净额') / v('资产总计_1'), 0)
+        c4 = np.where((CFO_scaled != 0) & (ROA != 0) & (CFO_scaled > ROA), 1, 0)
+
+        # c5
+        LEV = np.where(v('资产总计') != 0, v('非流动负债合计') / v('资产总计'), 0)
+        LEV_1 = np.where(v('资产总计_1') != 0, v('非流动负债合计_1') / v('资产总计_1'), 0)
+        c5 = np.where((LEV != 0) & (LEV_1 != 0) & (LEV > LEV_1), 1, 0)
+
+        # c6
+        CurrentRatio = np.where(v('流动负债合计') != 0, v('流动资产合计') / v('流动负债合计'), 0)
+        CurrentRatio_1 = np.where(v('流动负债合计_1') != 0, v('流动资产合计_1') / v('流动负债合计_1'), 0)
+        c6 = np.where((CurrentRatio != 0) & (CurrentRatio_1 != 0) & (CurrentRatio > CurrentRatio_1), 1, 0)
+
+        # c7
+        ZGB = v('总股本')
+        ZGB_1 = v('总股本_1')
+        c7 = np.where((ZGB != 0) & (ZGB_1 != 0) & (ZGB <= ZGB_1), 1, 0)
+
+        # c8
+        GrossMargin = np.where(v('其中：营业收入') != 0,
+                               (v('其中：营业收入') - v('其中：营业成本')) / v('其中：营业收入'), 0)
+        GrossMargin_1 = np.where(v('其中：营业收入_1') != 0,
+                                 (v('其中：营业收入_1') - v('其中：营业成本_1')) / v('其中：营业收入_1'), 0)
+        c8 = np.where((GrossMargin != 0) & (GrossMargin_1 != 0) & (GrossMargin > GrossMargin_1), 1, 0)
+
+        # c9
+        AssetTurn = np.where(v('资产总计') != 0, v('其中：营业收入') / v('资产总计'), 0)
+        AssetTurn_1 = np.where(v('资产总计_1') != 0, v('其中：营业收入_1') / v('资产总计_1'), 0)
+        c9 = np.where((AssetTurn != 0) & (AssetTurn_1 != 0) & (AssetTurn > AssetTurn_1), 1, 0)
+
+    return c1 + c2 + c3 + c4 + c5 + c6 + c7 + c8 + c9
+
+
+def mscore(x) -> np.ndarray:
+    """
+    M-Score = -4.84 + 0.92DSRI + 0.528GMI + 0.404AQI + 0.892SGI + 0.115DEPI - 0.172SGAI + 4.679TATA - 0.327LVGI
+    :param x: {列名: ndarray} 或 DataFrame，包含 MSCORE_INPUTS 的全部列
+    :return: float ndarray，形状与输入列相同
+    """
+    v = lambda c: np.asarray(x[c], dtype=np.float64)
+
+    YSHJ = (v('应收票据') + v('应收账款') + v('其他应收款')
+            + v('应收关联公司款') + v('应收利息') + v('应收股利'))
+
+    YSHJ_1 = (v('应收票据_1') + v('应收账款_1') + v('其他应收款_1')
+              + v('应收关联公司款_1') + v('应收利息_1') + v('应收股利_1'))
+
+    # 1.DSRI
+    DSRI = safe_div(a=safe_div(YSHJ, v('其中：营业收入'), None),
+                    b=safe_div(YSHJ_1, v('其中：营业收入_1'), None),
+                    default=None)
+
+    # 2.GMI
+    ML = v('其中：营业收入') - v('其中：营业成本')
+    ML_1 = v('其中：营业收入_1') - v('其中：营业成本_1')
+    GMI = safe_div(a=safe_div(ML_1, v('其中：营业收入_1'), None),
+                   b=safe_div(ML, v('其中：营业收入'), None),
+                   default=None)
+
+    # 3.AQI
+    CurrentAssets = v('流动资产合计')
+    CurrentAssets_1 = v('流动资产合计_1')
+
+    PPE = v('固定资产') + v('在建工程') + v('工程物资') + v('生产性生物资产')
+    PPE_1 = v('固定资产_1') + v('在建工程_1') + v('工程物资_1') + v('生产性生物资产_1')
+
+    Securities = v('交易性金融资产')
+    Securities_1 = v('交易性金融资产_1')
+
+    AQI = safe_div(1 - safe_div(CurrentAssets + PPE + Securities, v('资产总计'), None),
+                   1 - safe_div(CurrentAssets_1 + PPE_1 + Securities_1, v('资产总计_1'), None),
+                   None)
+
+    # 4.SGI
+    SGI = safe_div(v('其中：营业收入'), v('其中：营业收入_1'), None)
+
+    # 5.DEPI
+    ZJ = v('固定资产折旧、油气资产折耗、生产性生物资产折旧')
+    ZJ_1 = v('固定资产折旧、油气资产折耗、生产性生物资产折旧_1')
+    DEPI = safe_div(safe_div(ZJ_1, ZJ_1 + PPE_1, None),
+                    safe_div(ZJ, ZJ + PPE, None),
+                    0)
+
+    # 6.SGAI
+    SGA = v('销售费用') + v('管理费用')
+    SGA_1 = v('销售费用_1') + v('管理费用_1')
+
+    SGAI = safe_div(safe_div(SGA, v('其中：营业收入'), None),
+                    safe_div(SGA_1, v('其中：营业收入_1'), None),
+                    None)
+
+    # 7.LVGI
+    LongTermDebt = v('长期借款') + v('应付债券') + v('长期应付款')
+    LongTermDebt_1 = v('长期借款_1') + v('应付债券_1') + v('长期应付款_1')
+    CurrentLiab = v('流动负债合计')
+    CurrentLiab_1 = v('流动负债合计_1')
+
+    LVGI = safe_div(safe_div(CurrentLiab + LongTermDebt, v('资产总计'), None),
+                    safe_div(CurrentLiab_1 + LongTermDebt_1, v('资产总计_1'), None),
+                    None)
+
+    # 8.TATA
+    TATA = safe_div(v('归属于母公司所有者的净利润') + v('经营活动产生的现金流量净额'),
+                    v('资产总计'), None)
+
+    return (-4.84
+            + 0.92 * DSRI
+            + 0.528 * GMI
+            + 0.404 * AQI
+            + 0.892 * SGI
+            + 0.115 * DEPI
+            - 0.172 * SGAI
+            + 4.679 * TATA
+            - 0.327 * LVGI
+            )
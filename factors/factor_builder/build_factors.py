@@ -20,6 +20,9 @@ import data_api
 from tools import month_tool
 import pandas as pd
 import factors
+from factors import factor_store
+from . import fingerprint, panel
+from .registry import FACTOR_REGISTRY
 
 
 
@@ -61,31 +64,42 @@ def _build_factor(
         start: str,  # 开始月份
         end: str,  # 结束月份
         indicator_name:str,  # 指标名称
+        export:bool=False,  # 是否导出 N_T 宽表
         **kwargs  # 传递给计算函数的额外参数
 ):
     """
     支持额外参数的指标计算函数
+    结果按月写入 factor_store（factor_data/{indicator_name}/{YYYYMM}.csv），每月只写入新月份文件，
+    export=True 时结束后导出 N_T 宽表 factor_data/{indicator_name}.csv
+    因子在注册表（registry.FACTOR_REGISTRY）中声明了输入时，按月记录输入指纹（见 fingerprint），
+    已有月份中输入数据或计算代码变化的月份也会重算，其余已有月份不重算
     """
-    import pandas as pd
-    import os
-
-    # 1. 检查是否已有文件
+    # 1. 检查是否已有数据，N_T 宽表存在而分区存储不存在时，先由宽表初始化；宽表在上次同步后被更新时重新同步
     csv_path = factors.fpath(indicator_name)
-
-    result_df = pd.DataFrame({'code': codes})
-    if os.path.exists(csv_path):
-        existing_df = pd.read_csv(csv_path, dtype={'code': str})
-        result_df = existing_df
-        month_cols = [col for col in existing_df.columns if col != 'code' and col.isdigit()]
-        if month_cols:
-            last_month = max(month_cols)
-            start = month_tool.next_month(str(last_month))
-
-    # 2. 准备存储结果
+    factor_store.prepare_store(indicator_name, csv_path)
+    months = factor_store.store_months(indicator_name)
+    todo = panel._month_range(month_tool.next_month(months[-1]) if months else start, end)
+
+    # 2. 已有月份中指纹变化的月份
+    spec = FACTOR_REGISTRY.get(indicator_name)
+    fingerprints = {}
+    if spec is not None:
+        inputs = panel.PanelInputs(codes)
+        existing = [m for m in months if start <= m <= end]
+        fingerprints = fingerprint.month_fingerprints(spec, existing + todo, inputs)
+        stored = factor_store.read_fingerprints(indicator_name)
+        if stored:
+            changed = fingerprint.changed_months(stored, {m: fingerprints[m] for m in existing})
+        else:
+            # 首次记录指纹：已有月份视为与当前输入一致，只记录不重算
+            changed = []
+            factor_store.write_fingerprints(indicator_name, {m: fingerprints[m] for m in existing})
+        if changed:
+            print(f"{indicator_name} 输入或代码变化，重算 {len(changed)} 个月: {changed[0]} ~ {changed[-1]}")
+        todo = sorted(changed) + todo
 
     # 3. 遍历月份计算
-    current_month = start
-    while current_month <= end:
+    for current_month in todo:
         print(f"计算 {indicator_name} - {current_month}")
 
         # 调用计算函数，传入额外参数
@@ -94,31 +108,26 @@ def _build_factor(
         # 假设返回的DataFrame包含指标值
         # 这里需要知道指标列的列名
         # 方法1：假设指标列名就是 indicator_name
-        if indicator_name in month_data.columns:
-            month_data = month_data.rename(columns={indicator_name: current_month})
         # 方法2：如果计算函数返回的不是标准格式，可以取第一列数值列
-        else:
+        if indicator_name not in month_data.columns:
             value_col = [c for c in month_data.columns if c != '股票代码'][0]
-            month_data = month_data.rename(columns={value_col: current_month})
+            month_data = month_data.rename(columns={value_col: indicator_name})
 
-        # 合并到结果
+        # 只写入当月分区
         month_data = month_data.rename(columns={'股票代码':'code'})
-        result_df = pd.merge(result_df, month_data[['code', current_month]],
-                             on='code', how='left')
+        factor_store.write_month(indicator_name, current_month, month_data)
+        if current_month in fingerprints:
+            factor_store.write_fingerprints(indicator_name, {current_month: fingerprints[current_month]})
 
-        # 保存
-        result_df.to_csv(csv_path, index=False)
+        print("零数据：",len(month_data[month_data[indicator_name]==0]))
+        print("空数据：",len(month_data[month_data[indicator_name].isna()]))
 
-        print("零数据：",len(month_data[month_data[current_month]==0]))
-        print("空数据：",len(month_data[month_data[current_month].isna()]))
-
-        # 获取下一个月
-        current_month = month_tool.next_month(str(current_month))
-
-
-    return result_df
+    if not factor_store.has_store(indicator_name):
+        return pd.DataFrame({'code': codes})
+    if export:
+        return factor_store.export_wide(indicator_name, csv_path)
+    return factor_store.read_store(indicator_name, 'N_T')
 
 
 if __name__ == '__main__':
     build_factors(start='201001',end='202602')
-
@@ -0,0 +1,236 @@
+"""
+日频因子分块计算 -- 每日指标.csv 大于内存时使用
+流式读取 每日指标.csv，按股票代码块（或月份块）落盘为临时分块文件，
+逐块读入后对每个月的窗口调用各因子的 kernel，最后合并为月度结果。
+内存上限由 DAILY_MEMORY_LIMIT（环境变量 ASHARE_DAILY_MEMORY_MB）或参数 memory_limit 决定，与数据规模无关。
+"""
+import os
+import math
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import data_api
+from factors import factor_store
+from tools import datapath, month_tool
+from . import panel
+from .ABTO import ABTO_ATTR, _ABTO_kernel
+from .VOL import VOL_ATTR, _VOL_kernel
+from .MAX import MAX_ATTR, _MAX_kernel
+from .ILL import ILL_ATTR, _ILL_kernel
+from .EP import EP_ATTR, _EP_kernel
+from .BM import BM_ATTR, _BM_kernel
+
+# 分块计算时单块数据（含计算开销）的内存上限
+DAILY_MEMORY_LIMIT = int(float(os.environ.get('ASHARE_DAILY_MEMORY_MB', 1024)) * 1024 ** 2)
+
+# 分块在内存中的实际占用约为原始数据的倍数（窗口切片、groupby 中间结果）
+_WORK_FACTOR = 4
+
+# 因子名 -> (所需 每日指标 列, kernel)
+DAILY_KERNELS = {
+    'VOL': (VOL_ATTR, _VOL_kernel),
+    'MAX': (MAX_ATTR, _MAX_kernel),
+    'ILL': (ILL_ATTR, _ILL_kernel),
+    'EP': (EP_ATTR, _EP_kernel),
+    'BM': (BM_ATTR, _BM_kernel),
+    'ABTO': (ABTO_ATTR, _ABTO_kernel),
+}
+
+# 还需要月线数据的因子：分块只计算日频部分，合并后由此合成 (日频部分 DataFrame(index=code, col=months), months) -> 同形状
+DAILY_FINISH = {
+    'ABTO': lambda TO_d, months: _finish_ABTO(TO_d, months),
+}
+
+
+def build_daily_factors_chunked(names: list, start: str, end: str, codes: pd.Series = None,
+                                memory_limit: int = None, mode: str = 'code',
+                                save: bool = True, export: bool = False) -> dict:
+    """
+    分块计算多个日频因子，结果与逐月调用 _compute_* 相同
+    :param names: 因子名列表，须在 DAILY_KERNELS 中
+    :param start: 开始月份 YYYYMM
+    :param end: 结束月份 YYYYMM
+    :param codes: 股票代码，默认取股票列表全部股票（含创业板/科创板）
+    :param memory_limit: 单块内存上限（字节），默认 DAILY_MEMORY_LIMIT
+    :param mode: 'code' 按股票代码分块 / 'date' 按月份分块
+    :param save: 是否按月写入 factor_store（与 _build_factor 相同）
+    :param export: save 时是否另导出 N_T 宽表
+    :return: {因子名: DataFrame(col=['code', 月份...])}
+    """
+    unknown = [n for n in names if n not in DAILY_KERNELS]
+    if unknown:
+        raise KeyError(f"不支持分块计算的因子: {unknown}")
+    if mode not in ('code', 'date'):
+        raise ValueError(f"mode 只能为 'code' 或 'date': {mode}")
+    if codes is None:
+        codes = data_api.get_stock_list()['股票代码']
+    codes = codes.drop_duplicates(keep='first')
+    memory_limit = DAILY_MEMORY_LIMIT if memory_limit is None else memory_limit
+
+    months = []
+    m = start
+    while m <= end:
+        months.append(m)
+        m = month_tool.next_month(m)
+
+    attr = []
+    for n in names:
+        attr += [a for a in DAILY_KERNELS[n][0] if a not in attr]
+
+    results = {n: [] for n in names}
+    for block_months, block in iter_daily_blocks(attr, months, memory_limit, mode):
+        for n in names:
+            results[n].append(_run_kernel(DAILY_KERNELS[n][1], block, block_months))
+
+    ret = {}
+    for n in names:
+        # 按代码分块时各块股票不重叠，按月份分块时各块月份不重叠
+        wide = pd.concat(results[n], axis=0 if mode == 'code' else 1) if results[n] \
+            else pd.DataFrame(columns=months, dtype=float)
+        wide = wide.reindex(columns=months)
+        if n in DAILY_FINISH:
+            wide = DAILY_FINISH[n](wide.reindex(codes.to_numpy()), months)
+        wide = codes.to_frame('code').merge(wide, left_on='code', right_index=True, how='left')
+        if save:
+            wide = _save(wide, n, months, export)
+        ret[n] = wide
+    return ret
+
+
+def iter_daily_blocks(attr: list, months: list, memory_limit: int = None, mode: str = 'code'):
+    """
+    将 每日指标.csv 分块读入，每次产出一块
+    :param attr: 需要的列
+    :param months: 需要计算的月份（升序），只保留这些月份窗口内的数据
+    :param memory_limit: 单块内存上限（字节）
+    :param mode: 'code' 每块包含部分股票的全部日期 / 'date' 每块包含部分月份窗口内的全部股票
+    :return: 生成器 (该块负责的月份, DataFrame(col=['date','code']+attr))，块内按 date 升序
+    """
+    memory_limit = DAILY_MEMORY_LIMIT if memory_limit is None else memory_limit
+    path = datapath.con_daily_index_path
+    usecols = ['date', 'code'] + attr
+    row_bytes, n_rows = _estimate_rows(path, usecols)
+    n_blocks = max(1, math.ceil(row_bytes * n_rows * _WORK_FACTOR / memory_limit))
+    chunk_rows = max(10000, int(memory_limit / _WORK_FACTOR / row_bytes))
+    if mode == 'date':
+        n_blocks = min(n_blocks, len(months))
+
+    # 月份 -> 块号
+    month_block = dict(zip(months, np.arange(len(months)) * n_blocks // len(months)))
+    block_months = [[m for m in months if mode == 'code' or month_block[m] == b] for b in range(n_blocks)]
+    lo = month_tool.prev_month(months[0], 1) + '01'
+    hi = months[-1] + '01'
+
+    os.makedirs(datapath.cache_path, exist_ok=True)
+    spill_dir = tempfile.mkdtemp(prefix='daily_blocks_', dir=datapath.cache_path)
+    try:
+        # 1. 流式读取并按块落盘
+        parts = [[] for _ in range(n_blocks)]
+        reader = pd.read_csv(path, usecols=usecols, dtype={'date': str, 'code': str}, chunksize=chunk_rows)
+        for i, chunk in enumerate(reader):
+            chunk = chunk.loc[(chunk['date'] >= lo) & (chunk['date'] <= hi)]
+            if chunk.empty:
+                continue
+            for b, part in _split_chunk(chunk, n_blocks, mode, month_block):
+                file = os.path.join(spill_dir, f"{b}_{i}.pkl")
+                part.to_pickle(file)
+                parts[b].append(file)
+
+        # 2. 逐块读入
+        for b in range(n_blocks):
+            if not parts[b]:
+                continue
+            block = pd.concat([pd.read_pickle(f) for f in parts[b]], ignore_index=True)
+            for f in parts[b]:
+                os.remove(f)
+            yield block_months[b], block.sort_values(['date', 'code'], kind='stable', ignore_index=True)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+"""
+内部函数
+"""
+def _run_kernel(kernel, block: pd.DataFrame, months: list) -> pd.DataFrame:
+    """
+    对块内每个月的窗口 [上月01, 当月01] 调用 kernel
+    :return: DataFrame(index=code, col=months)
+    """
+    dates = block['date'].to_numpy()
+    panel = block.set_index(['date', 'code'])
+    cols = {}
+    for m in months:
+        lo = np.searchsorted(dates, month_tool.prev_month(m, 1) + '01', side='left')
+        hi = np.searchsorted(dates, m + '01', side='right')
+        if hi <= lo:
+            continue
+        cols[m] = kernel(panel.iloc[lo:hi])
+    if not cols:
+        return pd.DataFrame(columns=months, dtype=float)
+    return pd.DataFrame(cols).reindex(columns=months)
+
+
+def _finish_ABTO(TO_d: pd.DataFrame, months: list) -> pd.DataFrame:
+    """
+    由分块得到的当月日均换手率和月线换手率合成 ABTO，与面板计算相同
+    :param TO_d: DataFrame(index=code, col=months)
+    """
+    inputs = panel.PanelInputs(TO_d.index.to_series(), monthly_start=month_tool.prev_month(months[0], 12) + '01')
+    values = panel._abto(TO_d.to_numpy(dtype=np.float64).T, panel._panel_TO(inputs, months))
+    return pd.DataFrame(values.T, index=TO_d.index, columns=months)
+
+
+def _split_chunk(chunk: pd.DataFrame, n_blocks: int, mode: str, month_block: dict):
+    """
+    :return: 生成器 (块号, 属于该块的行)
+    """
+    if n_blocks == 1:
+        yield 0, chunk
+        return
+    if mode == 'code':
+        block = pd.util.hash_pandas_object(chunk['code'], index=False).to_numpy() % n_blocks
+        for b in np.unique(block):
+            yield int(b), chunk.loc[block == b]
+        return
+
+    # 按月份分块：日期属于下一个月的窗口；每月1日同时属于当月窗口（只对块内不同的月份查找一次）
+    month_idx, uniq = pd.factorize(chunk['date'].str.slice(0, 6))
+    uniq = np.asarray(uniq, dtype=np.int64)
+    blocks = pd.Series(month_block, dtype=np.int64)
+    owner = blocks.reindex(month_tool.next_month_array(uniq).astype(str)).fillna(-1).to_numpy(np.int64)[month_idx]
+    owner_first = blocks.reindex(uniq.astype(str)).fillna(-1).to_numpy(np.int64)[month_idx]
+    first = (chunk['date'].str.slice(6, 8) == '01').to_numpy()
+    for b in range(n_blocks):
+        mask = (owner == b) | (first & (owner_first == b))
+        if mask.any():
+            yield b, chunk.loc[mask]
+
+
+def _estimate_rows(path: str, usecols: list, sample_rows: int = 20000):
+    """
+    用文件头部样本估计 每行内存字节数 和 总行数
+    """
+    sample = pd.read_csv(path, usecols=usecols, dtype={'date': str, 'code': str}, nrows=sample_rows)
+    if sample.empty:
+        return 1, 0
+    row_bytes = sample.memory_usage(index=False, deep=True).sum() / len(sample)
+    with open(path, 'rb') as f:
+        head = f.read(1 << 22)
+    line_bytes = len(head) / max(head.count(b'\n'), 1)
+    n_rows = int(os.path.getsize(path) / line_bytes)
+    return row_bytes, n_rows
+
+
+def _save(wide: pd.DataFrame, name: str, months: list, export: bool = False) -> pd.DataFrame:
+    """
+    按月写入 factor_store，与 _build_factor 相同
+    """
+    factor_store.prepare_store(name)
+    for m in months:
+        factor_store.write_month(name, m, wide[['code', m]].rename(columns={m: name}))
+    if export:
+        factor_store.export_wide(name)
+    return wide
@@ -0,0 +1,222 @@
+"""
+日频数据 -> 月度特征 单次遍历提取
+每日指标按 (code, date) 排序后，每只股票每个月的窗口 [上月01, 当月01] 是一段连续的行（每月1日的数据同时属于两个窗口），
+所有已注册特征在同一次遍历中以分段归约（np.add.reduceat / np.partition）计算，不再逐月筛选日期、逐因子 groupby。
+
+新增特征:
+    def _my_kernel(seg: Segments) -> np.ndarray:     # 返回每段一个值
+        return seg.mean(seg.col('量比'))
+    register_daily_feature('my_feature', ['量比'], _my_kernel)
+"""
+import numpy as np
+import pandas as pd
+
+from tools import month_tool
+
+
+class Segments:
+    """
+    按 (code, window) 分段的日数据，提供常用的分段归约
+    Attributes:
+        frame(pd.DataFrame):排序后的日数据 col=['code','window','date']+attr
+        starts(np.ndarray):每段起始行号
+        ids(np.ndarray):每行所属段号
+        codes(np.ndarray):每段的股票代码
+        windows(np.ndarray):每段的窗口月份 YYYYMM
+    """
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        code_id = pd.factorize(frame['code'])[0]
+        window = frame['window'].to_numpy()
+        if len(frame):
+            change = np.empty(len(frame), dtype=bool)
+            change[0] = True
+            change[1:] = (code_id[1:] != code_id[:-1]) | (window[1:] != window[:-1])
+            self.starts = np.flatnonzero(change)
+        else:
+            self.starts = np.zeros(0, dtype=np.int64)
+        self.lengths = np.diff(np.append(self.starts, len(frame)))
+        self.ids = np.repeat(np.arange(len(self.starts)), self.lengths)
+        self.codes = frame['code'].to_numpy()[self.starts]
+        self.windows = window[self.starts]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def col(self, name: str) -> np.ndarray:
+        return self.frame[name].to_numpy(dtype=np.float64)
+
+    def count(self, x: np.ndarray) -> np.ndarray:
+        """
+        每段有效值（非 NaN）个数
+        """
+        return self._reduce(~np.isnan(x)).astype(np.int64)
+
+    def sum(self, x: np.ndarray) -> np.ndarray:
+        """
+        每段有效值之和，无有效值时为 NaN
+        """
+        return np.where(self.count(x) > 0, self._reduce(np.nan_to_num(x, nan=0.0)), np.nan)
+
+    def mean(self, x: np.ndarray) -> np.ndarray:
+        """
+        每段有效值均值
+        """
+        count = self.count(x)
+        total = self._reduce(np.nan_to_num(x, nan=0.0))
+        return np.divide(total, count, out=np.full(len(self), np.nan), where=count > 0)
+
+    def std(self, x: np.ndarray, ddof: int = 1) -> np.ndarray:
+        """
+        每段有效值标准差（两遍法：先求均值再求离差平方和）
+        """
+        count = self.count(x)
+        mean = self.mean(x)
+        dev = np.where(np.isnan(x), 0.0, x - mean[self.ids])
+        ss = self._reduce(dev * dev)
+        var = np.divide(ss, count - ddof, out=np.full(len(self), np.nan), where=count > ddof)
+        return np.sqrt(var)
+
+    def last(self, x: np.ndarray) -> np.ndarray:
+        """
+        每段最后一行的值（可能为 NaN）
+        """
+        if not len(self):
+            return np.zeros(0)
+        return x[self.starts + self.lengths - 1]
+
+    def topk_mean(self, x: np.ndarray, k: int) -> np.ndarray:
+        """
+        每段最大的 k 个有效值的均值（有效值不足 k 个时取全部）
+        """
+        if not len(self):
+            return np.zeros(0)
+        width = int(self.lengths.max())
+        pos = np.arange(len(x)) - self.starts[self.ids]
+        mat = np.full((len(self), width), -np.inf)
+        mat[self.ids, pos] = np.where(np.isnan(x), -np.inf, x)
+        if width > k:
+            mat = np.partition(mat, width - k, axis=1)[:, width - k:]
+        valid = np.isfinite(mat)
+        count = valid.sum(axis=1)
+        total = np.where(valid, mat, 0.0).sum(axis=1)
+        return np.divide(total, count, out=np.full(len(self), np.nan), where=count > 0)
+
+    def _reduce(self, x: np.ndarray) -> np.ndarray:
+        if not len(self):
+            return np.zeros(0)
+        return np.add.reduceat(x, self.starts)
+
+
+class DailyFeature:
+    """
+    日频特征声明
+    Attributes:
+        name(str):特征名称
+        attr(list):所需 每日指标 列
+        kernel(callable):Segments -> ndarray(段数)
+    """
+    def __init__(self, name: str, attr: list, kernel):
+        self.name = name
+        self.attr = list(attr)
+        self.kernel = kernel
+
+
+# 特征名 -> DailyFeature
+DAILY_FEATURES = {}
+
+
+def register_daily_feature(name: str, attr: list, kernel):
+    """
+    注册日频特征，同名特征会被覆盖
+    """
+    DAILY_FEATURES[name] = DailyFeature(name, attr, kernel)
+    return DAILY_FEATURES[name]
+
+
+def _vol_kernel(seg: Segments) -> np.ndarray:
+    return seg.std(seg.col('涨跌幅'))
+
+
+def _max_kernel(seg: Segments) -> np.ndarray:
+    return seg.topk_mean(seg.col('涨跌幅'), 5)
+
+
+def _ill_kernel(seg: Segments) -> np.ndarray:
+    ret, amount = seg.col('涨跌幅'), seg.col('成交额(千元)')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ill = np.where((amount != 0) & ~np.isnan(ret) & ~np.isnan(amount), np.abs(ret) / amount, np.nan)
+    return seg.mean(ill)
+
+
+def _pe_last_kernel(seg: Segments) -> np.ndarray:
+    return seg.last(seg.col('市盈率TTM'))
+
+
+def _pb_last_kernel(seg: Segments) -> np.ndarray:
+    return seg.last(seg.col('市净率'))
+
+
+def _turnover_mean_kernel(seg: Segments) -> np.ndarray:
+    return seg.mean(seg.col('换手率(自由流通股)'))
+
+
+register_daily_feature('VOL', ['涨跌幅'], _vol_kernel)                       # 日收益率标准差
+register_daily_feature('MAX', ['涨跌幅'], _max_kernel)                       # 最大5个日收益率均值
+register_daily_feature('ILL', ['涨跌幅', '成交额(千元)'], _ill_kernel)        # |日收益率|/成交额 均值
+register_daily_feature('PE_last', ['市盈率TTM'], _pe_last_kernel)            # 窗口内最后一日 市盈率TTM
+register_daily_feature('PB_last', ['市净率'], _pb_last_kernel)               # 窗口内最后一日 市净率
+register_daily_feature('TO_d', ['换手率(自由流通股)'], _turnover_mean_kernel)  # 日均换手率（自由流通股）
+
+
+def feature_attr(names: list = None) -> list:
+    """
+    指定特征所需的 每日指标 列（并集）
+    """
+    attr = []
+    for n in (list(DAILY_FEATURES) if names is None else names):
+        attr += [a for a in DAILY_FEATURES[n].attr if a not in attr]
+    return attr
+
+
+def extract_monthly(daily: pd.DataFrame, months: list, codes: pd.Index, names: list = None) -> dict:
+    """
+    单次遍历计算月度特征
+    :param daily: 日数据 DataFrame(index=(date, code) 或 col=['date','code']+attr)
+    :param months: 月份列表 YYYYMM，月份 m 使用窗口 [上月01, 当月01]
+    :param codes: 股票代码（输出矩阵的列）
+    :param names: 特征名称列表，默认全部已注册特征
+    :return: {特征名: ndarray(len(months), len(codes))}
+    """
+    names = list(DAILY_FEATURES) if names is None else names
+    seg = Segments(_expand_windows(daily, months, codes))
+
+    # 段 -> 矩阵位置
+    row = pd.Index(months).get_indexer(seg.windows)
+    col = pd.Index(codes).get_indexer(seg.codes)
+    ret = {}
+    for n in names:
+        mat = np.full((len(months), len(codes)), np.nan)
+        mat[row, col] = DAILY_FEATURES[n].kernel(seg)
+        ret[n] = mat
+    return ret
+
+
+"""
+内部函数
+"""
+def _expand_windows(daily: pd.DataFrame, months: list, codes: pd.Index) -> pd.DataFrame:
+    """
+    为每行标记所属窗口月份（每月1日复制一行属于当月窗口），只保留 months 与 codes 内的数据，按 (code, window, date) 排序
+    """
+    if 'date' not in daily.columns:
+        daily = daily.reset_index()
+    daily = daily.loc[daily['code'].isin(codes)]
+    month = daily['date'].str.slice(0, 6)
+    window = pd.Series(month_tool.next_month_array(month.astype(np.int64).to_numpy()).astype(str),
+                       index=daily.index)
+    first = daily['date'].str.slice(6, 8) == '01'
+    daily = pd.concat([daily.assign(window=window),
+                       daily.loc[first].assign(window=month.loc[first])], ignore_index=True)
+    daily = daily.loc[daily['window'].isin(months)]
+    return daily.sort_values(['code', 'window', 'date'], kind='stable', ignore_index=True)
@@ -0,0 +1,75 @@
+"""
+财务数据回溯 -- 当期缺失时依次使用前一期、前两期的数据
+各期数据按期堆叠为 (期数, ...) 数组，一次 argmax 找出每个位置第一个非缺失的期，
+替代逐期筛选剩余股票、重新计算再 to_dict + map 回填。
+
+缺失的定义统一由 zero_missing 决定：NaN 总视为缺失，zero_missing=True 时 0 也视为缺失
+（size/value/F-Score 的财务数据未公告时按 0 处理，ROE/M-Score 只把空值视为缺失）。
+"""
+import numpy as np
+import pandas as pd
+
+from tools import quarter_tool
+
+# 回溯深度：当期 + 前两期
+FALLBACK_DEPTH = 3
+
+
+def is_missing(values: np.ndarray, zero_missing: bool) -> np.ndarray:
+    """
+    :param zero_missing: True 时 0 也视为缺失
+    :return: bool ndarray，与 values 形状相同
+    """
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if zero_missing:
+        missing |= values == 0
+    return missing
+
+
+def coalesce(stack: np.ndarray, zero_missing: bool = False, fill: float = np.nan) -> np.ndarray:
+    """
+    沿第0维取第一个非缺失值
+    :param stack: ndarray(depth, ...)，stack[0] 为当期，stack[k] 为前 k 期
+    :param zero_missing: True 时 0 也视为缺失
+    :param fill: 各期均缺失时的值
+    :return: ndarray(...)
+    """
+    stack = np.asarray(stack, dtype=np.float64)
+    valid = ~is_missing(stack, zero_missing)
+    first = np.argmax(valid, axis=0)
+    value = np.take_along_axis(stack, first[None], axis=0)[0]
+    return np.where(valid.any(axis=0), value, fill)
+
+
+def stack_quarters(codes: pd.Series, date: str, q: str, func, col: str,
+                   depth: int = FALLBACK_DEPTH) -> np.ndarray:
+    """
+    逐期计算并按股票对齐堆叠
+    :param codes: 股票代码（已去重）
+    :param date: 当前日期
+    :param q: 当期 YYYYMMDD
+    :param func: 单期计算函数 (codes, date, q) -> DataFrame(['股票代码', col, ...])
+    :param col: 需要回溯的列
+    :param depth: 回溯深度（含当期）
+    :return: ndarray(depth, len(codes))
+    """
+    stack = np.full((depth, len(codes)), np.nan)
+    for k in range(depth):
+        datas = func(codes, date, q)
+        stack[k] = datas.drop_duplicates('股票代码', keep='last').set_index('股票代码')[col] \
+            .reindex(codes).to_numpy(dtype=np.float64)
+        q = quarter_tool.prev_quarter(q)
+    return stack
+
+
+def coalesce_quarters(codes: pd.Series, date: str, q: str, func, col: str, zero_missing: bool,
+                      fill: float = np.nan, depth: int = FALLBACK_DEPTH) -> pd.DataFrame:
+    """
+    当期 -> 前一期 -> 前两期 依次回溯的单月结果
+    :return: DataFrame(['股票代码', col])，顺序与 codes 相同
+    """
+    stack = stack_quarters(codes, date, q, func, col, depth)
+    datas = codes.to_frame('股票代码').reset_index(drop=True)
+    datas[col] = coalesce(stack, zero_missing, fill)
+    return datas
@@ -0,0 +1,206 @@
+"""
+因子按月指纹 -- 每个 (因子, 月份) 的指纹由计算代码版本和该月实际用到的输入数据切片决定，
+输入数据修正（财报更正、复权因子更新等）或计算代码修改后，重建时只重算指纹变化的月份。
+
+输入切片按因子注册表（registry.FACTOR_REGISTRY）中声明的输入确定：
+    ('monthly', 列)                   该月及之前 window 个月的月线数据
+    ('daily', 列)                     该月窗口 [上月01, 当月01] 内的日数据
+    ('financial', 版本, 列[, 滞后])    该月已公告的当期及回溯期（再加滞后期）财务数据
+切片内每个 (股票, 值) 先哈希为 uint64，再按模 2^64 求和，与行的顺序无关，
+股票列表增加而新股票在该月无数据时指纹不变。
+"""
+import hashlib
+import inspect
+
+import numpy as np
+import pandas as pd
+
+import data_api
+from tools import month_tool, quarter_tool
+from . import daily_features, fallback
+from .panel import PanelInputs, _month_range
+
+
+# 计算代码版本覆盖的包：函数引用到的这些包内的函数、类和模块计入版本（data_api 为输入数据的读取函数）
+VERSION_PACKAGES = ('factors.factor_builder', 'tools', 'data_api')
+
+
+def code_version(*objs) -> str:
+    """
+    计算代码版本：各函数、类及其（递归）引用的包内函数、类、模块源码的哈希（见 VERSION_PACKAGES），
+    只覆盖实际用到的代码：修改 accounting、fallback 等被引用模块或 data_api 的读取函数会改变版本，修改同一文件中无关的函数不会。
+    经对象调用的方法（如 PanelInputs.financial）无法从全局名称找到，其类须显式传入
+    """
+    sources = {}
+    for obj in objs:
+        _collect_sources(obj, sources)
+    h = hashlib.sha1()
+    for key in sorted(sources):
+        h.update(key.encode('utf-8'))
+        h.update(sources[key].encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def month_fingerprints(spec, months: list, inputs: PanelInputs = None, version: str = None) -> dict:
+    """
+    计算各月指纹
+    :param spec: registry.FactorSpec
+    :param months: 月份列表 YYYYMM
+    :param inputs: 预读的输入数据，None 时新建
+    :param version: 计算代码版本，默认为 spec.version()
+    :return: {月份: 指纹}
+    """
+    if not months:
+        return {}
+    inputs = PanelInputs() if inputs is None else inputs
+    version = spec.version() if version is None else version
+    head = f"{spec.name}|{version}|{sorted(spec.kwargs.items())}|{sorted(spec.depends.items())}"
+
+    parts = []  # 每项为 ndarray(len(months), k) uint64
+    monthly = sorted({i[1] for i in spec.inputs if i[0] == 'monthly'})
+    for col in monthly:
+        parts.append(_monthly_slices(inputs, col, months, spec.window))
+    daily = sorted({i[1] for i in spec.inputs if i[0] == 'daily'})
+    if daily:
+        parts.append(_daily_slices(inputs, daily, months))
+    financial = sorted({(i[1], i[2], i[3] if len(i) > 3 else 0) for i in spec.inputs if i[0] == 'financial'})
+    for version_, col, lag in financial:
+        parts.append(_financial_slices(inputs, version_, col, lag, months))
+
+    digest = np.concatenate(parts, axis=1) if parts else np.zeros((len(months), 0), dtype=np.uint64)
+    ret = {}
+    for t, m in enumerate(months):
+        h = hashlib.sha1(head.encode('utf-8'))
+        h.update(digest[t].tobytes())
+        ret[m] = h.hexdigest()[:16]
+    return ret
+
+
+def changed_months(stored: dict, fingerprints: dict) -> list:
+    """
+    指纹与已记录的不同（或未记录）的月份
+    """
+    return [m for m, fp in fingerprints.items() if stored.get(m) != fp]
+
+
+"""
+内部函数
+"""
+def _in_packages(obj) -> bool:
+    name = obj.__name__ if inspect.ismodule(obj) else getattr(obj, '__module__', None) or ''
+    return any(name == p or name.startswith(p + '.') for p in VERSION_PACKAGES)
+
+
+def _source(obj, key: str) -> str:
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return key
+
+
+def _collect_sources(obj, sources: dict):
+    """
+    收集 obj 及其引用的包内函数、类、模块的源码 {名称: 源码}
+    函数按代码对象中用到的全局名称在其模块内解析，经模块取属性（如 data_api.get_monthly_hfq）时解析到该属性；
+    模块取整个文件并继续收集其中定义的函数和类；类取类定义并继续收集各方法
+    """
+    if inspect.ismodule(obj):
+        if obj.__name__ in sources or not _in_packages(obj):
+            return
+        sources[obj.__name__] = _source(obj, obj.__name__)
+        for value in list(vars(obj).values()):
+            if (inspect.isfunction(value) or inspect.isclass(value)) and value.__module__ == obj.__name__:
+                _collect_sources(value, sources)
+        return
+    if not (inspect.isfunction(obj) or inspect.isclass(obj)) or not _in_packages(obj):
+        return
+    key = f"{obj.__module__}.{obj.__qualname__}"
+    if key in sources:
+        return
+    sources[key] = _source(obj, key)
+    if inspect.isclass(obj):
+        for value in vars(obj).values():
+            value = value.fget if isinstance(value, property) else getattr(value, '__func__', value)
+            if inspect.isfunction(value):
+                _collect_sources(value, sources)
+        return
+    codes = [obj.__code__]
+    while codes:
+        code = codes.pop()
+        codes.extend(c for c in code.co_consts if inspect.iscode(c))
+        for name in code.co_names:
+            value = obj.__globals__.get(name)
+            if inspect.ismodule(value) and _in_packages(value):
+                for attr in code.co_names:
+                    member = getattr(value, attr, None)
+                    if inspect.isfunction(member) or inspect.isclass(member) or inspect.ismodule(member):
+                        _collect_sources(member, sources)
+                _collect_sources(value, sources)
+            elif inspect.isfunction(value) or inspect.isclass(value):
+                _collect_sources(value, sources)
+
+
+# 64 位混合常数
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _code_hash(codes) -> np.ndarray:
+    return pd.util.hash_array(np.asarray(codes, dtype=object))
+
+
+def _cell_hash(code_hash: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    (股票, 值) -> uint64，NaN 与其他值可区分
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    values = np.where(values == 0, 0.0, values)  # -0.0 与 0.0 视为相同
+    with np.errstate(over='ignore'):
+        mixed = (values.view(np.uint64) * _MIX) ^ code_hash
+    return pd.util.hash_array(mixed.ravel()).reshape(mixed.shape)
+
+
+def _monthly_slices(inputs: PanelInputs, col: str, months: list, window: int) -> np.ndarray:
+    """
+    :return: ndarray(len(months), window+1)，该月及之前 window 个月各月的行哈希
+    """
+    axis = _month_range(month_tool.prev_month(months[0], window), months[-1])
+    mat = inputs.monthly(col, axis)
+    cells = _cell_hash(_code_hash(inputs.codes)[None, :], mat)
+    rows = np.where(np.isnan(mat), np.uint64(0), cells).sum(axis=1, dtype=np.uint64)
+    index = np.arange(len(months)) + window
+    return np.stack([rows[index - k] for k in range(window + 1)], axis=1)
+
+
+def _daily_slices(inputs: PanelInputs, attr: list, months: list) -> np.ndarray:
+    """
+    :return: ndarray(len(months), 1)，窗口内全部日数据行哈希之和
+    """
+    frame = daily_features._expand_windows(data_api.get_daily_index(attr), months, inputs.codes)
+    rows = pd.util.hash_pandas_object(frame[['code', 'date'] + list(attr)], index=False).to_numpy()
+    window = pd.Index(months).get_indexer(frame['window'])
+    out = np.zeros(len(months), dtype=np.uint64)
+    np.add.at(out, window, rows)
+    return out[:, None]
+
+
+def _financial_slices(inputs: PanelInputs, version: int, col: str, lag: int, months: list) -> np.ndarray:
+    """
+    :return: ndarray(len(months), depth)，各回溯期中该月已公告数据的哈希之和
+    """
+    month_int = np.array(months, dtype=np.int64)
+    current = quarter_tool.current_quarter_array(month_int)
+    code_hash = _code_hash(inputs.codes)
+    out = np.zeros((len(months), fallback.FALLBACK_DEPTH), dtype=np.uint64)
+    for k in range(fallback.FALLBACK_DEPTH):
+        quarters = quarter_tool.prev_quarter_array(current, k + lag)
+        for q in np.unique(quarters):
+            if q < 0:
+                continue
+            rows = quarters == q
+            val, avail = inputs.financial(str(q), col, version)
+            # 按可用月份排序后累加，每个月份取可用月份 <= 该月的前缀和
+            order = np.argsort(avail, kind='stable')
+            cum = np.cumsum(_cell_hash(code_hash, val)[order], dtype=np.uint64)
+            n = np.searchsorted(avail[order], month_int[rows], side='right')
+            out[rows, k] = np.where(n > 0, cum[np.maximum(n - 1, 0)], np.uint64(0))
+    return out
@@ -6,6 +6,7 @@ import pandas as pd
 import numpy as np
 from tools import quarter_tool
 from data_api import get_financial_data
+from . import fallback, accounting
 
 def _compute_fscore(codes:pd.Series, date:str):
     """
@@ -21,31 +22,10 @@ def _compute_fscore(codes:pd.Series, date:str):
 
     # 获取期数
     q = quarter_tool.current_quarter(date)
-    q_1 = quarter_tool.prev_quarter(q)
-    q_2 = quarter_tool.prev_quarter(q_1)
-
-    # 尝试获取当期 F-Score 数据
-    datas = _compute(codes, date, q)
-
-    # 第一次找出未获取到数据的代码
-    remain_codes = datas.loc[datas['F-Score']==0,'股票代码']
-
-    # 尝试获取前期 F-Score 数据
-    datas_1 = _compute(remain_codes, date, q_1)
-
-    # 合并前后数据
-    map = datas_1.set_index('股票代码')['F-Score'].to_dict()
-    datas.loc[datas['F-Score']==0, 'F-Score'] = datas.loc[datas['F-Score']==0, '股票代码'].map(map)
-
-    # 第二次找出未获取到数据的代码
-    remain_codes = datas.loc[datas['F-Score'] == 0, '股票代码']
-
-    # 尝试获取前前期 F-Score 数据
-    datas_2 = _compute(remain_codes, date, q_2)
 
-    # 合并前后数据
-    map = datas_2.set_index('股票代码')['F-Score'].to_dict()
-    datas.loc[datas['F-Score'] == 0, 'F-Score'] = datas.loc[datas['F-Score'] == 0, '股票代码'].map(map)
+    # 当期 -> 前一期 -> 前两期 依次回溯 F-Score 数据（0 或空值视为未获取到，均未获取到时为 0）
+    datas = fallback.coalesce_quarters(codes, date, q, _compute, 'F-Score', zero_missing=True, fill=0)
+    datas['F-Score'] = datas['F-Score'].astype(np.int64)
 
     return datas
 
@@ -103,55 +83,8 @@ def _compute(codes:pd.Series, date:str, q:str):
                              '其中：营业收入_1', '其中：营业成本_1',
                              ]], on='股票代码', how='left').fillna(0)
 
-    # 计算条件
-    # c1
-    ROA = np.where(datas['资产总计_1'] != 0, datas['归属于母公司所有者的净利润'] / datas['资产总计_1'], 0)
-    datas['c1'] = np.where(ROA > 0, 1, 0)
-
-    # c2
-    datas['c2'] = np.where(datas['经营活动产生的现金流量净额'] > 0, 1, 0)
-
-    # c3
-    ROA_1 = np.where(datas['资产总计_2'] != 0, datas['归属于母公司所有者的净利润_1'] / datas['资产总计_2'], 0)
-    datas['c3'] = np.where((ROA != 0) & (ROA_1 != 0) & (ROA > ROA_1), 1, 0)
-
-    # c4
-    CFO_scaled = np.where(datas['资产总计_1'] != 0, datas['经营活动产生的现金流量净额'] / datas['资产总计_1'], 0)
-    datas['c4'] = np.where((CFO_scaled != 0) & (ROA != 0) & (CFO_scaled > ROA), 1, 0)
-
-    # c5
-    LEV = np.where(datas['资产总计'] != 0, datas['非流动负债合计'] / datas['资产总计'], 0)
-    LEV_1 = np.where(datas['资产总计_1'] != 0, datas['非流动负债合计_1'] / datas['资产总计_1'], 0)
-    datas['c5'] = np.where((LEV != 0) & (LEV_1 != 0) & (LEV > LEV_1), 1, 0)
-
-    # c6
-    CurrentRatio = np.where(datas['流动负债合计'] != 0, datas['流动资产合计'] / datas['流动负债合计'], 0)
-    CurrentRatio_1 = np.where(datas['流动负债合计_1'] != 0, datas['流动资产合计_1'] / datas['流动负债合计_1'], 0)
-    datas['c6'] = np.where((CurrentRatio != 0) & (CurrentRatio_1 != 0) & (CurrentRatio > CurrentRatio_1), 1, 0)
-
-    # c7
-    ZGB = datas['总股本']
-    ZGB_1 = datas['总股本_1']
-    datas['c7'] = np.where((ZGB != 0) & (ZGB_1 != 0) & (ZGB <= ZGB_1), 1, 0)
-
-    # c8
-    GrossMargin = np.where(datas['其中：营业收入'] != 0,
-                           (datas['其中：营业收入'] - datas['其中：营业成本']) / datas['其中：营业收入'], 0)
-    GrossMargin_1 = np.where(datas['其中：营业收入_1'] != 0,
-                             (datas['其中：营业收入_1'] - datas['其中：营业成本_1']) / datas['其中：营业收入_1'], 0)
-    datas['c8'] = np.where((GrossMargin != 0) & (GrossMargin_1 != 0) & (GrossMargin > GrossMargin_1), 1, 0)
-
-    # c9
-    AssetTurn = np.where(datas['资产总计'] != 0, datas['其中：营业收入'] / datas['资产总计'], 0)
-    AssetTurn_1 = np.where(datas['资产总计_1'] != 0, datas['其中：营业收入_1'] / datas['资产总计_1'], 0)
-    datas['c9'] = np.where((AssetTurn != 0) & (AssetTurn_1 != 0) & (AssetTurn > AssetTurn_1), 1, 0)
-
-    # 计算 F-Score
-    datas['F-Score'] = (datas['c1'] + datas['c2'] + datas['c3'] +
-                        datas['c4'] + datas['c5'] + datas['c6'] +
-                        datas['c7'] + datas['c8'] + datas['c9'])
-
-    # print(datas[['c1', 'c2', 'c3', 'c4', 'c5', 'c6', 'c7', 'c8', 'c9', 'F-Score']])
+    # 计算 F-Score（见 accounting.fscore）
+    datas['F-Score'] = accounting.fscore(datas)
 
     return datas[['股票代码', 'F-Score']]
 
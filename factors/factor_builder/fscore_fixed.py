@@ -3,9 +3,9 @@ F-Score计算 —— 淘宝数据计算
 """
 
 import pandas as pd
-import numpy as np
 from tools import quarter_tool
 from data_api import get_financial_data
+from . import accounting
 
 def _compute_fscore_fixed(codes:pd.Series, date:str):
     """
@@ -80,55 +80,8 @@ def _compute(codes:pd.Series, date:str, q:str):
                              '其中：营业收入', '其中：营业成本',
                              '其中：营业收入_1', '其中：营业成本_1',
                              ]], on='股票代码', how='left').fillna(0)
-    # 计算条件
-    # c1
-    ROA = np.where(datas['资产总计_1'] != 0, datas['归属于母公司所有者的净利润'] / datas['资产总计_1'], 0)
-    datas['c1'] = np.where(ROA > 0, 1, 0)
-
-    # c2
-    datas['c2'] = np.where(datas['经营活动产生的现金流量净额'] > 0, 1, 0)
-
-    # c3
-    ROA_1 = np.where(datas['资产总计_2'] != 0, datas['归属于母公司所有者的净利润_1'] / datas['资产总计_2'], 0)
-    datas['c3'] = np.where((ROA != 0) & (ROA_1 != 0) & (ROA > ROA_1), 1, 0)
-
-    # c4
-    CFO_scaled = np.where(datas['资产总计_1'] != 0, datas['经营活动产生的现金流量净额'] / datas['资产总计_1'], 0)
-    datas['c4'] = np.where((CFO_scaled != 0) & (ROA != 0) & (CFO_scaled > ROA), 1, 0)
-
-    # c5
-    LEV = np.where(datas['资产总计'] != 0, datas['非流动负债合计'] / datas['资产总计'], 0)
-    LEV_1 = np.where(datas['资产总计_1'] != 0, datas['非流动负债合计_1'] / datas['资产总计_1'], 0)
-    datas['c5'] = np.where((LEV != 0) & (LEV_1 != 0) & (LEV > LEV_1), 1, 0)
-
-    # c6
-    CurrentRatio = np.where(datas['流动负债合计'] != 0, datas['流动资产合计'] / datas['流动负债合计'], 0)
-    CurrentRatio_1 = np.where(datas['流动负债合计_1'] != 0, datas['流动资产合计_1'] / datas['流动负债合计_1'], 0)
-    datas['c6'] = np.where((CurrentRatio != 0) & (CurrentRatio_1 != 0) & (CurrentRatio > CurrentRatio_1), 1, 0)
-
-    # c7
-    ZGB = datas['总股本']
-    ZGB_1 = datas['总股本_1']
-    datas['c7'] = np.where((ZGB != 0) & (ZGB_1 != 0) & (ZGB <= ZGB_1), 1, 0)
-
-    # c8
-    GrossMargin = np.where(datas['其中：营业收入'] != 0,
-                           (datas['其中：营业收入'] - datas['其中：营业成本']) / datas['其中：营业收入'], 0)
-    GrossMargin_1 = np.where(datas['其中：营业收入_1'] != 0,
-                             (datas['其中：营业收入_1'] - datas['其中：营业成本_1']) / datas['其中：营业收入_1'], 0)
-    datas['c8'] = np.where((GrossMargin != 0) & (GrossMargin_1 != 0) & (GrossMargin > GrossMargin_1), 1, 0)
-
-    # c9
-    AssetTurn = np.where(datas['资产总计'] != 0, datas['其中：营业收入'] / datas['资产总计'], 0)
-    AssetTurn_1 = np.where(datas['资产总计_1'] != 0, datas['其中：营业收入_1'] / datas['资产总计_1'], 0)
-    datas['c9'] = np.where((AssetTurn != 0) & (AssetTurn_1 != 0) & (AssetTurn > AssetTurn_1), 1, 0)
-
-    # 计算 F-Score
-    datas['F-Score'] = (datas['c1'] + datas['c2'] + datas['c3'] +
-                        datas['c4'] + datas['c5'] + datas['c6'] +
-                        datas['c7'] + datas['c8'] + datas['c9'])
-
-    # print(datas[['c1', 'c2', 'c3', 'c4', 'c5', 'c6', 'c7', 'c8', 'c9', 'F-Score']])
+    # 计算 F-Score（见 accounting.fscore）
+    datas['F-Score'] = accounting.fscore(datas)
 
     return datas[['股票代码', 'F-Score']]
 
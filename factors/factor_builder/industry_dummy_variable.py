@@ -1,5 +1,6 @@
 """
 计算行业哑变量（固定）
+也可保存为一列整数行业代码（build_industry_codes），回归时按组内去均值吸收行业效应，见 factor_lab.industry
 """
 import pandas as pd
 from data_api import get_stock_list
@@ -83,4 +84,35 @@ def build_industry_dummies_rm():
 
     print(f"[industry] 已保存去共线性的行业哑变量文件：{factors.fpath('industry')}")
     print(f"[industry] 基准行业（已删除）: {base_col}")
-    print(f"[industry] 保留行业列数: {len(ind_cols) - 1}")
\ No newline at end of file
+    print(f"[industry] 保留行业列数: {len(ind_cols) - 1}")
+
+
+def build_industry_codes():
+    """
+    保存整数行业代码 industry_code.csv(col=['code', 'industry_code'])
+    和代码对照表 industry_code_labels.csv(col=['industry_code', 'industry', 'base'])
+    代码顺序与哑变量列顺序相同，基准行业与 build_industry_dummies_rm 删除的行业相同
+    """
+    data = _get_industry_dummies()
+    ind_cols = [c for c in data.columns if c.startswith('ind_')]
+    if not ind_cols:
+        raise ValueError("_get_industry_dummies() 返回结果中未找到行业哑变量列（需以 'ind_' 开头）")
+
+    dummies = data[ind_cols].fillna(0).to_numpy() != 0
+    bad_mask = dummies.sum(axis=1) != 1
+    if bad_mask.any():
+        raise ValueError(
+            "行业哑变量存在异常：每只股票应当恰好属于一个行业。\n"
+            f"异常股票前10个：{data.loc[bad_mask, 'code'].head(10).tolist()}"
+        )
+
+    base_col = data[ind_cols].sum(axis=0).sort_values(ascending=False).index[0]
+    codes = pd.DataFrame({'code': data['code'], 'industry_code': dummies.argmax(axis=1)})
+    labels = pd.DataFrame({'industry_code': range(len(ind_cols)),
+                           'industry': [c[len('ind_'):] for c in ind_cols],
+                           'base': [int(c == base_col) for c in ind_cols]})
+
+    codes.to_csv(factors.fpath('industry_code'), index=False)
+    labels.to_csv(factors.fpath('industry_code_labels'), index=False)
+    print(f"[industry_code] 已保存行业代码文件：{factors.fpath('industry_code')}")
+    print(f"[industry_code] 行业数: {len(ind_cols)}，基准行业: {base_col}")
@@ -0,0 +1,386 @@
+"""
+面板模式因子计算 -- 一次性预读输入数据，向量化计算整个 date × code 因子矩阵
+逐月的 _compute_* 函数保留为参考实现，面板模式的结果与其逐月结果一致。
+
+用法:
+    inputs = PanelInputs(codes)
+    size = compute_panel('size', '201001', '202602', inputs=inputs)    # DataFrame(index=date, col=code)
+    build_factors_panel(['size', 'value', 'EP'], '201001', '202602')     # 写入 factor_store
+"""
+import numpy as np
+import pandas as pd
+
+import data_api
+from factors import factor_store
+from tools import month_tool, quarter_tool
+from . import rolling, daily_features, fallback, accounting
+
+
+class PanelInputs:
+    """
+    面板计算所需的输入数据，按需读取并在实例内复用，多个因子共用同一实例时每种数据只读取一次
+    """
+    def __init__(self, codes: pd.Series = None, monthly_start: str = '19900101'):
+        """
+        :param codes: 股票代码，默认取股票列表全部股票
+        :param monthly_start: 月线数据读取的开始日期 YYYYMMDD，早于此日期的月份视为无数据
+        """
+        if codes is None:
+            codes = data_api.get_stock_list()['股票代码']
+        self.codes = pd.Index(codes.drop_duplicates(keep='first'), name='code')
+        self.monthly_start = monthly_start
+        self._monthly = {}
+        self._daily = {}
+        self._financial = {}
+
+    def monthly(self, col: str, months) -> np.ndarray:
+        """
+        月线后复权数据
+        :param col: 'close' / '换手率'
+        :param months: 月份序列 YYYYMM
+        :return: ndarray(len(months), len(codes))，无数据为 NaN
+        """
+        if not self._monthly:
+            datas = data_api.get_monthly_hfq(self.monthly_start, attr=['日期', '股票代码', '开盘', '收盘', '换手率'])
+            datas = datas.loc[~datas.index.duplicated(keep='last')]
+            for c in ['close', '换手率']:
+                self._monthly[c] = datas[c].unstack('code')
+        mat = self._monthly[col]
+        return mat.reindex(index=pd.Index(months), columns=self.codes).to_numpy(dtype=np.float64)
+
+    def daily_feature(self, name: str, months: list) -> np.ndarray:
+        """
+        日频月度特征（见 daily_features），首次调用时单次遍历日数据计算全部已注册特征
+        :param name: 特征名称
+        :param months: 月份列表 YYYYMM，月份 m 使用窗口 [上月01, 当月01]
+        :return: ndarray(len(months), len(codes))
+        """
+        key = tuple(months)
+        if key not in self._daily or name not in self._daily[key]:
+            daily = data_api.get_daily_index(daily_features.feature_attr())
+            self._daily[key] = daily_features.extract_monthly(daily, months, self.codes)
+        return self._daily[key][name]
+
+    def financial(self, quarter: str, col: str, version: int = 1):
+        """
+        某一期财务数据的一列
+        :param quarter: 期数 YYYYMMDD
+        :param col: 列名
+        :param version: 1 get_financial_data / 2 get_financial_data_v2
+        :return: (值 ndarray(len(codes)), 最早可用月份 ndarray(len(codes)))，
+                 公告日期在 m 月之前（m 月1日之前）的数据在 m 月可用，无数据时可用月份为极大值
+        """
+        key = (quarter, col, version)
+        if key not in self._financial:
+            if version == 1:
+                ret, ann_col = data_api.get_financial_data('99999999', quarter), '财报公告日期'
+            else:
+                ret, ann_col = data_api.get_financial_data_v2('99999999', quarter), '公告日期'
+            ret = ret.set_index('股票代码').reindex(self.codes)
+            ann = ret[ann_col].astype(str).str.slice(0, 6)
+            ann = pd.to_numeric(ann.where(ann.str.fullmatch(r'\d{6}')), errors='coerce')
+            # 公告月份之后的下一个月起可用
+            avail = np.where(ann.isna(), np.iinfo(np.int32).max,
+                             month_tool.next_month_array(ann.fillna(190001).astype(np.int64)))
+            self._financial[key] = (ret[col].to_numpy(dtype=np.float64), avail.astype(np.int64))
+        return self._financial[key]
+
+
+def compute_panel(name: str, start: str, end: str, codes: pd.Series = None,
+                  inputs: PanelInputs = None, **kwargs) -> pd.DataFrame:
+    """
+    面板模式计算因子
+    :param name: 因子名称，须在 PANEL_FACTORS 中
+    :param start: 开始月份 YYYYMM
+    :param end: 结束月份 YYYYMM
+    :param codes: 股票代码，默认取股票列表全部股票（inputs 不为 None 时忽略）
+    :param inputs: 预读的输入数据，多个因子共用时传入同一实例
+    :param kwargs: 传递给因子计算函数的额外参数（如 momentum 的 n, skip）
+    :return: DataFrame(index=date, col=code)
+    """
+    if name not in PANEL_FACTORS:
+        raise KeyError(f"不支持面板模式的因子: {name}")
+    if inputs is None:
+        inputs = PanelInputs(codes)
+    months = _month_range(start, end)
+    values = PANEL_FACTORS[name](inputs, months, **kwargs)
+    return pd.DataFrame(values, index=pd.Index(months, name='date'), columns=inputs.codes)
+
+
+def build_factors_panel(names: list, start: str, end: str, codes: pd.Series = None, export: bool = False,
+                        **kwargs) -> dict:
+    """
+    面板模式构建因子库，结果按月写入 factor_store（与 _build_factor 相同）
+    :param names: 因子名称列表，momentum 可写为 'momentum_n12_s1'
+    :param start: 开始月份 YYYYMM
+    :param end: 结束月份 YYYYMM
+    :param export: 是否另导出 N_T 宽表
+    :return: {因子名: DataFrame(index=date, col=code)}
+    """
+    inputs = PanelInputs(codes)
+    ret = {}
+    for name in names:
+        print(f"面板计算 {name} {start}-{end}")
+        base, extra = _parse_name(name)
+        panel = compute_panel(base, start, end, inputs=inputs, **extra, **kwargs)
+        factor_store.prepare_store(name)
+        for month, row in panel.iterrows():
+            factor_store.write_month(name, month, row.rename(name).rename_axis('code').reset_index())
+        if export:
+            factor_store.export_wide(name)
+        ret[name] = panel
+    return ret
+
+
+"""
+各因子的面板实现 -- (inputs, months, **kwargs) -> ndarray(len(months), len(codes))
+"""
+def _panel_size(inputs: PanelInputs, months: list) -> np.ndarray:
+    shares = _financial_fallback(inputs, months, '自由流通股(股)', version=1, zero_missing=True)
+    size = inputs.monthly('close', _shift(months, 1)) * shares
+    size[~(size > 0)] = np.nan
+    return np.log(size)
+
+
+def _panel_value(inputs: PanelInputs, months: list) -> np.ndarray:
+    bps = _financial_fallback(inputs, months, '每股净资产', version=1, zero_missing=True)
+    value = _safe_div(bps, inputs.monthly('close', _shift(months, 1)))
+    return np.where(value > 0, value, np.nan)
+
+
+def _panel_ROE(inputs: PanelInputs, months: list) -> np.ndarray:
+    return _financial_fallback(inputs, months, '财务指标数据_加权平均净资产收益率', version=2, zero_missing=False)
+
+
+def _panel_turnover(inputs: PanelInputs, months: list) -> np.ndarray:
+    turnover, rows = _monthly_history(inputs, '换手率', months, 1)
+    turnover = rolling.shift(turnover, 1)[rows]
+    return np.where(turnover > 0, turnover, np.nan)
+
+
+def _panel_momentum(inputs: PanelInputs, months: list, n: int = 6, skip: int = 0) -> np.ndarray:
+    # 当月因子取上月收盘相对 n 月前的收益，跳过最近 skip 月
+    close, rows = _monthly_history(inputs, 'close', months, 1 + n)
+    return rolling.lag_ratio(close, 1 + n, 1 + skip)[rows]
+
+
+def _panel_TO(inputs: PanelInputs, months: list) -> np.ndarray:
+    TO = _monthly_mean_12(inputs, months)
+    return np.where(TO > 0, TO, np.nan)
+
+
+def _panel_ABTO(inputs: PanelInputs, months: list, TO: np.ndarray = None) -> np.ndarray:
+    """
+    :param TO: 已计算的 TO 因子矩阵（调度时由依赖传入），None 时现场计算
+    """
+    if TO is None:
+        TO = _panel_TO(inputs, months)
+    return _abto(inputs.daily_feature('TO_d', months), TO)
+
+
+def _abto(TO_d: np.ndarray, TO: np.ndarray) -> np.ndarray:
+    """
+    ABTO = 当月日均换手率 / 过去12个月月换手率均值，两者须为正（分块计算的日频部分也由此合成）
+    """
+    TO_d = np.where(TO_d > 0, TO_d, np.nan)
+    ABTO = _safe_div(TO_d, TO)
+    return np.where(ABTO > 0, ABTO, np.nan)
+
+
+def _panel_VOL(inputs: PanelInputs, months: list) -> np.ndarray:
+    VOL = inputs.daily_feature('VOL', months)
+    return np.where(VOL >= 0, VOL, np.nan)
+
+
+def _panel_MAX(inputs: PanelInputs, months: list) -> np.ndarray:
+    return inputs.daily_feature('MAX', months)
+
+
+def _panel_ILL(inputs: PanelInputs, months: list) -> np.ndarray:
+    ILL = inputs.daily_feature('ILL', months)
+    return np.where(ILL >= 0, ILL, np.nan)
+
+
+def _panel_EP(inputs: PanelInputs, months: list) -> np.ndarray:
+    return _positive_inverse(inputs.daily_feature('PE_last', months))
+
+
+def _panel_BM(inputs: PanelInputs, months: list) -> np.ndarray:
+    return _positive_inverse(inputs.daily_feature('PB_last', months))
+
+
+def _panel_fscore(inputs: PanelInputs, months: list) -> np.ndarray:
+    """
+    F-Score，当期 F-Score 为 0 时依次回溯前一期、前两期
+    """
+    current = quarter_tool.current_quarter_array(np.array(months, dtype=np.int64))
+    stack = np.stack([_fscore_at(inputs, months, quarter_tool.prev_quarter_array(current, k))
+                      for k in range(fallback.FALLBACK_DEPTH)])
+    return fallback.coalesce(stack, zero_missing=True, fill=0).astype(np.int64)
+
+
+def _panel_fscore_fixed(inputs: PanelInputs, months: list) -> np.ndarray:
+    """
+    F-Score_fix，使用固定披露期（fixed_quarter），不回溯
+    """
+    return _fscore_at(inputs, months, quarter_tool.fixed_quarter_array(np.array(months, dtype=np.int64)))
+
+
+def _panel_mscore(inputs: PanelInputs, months: list) -> np.ndarray:
+    """
+    M-Score，当期为空时依次回溯前一期、前两期
+    """
+    current = quarter_tool.current_quarter_array(np.array(months, dtype=np.int64))
+    stack = np.stack([_mscore_at(inputs, months, quarter_tool.prev_quarter_array(current, k))
+                      for k in range(fallback.FALLBACK_DEPTH)])
+    return fallback.coalesce(stack, zero_missing=False)
+
+
+PANEL_FACTORS = {
+    'size': _panel_size,
+    'value': _panel_value,
+    'ROE': _panel_ROE,
+    'turnover': _panel_turnover,
+    'momentum': _panel_momentum,
+    'TO': _panel_TO,
+    'ABTO': _panel_ABTO,
+    'VOL': _panel_VOL,
+    'MAX': _panel_MAX,
+    'ILL': _panel_ILL,
+    'EP': _panel_EP,
+    'BM': _panel_BM,
+    'F-Score': _panel_fscore,
+    'F-Score_fix': _panel_fscore_fixed,
+    'M-Score': _panel_mscore,
+}
+
+
+"""
+内部函数
+"""
+def _month_range(start: str, end: str) -> list:
+    months = []
+    m = start
+    while m <= end:
+        months.append(m)
+        m = month_tool.next_month(m)
+    return months
+
+
+def _shift(months: list, n: int) -> list:
+    """
+    各月份的过去第 n 月
+    """
+    return list(month_tool.prev_month_array(np.array(months, dtype=np.int64), n).astype(str))
+
+
+def _safe_div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    与 tools.safe_div(a, b, None) 相同：除数为0时为 NaN
+    """
+    return np.divide(a, b, out=np.full(np.shape(a), np.nan), where=b != 0)
+
+
+def _financial_fallback(inputs: PanelInputs, months: list, col: str, version: int,
+                        zero_missing: bool) -> np.ndarray:
+    """
+    当期 -> 前一期 -> 前两期 依次回溯的财务数据，各期堆叠后一次取第一个非缺失值（见 fallback.coalesce）
+    :param zero_missing: True 时 0 也视为缺失（size/value），False 时只有空值视为缺失（ROE）
+    :return: ndarray(len(months), len(codes))，各期均缺失时为 NaN
+    """
+    month_int = np.array(months, dtype=np.int64)
+    current = quarter_tool.current_quarter_array(month_int)
+    stack = np.full((fallback.FALLBACK_DEPTH, len(months), len(inputs.codes)), np.nan)
+    for k in range(fallback.FALLBACK_DEPTH):
+        quarters = quarter_tool.prev_quarter_array(current, k)
+        for q in np.unique(quarters):
+            rows = quarters == q
+            val, avail = inputs.financial(str(q), col, version)
+            stack[k, rows] = np.where(avail[None, :] <= month_int[rows, None], val, np.nan)
+    return fallback.coalesce(stack, zero_missing)
+
+
+def _quarter_values(inputs: PanelInputs, months: list, quarters: np.ndarray, col: str):
+    """
+    每个月份取指定期的财务数据（version 1），只取公告日期在该月之前的
+    :param quarters: 每个月份对应的期 ndarray(len(months))，无效期为 -1
+    :return: (值 ndarray(len(months), N)，是否可用 bool ndarray(len(months), N))
+    """
+    month_int = np.array(months, dtype=np.int64)
+    values = np.full((len(months), len(inputs.codes)), np.nan)
+    available = np.zeros((len(months), len(inputs.codes)), dtype=bool)
+    for q in np.unique(quarters):
+        if q < 0:
+            continue
+        rows = quarters == q
+        val, avail = inputs.financial(str(q), col, 1)
+        ok = avail[None, :] <= month_int[rows, None]
+        values[rows] = np.where(ok, val, np.nan)
+        available[rows] = ok
+    return values, available
+
+
+def _fscore_at(inputs: PanelInputs, months: list, quarters: np.ndarray) -> np.ndarray:
+    """
+    以 quarters 为当期计算 F-Score，与逐月计算相同，未公告或空值按 0 处理
+    :return: int ndarray(len(months), N)
+    """
+    x = {}
+    for col, lag in accounting.FSCORE_INPUTS:
+        values, available = _quarter_values(inputs, months, quarter_tool.prev_quarter_array(quarters, lag), col)
+        x[accounting.input_name(col, lag)] = np.where(available, np.nan_to_num(values, nan=0.0), 0.0)
+    return accounting.fscore(x)
+
+
+def _mscore_at(inputs: PanelInputs, months: list, quarters: np.ndarray) -> np.ndarray:
+    """
+    以 quarters 为当期计算 M-Score，与逐月计算相同：
+    当期或前一期已公告的股票，缺失值按 0 处理；两期均未公告的股票为 NaN
+    :return: ndarray(len(months), N)
+    """
+    columns = {}
+    listed = np.zeros((len(months), len(inputs.codes)), dtype=bool)
+    for col, lag in accounting.MSCORE_INPUTS:
+        values, available = _quarter_values(inputs, months, quarter_tool.prev_quarter_array(quarters, lag), col)
+        columns[accounting.input_name(col, lag)] = (values, available)
+        listed |= available
+    x = {name: np.where(listed, np.where(available, np.nan_to_num(values, nan=0.0), 0.0), np.nan)
+         for name, (values, available) in columns.items()}
+    return accounting.mscore(x)
+
+
+def _monthly_mean_12(inputs: PanelInputs, months: list) -> np.ndarray:
+    """
+    过去12个月（t-12 ~ t-1）月换手率的均值
+    """
+    turnover, rows = _monthly_history(inputs, '换手率', months, 12)
+    return rolling.shift(rolling.rolling_mean(turnover, 12, min_periods=1), 1)[rows]
+
+
+def _monthly_history(inputs: PanelInputs, col: str, months: list, history: int):
+    """
+    连续月份轴上的月线矩阵，从 months[0] 之前 history 个月至 months[-1]
+    :return: (ndarray(len(axis), N), months 在轴上的行号)
+    """
+    axis = _month_range(month_tool.prev_month(months[0], history), months[-1])
+    rows = month_tool.month_index_array(np.array(months, dtype=np.int64)) - \
+        month_tool.month_index_array(np.array([axis[0]], dtype=np.int64))
+    return inputs.monthly(col, axis), rows
+
+
+def _positive_inverse(value: np.ndarray) -> np.ndarray:
+    """
+    1/value，value 须为正且有限，否则为 NaN
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where((value > 0) & np.isfinite(value), 1 / value, np.nan)
+
+
+def _parse_name(name: str):
+    """
+    'momentum_n12_s1' -> ('momentum', {'n': 12, 'skip': 1})
+    """
+    if name.startswith('momentum_'):
+        _, n, s = name.split('_')
+        return 'momentum', {'n': int(n[1:]), 'skip': int(s[1:])}
+    return name, {}
@@ -0,0 +1,255 @@
+"""
+因子注册表与调度 -- 各因子声明所需输入、历史窗口和依赖的其他因子，
+调度器统一预读一次输入，按依赖顺序计算，相互独立的因子在进程池中并行计算（子进程共享只读输入）。
+
+用法:
+    build_all_factors('201001', '202602')                      # 全部注册因子
+    build_all_factors('201001', '202602', ['size', 'ABTO'])     # 指定因子（依赖自动加入）
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from factors import factor_store
+from tools import month_tool, quarter_tool
+from . import panel, fallback, accounting, fingerprint
+from .panel import PanelInputs
+from .size import _compute_size
+from .value import _compute_value
+from .ROE import _compute_ROE
+from .turnover import _compute_turnover
+from .TO import _compute_TO
+from .ABTO import _compute_ABTO
+from .VOL import _compute_VOL
+from .MAX import _compute_MAX
+from .ILL import _compute_ILL
+from .EP import _compute_EP
+from .BM import _compute_BM
+from .fscore import _compute_fscore
+from .fscore_fixed import _compute_fscore_fixed
+from .mscore import _compute_mscore
+from .momentum import _compute_momentum
+
+
+class FactorSpec:
+    """
+    因子声明
+    Attributes:
+        name(str):因子名称（即存储名称）
+        func(callable):面板计算函数 (inputs, months, **kwargs) -> ndarray(T, N)
+        inputs(list):所需输入
+                    ('monthly', 列名) 月线后复权，
+                    ('daily', 列名) 每日指标，
+                    ('financial', 版本, 列名) 财务数据（含前两期回溯），
+                    ('financial', 版本, 列名, 滞后期数) 同上，另需再往前 滞后期数 期的数据
+        window(int):需要的月线历史月数（不含当月）
+        depends(dict):依赖的其他因子 {因子名: 传给 func 的参数名}
+        reference(callable):逐月参考实现 (codes, date, **kwargs) -> DataFrame，见 build_factors._build_factor
+        kwargs(dict):传给 func 的额外参数
+    """
+    def __init__(self, name: str, func, inputs: list, window: int = 0,
+                 depends: dict = None, reference=None, **kwargs):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.window = window
+        self.depends = dict(depends or {})
+        self.reference = reference
+        self.kwargs = kwargs
+
+    def version(self) -> str:
+        """
+        计算代码版本（见 fingerprint.code_version）：覆盖面板函数、逐月参考实现、依赖因子的代码，
+        以及面板函数经对象调用的 PanelInputs（含其读取数据的 data_api 函数）；
+        面板计算（build_all_factors）和逐月计算（_build_factor）记录、比较的是同一个版本
+        """
+        funcs = []
+        for name in resolve_order([self.name]) if self.name in FACTOR_REGISTRY else []:
+            spec = FACTOR_REGISTRY[name]
+            funcs += [spec.func] + ([spec.reference] if spec.reference is not None else [])
+        return fingerprint.code_version(*(funcs or [self.func]), PanelInputs)
+
+
+# 因子名 -> FactorSpec
+FACTOR_REGISTRY = {}
+
+
+def register_factor(name: str, func, inputs: list, window: int = 0, depends: dict = None, reference=None,
+                    **kwargs):
+    """
+    注册因子，同名因子会被覆盖
+    """
+    FACTOR_REGISTRY[name] = FactorSpec(name, func, inputs, window, depends, reference, **kwargs)
+    return FACTOR_REGISTRY[name]
+
+
+register_factor('size', panel._panel_size, [('monthly', 'close'), ('financial', 1, '自由流通股(股)')], window=1,
+                reference=_compute_size)
+register_factor('value', panel._panel_value, [('monthly', 'close'), ('financial', 1, '每股净资产')], window=1,
+                reference=_compute_value)
+register_factor('ROE', panel._panel_ROE, [('financial', 2, '财务指标数据_加权平均净资产收益率')],
+                reference=_compute_ROE)
+register_factor('turnover', panel._panel_turnover, [('monthly', '换手率')], window=1,
+                reference=_compute_turnover)
+register_factor('TO', panel._panel_TO, [('monthly', '换手率')], window=12, reference=_compute_TO)
+register_factor('ABTO', panel._panel_ABTO, [('daily', '换手率(自由流通股)')], depends={'TO': 'TO'},
+                reference=_compute_ABTO)
+register_factor('VOL', panel._panel_VOL, [('daily', '涨跌幅')], reference=_compute_VOL)
+register_factor('MAX', panel._panel_MAX, [('daily', '涨跌幅')], reference=_compute_MAX)
+register_factor('ILL', panel._panel_ILL, [('daily', '涨跌幅'), ('daily', '成交额(千元)')], reference=_compute_ILL)
+register_factor('EP', panel._panel_EP, [('daily', '市盈率TTM')], reference=_compute_EP)
+register_factor('BM', panel._panel_BM, [('daily', '市净率')], reference=_compute_BM)
+register_factor('F-Score', panel._panel_fscore,
+                [('financial', 1, c, lag) for c, lag in accounting.FSCORE_INPUTS], reference=_compute_fscore)
+register_factor('F-Score_fix', panel._panel_fscore_fixed,
+                [('financial', 1, c, lag) for c, lag in accounting.FSCORE_INPUTS], reference=_compute_fscore_fixed)
+register_factor('M-Score', panel._panel_mscore,
+                [('financial', 1, c, lag) for c, lag in accounting.MSCORE_INPUTS], reference=_compute_mscore)
+for _n, _skip in [(1, 0), (3, 0), (6, 0), (12, 1)]:
+    register_factor(f"momentum_n{_n}_s{_skip}", panel._panel_momentum, [('monthly', 'close')],
+                    window=_n + 1, reference=_compute_momentum, n=_n, skip=_skip)
+
+
+def resolve_order(names: list) -> list:
+    """
+    按依赖关系排序（依赖在前），依赖的因子自动加入
+    :return: list[因子名]
+    """
+    order = []
+    state = {}  # 0 访问中 / 1 已完成
+
+    def visit(name, path):
+        if name not in FACTOR_REGISTRY:
+            raise KeyError(f"未注册的因子: {name}")
+        if state.get(name) == 1:
+            return
+        if state.get(name) == 0:
+            raise ValueError(f"因子依赖存在环: {' -> '.join(path + [name])}")
+        state[name] = 0
+        for dep in FACTOR_REGISTRY[name].depends:
+            visit(dep, path + [name])
+        state[name] = 1
+        order.append(name)
+
+    for n in names:
+        visit(n, [])
+    return order
+
+
+def build_all_factors(start: str, end: str, names: list = None, codes: pd.Series = None,
+                      workers: int = None, save: bool = True, export: bool = False) -> dict:
+    """
+    调度计算多个因子
+    :param start: 开始月份 YYYYMM
+    :param end: 结束月份 YYYYMM
+    :param names: 因子名称列表，默认全部注册因子
+    :param codes: 股票代码，默认取股票列表全部股票
+    :param workers: 进程数，默认 CPU 核数；<=1 时在当前进程内顺序计算
+    :param save: 是否按月写入 factor_store（同时记录各月输入指纹）
+    :param export: save 时是否另导出 N_T 宽表
+    :return: {因子名: DataFrame(index=date, col=code)}
+    """
+    order = resolve_order(list(FACTOR_REGISTRY) if names is None else names)
+    months = panel._month_range(start, end)
+    inputs = _preload(order, months, codes)
+
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1:
+        results = {}
+        for name in order:
+            print(f"计算 {name}")
+            results[name] = _compute(inputs, FACTOR_REGISTRY[name], months, results)
+    else:
+        results = _run_pool(order, months, inputs, workers)
+
+    ret = {}
+    for name in order:
+        frame = pd.DataFrame(results[name], index=pd.Index(months, name='date'), columns=inputs.codes)
+        if save:
+            factor_store.prepare_store(name)
+            for month, row in frame.iterrows():
+                factor_store.write_month(name, month, row.rename(name).rename_axis('code').reset_index())
+            fingerprints = fingerprint.month_fingerprints(FACTOR_REGISTRY[name], months, inputs)
+            factor_store.write_fingerprints(name, fingerprints)
+            if export:
+                factor_store.export_wide(name)
+        ret[name] = frame
+    return ret
+
+
+"""
+内部函数
+"""
+def _preload(order: list, months: list, codes: pd.Series) -> PanelInputs:
+    """
+    按所有因子声明的输入统一读取一次
+    """
+    specs = [FACTOR_REGISTRY[n] for n in order]
+    window = max([s.window for s in specs] + [0])
+    inputs = PanelInputs(codes, monthly_start=month_tool.prev_month(months[0], window) + '01')
+
+    kinds = {i[0] for s in specs for i in s.inputs}
+    if 'monthly' in kinds:
+        inputs.monthly('close', [])
+    if 'daily' in kinds:
+        # 单次遍历提取全部日频月度特征
+        inputs.daily_feature('VOL', months)
+
+    # 当期及回溯期，再加各输入的滞后期（fixed_quarter 不早于当期前两期，也在此范围内）
+    current = quarter_tool.current_quarter_array(np.array(months, dtype=np.int64))
+    for s in specs:
+        for i in s.inputs:
+            if i[0] == 'financial':
+                lag = i[3] if len(i) > 3 else 0
+                quarters = np.unique(np.concatenate([quarter_tool.prev_quarter_array(current, k + lag)
+                                                     for k in range(fallback.FALLBACK_DEPTH)]))
+                for q in quarters:
+                    inputs.financial(str(q), i[2], i[1])
+    return inputs
+
+
+def _compute(inputs: PanelInputs, spec: FactorSpec, months: list, results: dict) -> np.ndarray:
+    dep_kwargs = {arg: results[dep] for dep, arg in spec.depends.items()}
+    return spec.func(inputs, months, **spec.kwargs, **dep_kwargs)
+
+
+def _run_pool(order: list, months: list, inputs: PanelInputs, workers: int) -> dict:
+    """
+    依赖已完成的因子立即提交，子进程通过 initializer 获得只读输入
+    支持 fork 的平台上子进程直接继承父进程内存，不复制输入；否则每个子进程反序列化一次
+    """
+    results = {}
+    pending = list(order)
+    running = {}
+    context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=min(workers, len(order)), mp_context=context,
+                             initializer=_init_worker, initargs=(inputs,)) as pool:
+        while pending or running:
+            for name in list(pending):
+                spec = FACTOR_REGISTRY[name]
+                if all(dep in results for dep in spec.depends):
+                    deps = {dep: results[dep] for dep in spec.depends}
+                    running[pool.submit(_worker_compute, name, months, deps)] = name
+                    pending.remove(name)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+                print(f"完成 {name}")
+    return results
+
+
+# 子进程中的只读输入
+_worker_inputs = None
+
+
+def _init_worker(inputs: PanelInputs):
+    global _worker_inputs
+    _worker_inputs = inputs
+
+
+def _worker_compute(name: str, months: list, deps: dict) -> np.ndarray:
+    return _compute(_worker_inputs, FACTOR_REGISTRY[name], months, deps)
@@ -0,0 +1,126 @@
+"""
+date × code 矩阵上的滚动窗口计算 -- 沿第0维（时间）计算，所有股票一次完成，复杂度 O(T·N)
+窗口内的 NaN 不参与计算，窗口内有效值个数少于 min_periods 时结果为 NaN。
+"""
+import warnings
+
+import numpy as np
+
+
+def shift(arr: np.ndarray, k: int = 1, fill: float = np.nan) -> np.ndarray:
+    """
+    沿时间滞后 k 期（k 为负时提前），空出的位置填 fill
+    :param arr: ndarray(T, N)
+    :return: ndarray(T, N)，out[t] = arr[t-k]
+    """
+    arr = np.asarray(arr, dtype=np.float64)
+    out = np.full(arr.shape, fill, dtype=np.float64)
+    if k == 0:
+        out[:] = arr
+    elif 0 < k < len(arr):
+        out[k:] = arr[:-k]
+    elif -len(arr) < k < 0:
+        out[:k] = arr[-k:]
+    return out
+
+
+def rolling_count(arr: np.ndarray, window: int) -> np.ndarray:
+    """
+    窗口 [t-window+1, t] 内有效值（非 NaN）个数
+    """
+    return _window_diff(np.cumsum(~np.isnan(arr), axis=0, dtype=np.int64), window)
+
+
+def rolling_sum(arr: np.ndarray, window: int, min_periods: int = 1) -> np.ndarray:
+    """
+    窗口 [t-window+1, t] 内有效值之和
+    """
+    arr = np.asarray(arr, dtype=np.float64)
+    total = _window_diff(np.cumsum(np.nan_to_num(arr, nan=0.0), axis=0), window)
+    count = rolling_count(arr, window)
+    return np.where(count >= max(min_periods, 1), total, np.nan)
+
+
+def rolling_mean(arr: np.ndarray, window: int, min_periods: int = 1) -> np.ndarray:
+    """
+    窗口 [t-window+1, t] 内有效值的均值
+    """
+    arr = np.asarray(arr, dtype=np.float64)
+    total = _window_diff(np.cumsum(np.nan_to_num(arr, nan=0.0), axis=0), window)
+    count = rolling_count(arr, window)
+    return np.divide(total, count, out=np.full(total.shape, np.nan),
+                     where=count >= max(min_periods, 1))
+
+
+def rolling_std(arr: np.ndarray, window: int, min_periods: int = 2, ddof: int = 1) -> np.ndarray:
+    """
+    窗口 [t-window+1, t] 内有效值的标准差
+    先减去每列均值再累加平方和，减小大数相消的误差
+    """
+    arr = np.asarray(arr, dtype=np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全 NaN 列
+        center = np.nan_to_num(np.nanmean(arr, axis=0), nan=0.0) if len(arr) else 0.0
+    arr = arr - center
+    count = rolling_count(arr, window)
+    total = _window_diff(np.cumsum(np.nan_to_num(arr, nan=0.0), axis=0), window)
+    square = _window_diff(np.cumsum(np.nan_to_num(arr * arr, nan=0.0), axis=0), window)
+    ok = count >= max(min_periods, ddof + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var = (square - total * total / count) / (count - ddof)
+    return np.where(ok, np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+
+def rolling_max(arr: np.ndarray, window: int, min_periods: int = 1) -> np.ndarray:
+    """
+    窗口 [t-window+1, t] 内有效值的最大值
+    """
+    return _window_reduce(arr, window, min_periods, np.nanmax)
+
+
+def rolling_min(arr: np.ndarray, window: int, min_periods: int = 1) -> np.ndarray:
+    """
+    窗口 [t-window+1, t] 内有效值的最小值
+    """
+    return _window_reduce(arr, window, min_periods, np.nanmin)
+
+
+def lag_ratio(arr: np.ndarray, n: int, skip: int = 0) -> np.ndarray:
+    """
+    动量类收益率 arr[t-skip] / arr[t-n] - 1，分母为 0 或任一端缺失时为 NaN
+    :param n: 起点滞后期数
+    :param skip: 终点滞后期数（跳过最近 skip 期）
+    """
+    start = shift(arr, n)
+    end = shift(arr, skip)
+    return np.divide(end, start, out=np.full(start.shape, np.nan), where=start != 0) - 1
+
+
+"""
+内部函数
+"""
+def _window_diff(cum: np.ndarray, window: int) -> np.ndarray:
+    """
+    由前缀和求窗口和：cum[t] - cum[t-window]
+    """
+    if window <= 0:
+        raise ValueError(f"window 必须为正整数: {window}")
+    out = cum.copy()
+    if window < len(cum):
+        out[window:] = cum[window:] - cum[:-window]
+    return out
+
+
+def _window_reduce(arr: np.ndarray, window: int, min_periods: int, func) -> np.ndarray:
+    """
+    无法由前缀和求得的窗口统计（最大、最小），在窗口视图上沿窗口维归约
+    """
+    if window <= 0:
+        raise ValueError(f"window 必须为正整数: {window}")
+    arr = np.asarray(arr, dtype=np.float64)
+    padded = np.concatenate([np.full((window - 1,) + arr.shape[1:], np.nan), arr])
+    view = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全 NaN 窗口
+        out = func(view, axis=-1)
+    return np.where(rolling_count(arr, window) >= max(min_periods, 1), out, np.nan)
@@ -6,6 +6,7 @@ import pandas as pd
 import numpy as np
 from tools import quarter_tool, month_tool, safe_div
 from data_api import get_financial_data, get_monthly_hfq
+from . import fallback
 
 def _compute_value(codes:pd.Series, date:str):
     """
@@ -19,31 +20,9 @@ def _compute_value(codes:pd.Series, date:str):
 
     # 获取期数
     q = quarter_tool.current_quarter(date)
-    q_1 = quarter_tool.prev_quarter(q)
-    q_2 = quarter_tool.prev_quarter(q_1)
 
-    # 尝试获取当期 财务 数据
-    datas = _compute(codes, date, q)
-
-    # 第一次找出未获取到数据的代码
-    remain_codes = datas.loc[datas['每股净资产']==0,'股票代码']
-
-    # 尝试获取前期 财务 数据
-    datas_1 = _compute(remain_codes, date, q_1)
-
-    # 合并前后数据
-    map = datas_1.set_index('股票代码')['每股净资产'].to_dict()
-    datas.loc[datas['每股净资产']==0, '每股净资产'] = datas.loc[datas['每股净资产']==0, '股票代码'].map(map)
-
-    # 第二次找出未获取到数据的代码
-    remain_codes = datas.loc[datas['每股净资产'] == 0, '股票代码']
-
-    # 尝试获取前前期 财务 数据
-    datas_2 = _compute(remain_codes, date, q_2)
-
-    # 合并前后数据
-    map = datas_2.set_index('股票代码')['每股净资产'].to_dict()
-    datas.loc[datas['每股净资产'] == 0, '每股净资产'] = datas.loc[datas['每股净资产'] == 0, '股票代码'].map(map)
+    # 当期 -> 前一期 -> 前两期 依次回溯 财务 数据（0 或空值视为未获取到）
+    datas = fallback.coalesce_quarters(codes, date, q, _compute, '每股净资产', zero_missing=True)
 
     # 获取上一月价格
     m = month_tool.prev_month(date,1)
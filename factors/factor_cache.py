@@ -0,0 +1,108 @@
+"""
+Factor 处理结果的磁盘缓存 -- factor_data/_cache/{name}-{key}.parquet
+key 由处理参数（dshape、standardize 及标准化方法和参数）与源数据签名（CSV 文件或按月分区存储的修改时间与大小）决定，
+源数据或参数变化后自动失效；同一因子可同时缓存原始数据和多种标准化结果，源数据变化后旧签名的缓存被删除。
+列式格式需要 pyarrow 或 fastparquet，均未安装时退化为 pickle。
+"""
+import hashlib
+import importlib.util
+import os
+
+import pandas as pd
+
+from factors import factor_store
+
+current_file_path = os.path.dirname(os.path.abspath(__file__))
+CACHE_ROOT = current_file_path + "/factor_data/_cache/"
+
+# 处理逻辑（Factor._init_data / _standardize）变化时递增，使旧缓存失效
+CACHE_VERSION = 2
+
+_PARQUET = any(importlib.util.find_spec(m) is not None for m in ('pyarrow', 'fastparquet'))
+_EXT = '.parquet' if _PARQUET else '.pkl'
+
+
+def source_signature(name: str, csv_path: str) -> tuple:
+    """
+    源数据签名：按月分区存储时为各月文件的 (数量, 最大修改时间, 总大小)，否则为 CSV 的 (修改时间, 大小)
+    :return: tuple，源数据不存在时为 None
+    """
+    if factor_store.has_store(name):
+        path = factor_store.spath(name)
+        stats = [os.stat(path + f"{m}.csv") for m in factor_store.store_months(name)]
+        return ('store', len(stats), max(s.st_mtime_ns for s in stats), sum(s.st_size for s in stats))
+    if not os.path.exists(csv_path):
+        return None
+    st = os.stat(csv_path)
+    return ('csv', st.st_mtime_ns, st.st_size)
+
+
+def cache_key(signature: tuple, **params) -> str:
+    """
+    :param signature: source_signature 的结果
+    :param params: 处理参数
+    :return: 参数哈希8位 + 源数据签名哈希8位
+    """
+    params_text = repr((CACHE_VERSION, sorted(params.items())))
+    return _hash(params_text) + _hash(repr(signature))
+
+
+def read_cache(name: str, key: str) -> pd.DataFrame:
+    """
+    :return: 缓存的 DataFrame(index=(code, date), col=[...])，不存在或损坏时为 None
+    """
+    file = _cache_file(name, key)
+    if not os.path.exists(file):
+        return None
+    try:
+        return pd.read_parquet(file) if _PARQUET else pd.read_pickle(file)
+    except Exception:
+        return None
+
+
+def write_cache(name: str, key: str, data: pd.DataFrame):
+    """
+    写入缓存并删除该因子源数据签名不同（已过期）的缓存，目录不可写时忽略
+    """
+    file = _cache_file(name, key)
+    try:
+        os.makedirs(CACHE_ROOT, exist_ok=True)
+        if _PARQUET:
+            data.to_parquet(file + '.tmp')
+        else:
+            data.to_pickle(file + '.tmp')
+        os.replace(file + '.tmp', file)
+        for f in os.listdir(CACHE_ROOT):
+            if _is_cache_of(f, name) and not f[:-len(_EXT)].endswith(key[8:]):
+                os.remove(CACHE_ROOT + f)
+    except OSError:
+        pass
+
+
+def clear_cache(name: str = None):
+    """
+    删除缓存
+    :param name: 因子名称，None 删除全部
+    """
+    if not os.path.isdir(CACHE_ROOT):
+        return
+    for f in os.listdir(CACHE_ROOT):
+        if name is None or _is_cache_of(f, name):
+            os.remove(CACHE_ROOT + f)
+
+
+"""
+内部函数
+"""
+def _hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]
+
+
+def _cache_file(name: str, key: str) -> str:
+    return CACHE_ROOT + f"{name}-{key}{_EXT}"
+
+
+def _is_cache_of(file: str, name: str) -> bool:
+    # {name}-{16位key}{扩展名}，因子名本身可能含 '-'
+    stem = file[:-len(_EXT)] if file.endswith(_EXT) else None
+    return stem is not None and len(stem) == len(name) + 17 and stem.startswith(name + '-')
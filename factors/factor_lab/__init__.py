@@ -3,9 +3,14 @@ from .regress import ols_regress, wls_regress
 from .predict import predict
 from .solve import mvw, mvw2
 from .pipeline import revenue, risk
+from .neutralize import neutralize, residualize
+from .expression import parse, ExpressionEngine, register_operator, register_variable
 
 __all__ = ['concat',    # 合并多个Factor对象
            'ols_regress', 'wls_regress', # 回归方法
            'predict', # 预测收益（仅内部函数revenue调用）
            'mvw', 'mvw2', # 均值-方差权重求解
-           'revenue', 'risk'] # 预测收益率和风险
\ No newline at end of file
+           'revenue', 'risk', # 预测收益率和风险
+           'neutralize', 'residualize', # 行业、市值中性化
+           'parse', 'ExpressionEngine', # 因子表达式解析与计算
+           'register_operator', 'register_variable'] # 注册表达式算子、变量
\ No newline at end of file
@@ -1,37 +1,98 @@
+import numpy as np
 import pandas as pd
-from factors import Factor
+from factors import Factor, precision
 
 def concat(vals:list[Factor]):
     """
     变量合并
+    各变量按共同的整数 code/date 轴对齐，取全部变量都有值的 (code, date) 行，
+    写入预分配的数组（浮点类型见 precision），只构建一次索引，不再逐个 join
     :param vals: 需要合并的变量列表
-    :return: 合并后的DataFrame
+    :return: 合并后的DataFrame(index=(code, date), col=[各变量的列])，行按 code × date 的顺序排列
     """
     # 1.提取code和date
-    code_index = pd.DataFrame(columns=[])
-    date_index = pd.DataFrame(columns=[])
+    code_index = []
+    date_index = []
     for val in vals:
         if val.get_dshape()=='NT_K':
-            code_index = val.get_data().index.get_level_values('code').unique().tolist()
-            date_index = val.get_data().index.get_level_values('date').unique().tolist()
+            code_index = val.get_code_index().tolist()
+            date_index = val.get_date_index().tolist()
         elif val.get_dshape()=='N_K':
-            code_index = val.get_data().index.get_level_values('code').unique().tolist()
+            code_index = val.get_code_index().tolist()
         elif val.get_dshape()=='T_K':
-            date_index = val.get_data().index.get_level_values('date').unique().tolist()
+            date_index = val.get_date_index().tolist()
         if len(code_index)>0 and len(date_index)>0:
             break
-    multi_index = pd.MultiIndex.from_product([code_index, date_index], names=['code', 'date'])
-    ret = pd.DataFrame(index=multi_index)
+    codes = pd.Index(code_index, name='code')
+    dates = pd.Index(date_index, name='date')
+    n_codes, n_dates = len(codes), len(dates)
 
-    # 2.合并
+    columns = [c for val in vals for c in val.get_data(copy=False).columns]
+    overlap = pd.Index(columns)[pd.Index(columns).duplicated()]
+    if len(overlap) > 0:
+        raise ValueError(f"columns overlap but no suffix specified: {list(overlap.unique())}")
+
+    # 2.各变量在 code × date 网格上的位置，网格上全部变量都有值的格子为结果行
+    positions = []
+    present = np.ones(n_codes * n_dates, dtype=bool)
     for val in vals:
-        df = val.get_data()
+        df = val.get_data(copy=False)
+        ci = _positions(df.index, 'code', codes)
+        di = _positions(df.index, 'date', dates)
+        mask = np.zeros(n_codes * n_dates, dtype=bool)
         if val.get_dshape()=='NT_K':
-            ret = ret.join(df, how='inner')
+            ok = (ci >= 0) & (di >= 0)
+            flat = ci[ok] * n_dates + di[ok]
+            mask[flat] = True
         elif val.get_dshape()=='N_K':
-            df = df.xs('all', level='date')
-            ret = ret.join(df, on='code', how='inner')
+            ok = ci >= 0
+            flat = ci[ok]
+            mask.reshape(n_codes, n_dates)[flat, :] = True
         elif val.get_dshape()=='T_K':
-            df = df.xs('all', level='code')
-            ret = ret.join(df, on='date', how='inner')
-    return ret
+            ok = di >= 0
+            flat = di[ok]
+            mask.reshape(n_codes, n_dates)[:, flat] = True
+        else:
+            continue
+        present &= mask
+        positions.append((val, df, ok, flat))
+
+    rows = np.flatnonzero(present)
+    row_code, row_date = np.divmod(rows, n_dates)
+
+    # 3.填充预分配数组（按列连续存放，构建 DataFrame 时不再转置复制）
+    out = np.empty((len(columns), len(rows)), dtype=precision.dtype())
+    j = 0
+    for val, df, ok, flat in positions:
+        values = np.ascontiguousarray(df.to_numpy(dtype=out.dtype)[ok].T)
+        if val.get_dshape()=='NT_K':
+            lookup = np.full(n_codes * n_dates, -1, dtype=np.int64)
+            lookup[flat] = np.arange(len(flat))
+            take = lookup[rows]
+        elif val.get_dshape()=='N_K':
+            lookup = np.full(n_codes, -1, dtype=np.int64)
+            lookup[flat] = np.arange(len(flat))
+            take = lookup[row_code]
+        else:
+            lookup = np.full(n_dates, -1, dtype=np.int64)
+            lookup[flat] = np.arange(len(flat))
+            take = lookup[row_date]
+        np.take(values, take, axis=1, out=out[j:j + values.shape[0]])
+        j += values.shape[0]
+
+    index = pd.MultiIndex(levels=[codes, dates], codes=[row_code, row_date], names=['code', 'date'],
+                          verify_integrity=False)
+    return pd.DataFrame(out.T, index=index, columns=columns, copy=False)
+
+
+"""
+内部函数
+"""
+def _positions(index: pd.MultiIndex, level: str, axis: pd.Index) -> np.ndarray:
+    """
+    各行在 axis 上的位置（不存在为 -1），只对索引层的取值查找一次，再按层编码展开
+    """
+    i = index.names.index(level)
+    level_pos = axis.get_indexer(index.levels[i])
+    level_codes = index.codes[i]
+    return np.where(level_codes >= 0, level_pos[level_codes], -1)
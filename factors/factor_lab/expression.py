@@ -0,0 +1,452 @@
+"""
+因子表达式 -- 用一行表达式定义因子，解析为表达式树后在 date × code 面板上以 NumPy 向量化计算
+
+    engine = ExpressionEngine('201501', '202512')
+    x = engine.evaluate("rank(ts_mean(turnover, 12)) / ts_std(ret, 6)")   # DataFrame(index=date, col=code)
+    engine.save('my_alpha', "-zscore(delta(close, 3) / delay(close, 3))")  # 写入 factor_store，之后 Factor('my_alpha', 'N_T') 可读
+
+语法：数字、变量（标识符，或用引号括起的任意名称如 'F-Score'）、函数调用、+ - * /、一元负号和括号。
+结构相同的子表达式哈希相同（加法、乘法的操作数不分先后），同一引擎内只计算一次并按节点哈希缓存，
+因此多个表达式共用的部分（如 ts_mean(turnover, 12)）在一批试验中只算一次。
+
+变量（见 VARIABLES）：close 月线后复权收盘价、turnover 月换手率、ret 月收益率、
+日频月度特征（VOL、MAX、ILL、TO_d、PE_last、PB_last 等，见 factor_builder.daily_features），
+以及已存储的任意因子（factor_store 或 factor_data 下的 N_T 宽表）。
+所有变量按时点对齐：m 月的值只用 m-1 月及以前的数据（close、turnover、ret 为上月的值，
+日频特征取 [上月01, 当月01] 窗口，已存储因子本身已滞后），不含 m 月收益。
+"""
+import hashlib
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import factors
+from factors import factor_store
+from factors.factor_builder import rolling, daily_features
+from factors.factor_builder.panel import PanelInputs, _month_range, _shift
+from tools import month_tool
+
+
+class Node:
+    """
+    表达式树节点
+    Attributes:
+        op(str):'const' 常数 / 'var' 变量 / 其他为算子名称
+        args(tuple):子节点
+        value:常数值或变量名
+        key(str):规范化的表达式文本，结构相同的表达式 key 相同
+        hash(str):key 的哈希，用作缓存键
+    """
+    def __init__(self, op: str, args: tuple = (), value=None):
+        self.op = op
+        self.args = tuple(args)
+        self.value = value
+        if op == 'const':
+            self.key = repr(float(value))
+        elif op == 'var':
+            self.key = f"${value}"
+        else:
+            keys = [a.key for a in self.args]
+            if op in COMMUTATIVE:
+                keys = sorted(keys)
+            self.key = f"{op}({','.join(keys)})"
+        self.hash = hashlib.sha1(self.key.encode('utf-8')).hexdigest()[:16]
+
+    def __repr__(self):
+        return f"Node({self.key})"
+
+    def walk(self):
+        """
+        遍历所有子节点（去重，子节点在前）
+        """
+        seen = {}
+
+        def visit(node):
+            if node.hash in seen:
+                return
+            for a in node.args:
+                visit(a)
+            seen[node.hash] = node
+
+        visit(self)
+        return list(seen.values())
+
+
+class Operator:
+    """
+    算子声明
+    Attributes:
+        func(callable):(*面板, *参数) -> ndarray(T, N)
+        n_inputs(int):面板输入个数
+        n_params(int):常数参数个数（写在面板输入之后，须为数字）
+        lookback(callable):参数 -> 需要的历史期数，None 表示不需要历史
+    """
+    def __init__(self, func, n_inputs: int, n_params: int = 0, lookback=None):
+        self.func = func
+        self.n_inputs = n_inputs
+        self.n_params = n_params
+        self.lookback = lookback
+
+
+# 算子名 -> Operator
+OPERATORS = {}
+
+# 变量名 -> 计算函数 (inputs, months) -> ndarray(len(months), N)
+VARIABLES = {}
+
+# 可交换的二元算子，规范化时操作数排序
+COMMUTATIVE = {'add', 'mul'}
+
+
+def register_operator(name: str, func, n_inputs: int, n_params: int = 0, lookback=None):
+    """
+    注册算子，同名算子会被覆盖
+    """
+    OPERATORS[name] = Operator(func, n_inputs, n_params, lookback)
+    return OPERATORS[name]
+
+
+def register_variable(name: str, func, lookback: int = 0):
+    """
+    注册变量，同名变量会被覆盖
+    :param func: (inputs, months) -> ndarray(len(months), N)
+    :param lookback: 计算该变量需要的历史月数
+    """
+    VARIABLES[name] = (func, lookback)
+
+
+def parse(expr: str) -> Node:
+    """
+    解析表达式
+    :return: 表达式树根节点
+    """
+    return _Parser(expr).parse()
+
+
+class ExpressionEngine:
+    """
+    表达式计算引擎，一个引擎对应固定的月份区间和股票，节点结果在引擎内按哈希缓存
+    """
+    def __init__(self, start: str, end: str, codes: pd.Series = None, inputs: PanelInputs = None,
+                 history: int = 12):
+        """
+        :param start: 开始月份 YYYYMM
+        :param end: 结束月份 YYYYMM
+        :param codes: 股票代码，默认取股票列表全部股票（inputs 不为 None 时忽略）
+        :param inputs: 预读的输入数据，与 factor_builder 的面板计算共用时传入
+        :param history: start 之前预留的月数，表达式需要更长历史时自动扩展
+        """
+        self.start = start
+        self.end = end
+        self.months = _month_range(start, end)
+        self.inputs = inputs if inputs is not None else PanelInputs(codes)
+        self.codes = self.inputs.codes
+        self.history = 0
+        self._cache = {}
+        self._set_history(history)
+
+    def evaluate(self, expr) -> pd.DataFrame:
+        """
+        计算表达式
+        :param expr: 表达式文本或 Node
+        :return: DataFrame(index=date, col=code)，date 为 [start, end] 内的月份
+        """
+        node = parse(expr) if isinstance(expr, str) else expr
+        need = _lookback(node)
+        if need > self.history:
+            self._set_history(need)
+        values = np.array(self._eval(node)[self.history:])  # 复制，调用方修改结果不影响缓存
+        return pd.DataFrame(values, index=pd.Index(self.months, name='date'), columns=self.codes)
+
+    def evaluate_many(self, exprs: dict) -> dict:
+        """
+        批量计算，共同的子表达式只计算一次
+        :param exprs: {名称: 表达式}
+        :return: {名称: DataFrame(index=date, col=code)}
+        """
+        nodes = {name: parse(e) if isinstance(e, str) else e for name, e in exprs.items()}
+        need = max([_lookback(n) for n in nodes.values()] + [0])
+        if need > self.history:
+            self._set_history(need)
+        return {name: self.evaluate(n) for name, n in nodes.items()}
+
+    def save(self, name: str, expr, export: bool = False) -> pd.DataFrame:
+        """
+        计算表达式并按月写入 factor_store（与 factor_builder 的构建相同：先由已有的 N_T 宽表初始化存储），
+        之后可用 Factor(name, 'N_T') 读取
+        :param export: 是否另导出 N_T 宽表 factor_data/{name}.csv
+        """
+        frame = self.evaluate(expr)
+        factor_store.prepare_store(name)
+        for month, row in frame.iterrows():
+            factor_store.write_month(name, month, row.rename(name).rename_axis('code').reset_index())
+        if export:
+            factor_store.export_wide(name)
+        return frame
+
+    def cache_info(self) -> dict:
+        """
+        :return: {'nodes': 缓存的节点数, 'bytes': 占用字节数}
+        """
+        return {'nodes': len(self._cache), 'bytes': int(sum(v.nbytes for v in self._cache.values()))}
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def _set_history(self, history: int):
+        """
+        扩展计算轴（start 之前 history 个月至 end），已缓存结果的轴不同，全部作废
+        """
+        self.history = history
+        self.axis = _month_range(month_tool.prev_month(self.start, history), self.end) if history else self.months
+        self._cache.clear()
+
+    def _eval(self, node: Node) -> np.ndarray:
+        # 子节点在前依次计算，结构相同的节点只算一次；常数保存为标量，参与计算时广播
+        shape = (len(self.axis), len(self.codes))
+        for n in node.walk():
+            if n.hash in self._cache:
+                continue
+            if n.op == 'const':
+                value = np.float64(n.value)
+            elif n.op == 'var':
+                value = _variable(self.inputs, n.value, self.axis)
+            else:
+                op = OPERATORS[n.op]
+                panels = [np.broadcast_to(self._cache[a.hash], shape) for a in n.args[:op.n_inputs]]
+                params = [a.value for a in n.args[op.n_inputs:]]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    value = np.asarray(op.func(*panels, *params), dtype=np.float64)
+            self._cache[n.hash] = value
+        return np.broadcast_to(self._cache[node.hash], shape)
+
+
+def evaluate(expr, start: str, end: str, codes: pd.Series = None) -> pd.DataFrame:
+    """
+    计算单个表达式（不保留缓存）
+    """
+    return ExpressionEngine(start, end, codes).evaluate(expr)
+
+
+"""
+内置算子
+"""
+def _div(a, b):
+    return np.divide(a, b, out=np.full(np.broadcast(a, b).shape, np.nan), where=b != 0)
+
+
+def _log(x):
+    return np.where(x > 0, np.log(np.where(x > 0, x, 1.0)), np.nan)
+
+
+def _rank(x):
+    # 截面百分位排名，NaN 不参与
+    return pd.DataFrame(x).rank(axis=1, pct=True).to_numpy(dtype=np.float64)
+
+
+def _zscore(x):
+    # 截面标准化，标准差不大于0时为0
+    count = np.sum(~np.isnan(x), axis=1, keepdims=True)
+    mean = np.nanmean(np.where(count > 0, x, 0.0), axis=1, keepdims=True)
+    std = np.nanstd(np.where(count > 1, x, 0.0), axis=1, ddof=1, keepdims=True)
+    return np.where(std > 0, (x - mean) / np.where(std > 0, std, 1.0), np.where(np.isnan(x), np.nan, 0.0))
+
+
+def _demean(x):
+    count = np.sum(~np.isnan(x), axis=1, keepdims=True)
+    return x - np.nanmean(np.where(count > 0, x, 0.0), axis=1, keepdims=True)
+
+
+def _window(n) -> int:
+    if n != int(n) or n <= 0:
+        raise ValueError(f"窗口须为正整数: {n}")
+    return int(n)
+
+
+def _lag(n) -> int:
+    # 负数会读取未来的数据
+    if n != int(n) or n < 0:
+        raise ValueError(f"滞后期数须为非负整数: {n}")
+    return int(n)
+
+
+register_operator('add', np.add, 2)
+register_operator('sub', np.subtract, 2)
+register_operator('mul', np.multiply, 2)
+register_operator('div', _div, 2)
+register_operator('neg', np.negative, 1)
+register_operator('abs', np.abs, 1)
+register_operator('sign', np.sign, 1)
+register_operator('log', _log, 1)
+register_operator('max', np.fmax, 2)
+register_operator('min', np.fmin, 2)
+register_operator('rank', _rank, 1)
+register_operator('zscore', _zscore, 1)
+register_operator('demean', _demean, 1)
+register_operator('delay', lambda x, n: rolling.shift(x, _lag(n)), 1, 1, _lag)
+register_operator('delta', lambda x, n: x - rolling.shift(x, _lag(n)), 1, 1, _lag)
+register_operator('ts_sum', lambda x, n: rolling.rolling_sum(x, _window(n)), 1, 1, lambda n: _window(n) - 1)
+register_operator('ts_mean', lambda x, n: rolling.rolling_mean(x, _window(n)), 1, 1, lambda n: _window(n) - 1)
+register_operator('ts_std', lambda x, n: rolling.rolling_std(x, _window(n)), 1, 1, lambda n: _window(n) - 1)
+register_operator('ts_max', lambda x, n: rolling.rolling_max(x, _window(n)), 1, 1, lambda n: _window(n) - 1)
+register_operator('ts_min', lambda x, n: rolling.rolling_min(x, _window(n)), 1, 1, lambda n: _window(n) - 1)
+
+
+"""
+内置变量
+"""
+# 月线变量滞后一个月：m 月的值取自 m-1 月，与日频特征、factor_builder 各因子一致（m 月因子只用 m-1 月及以前的数据）
+def _monthly_col(col: str):
+    return lambda inputs, months: inputs.monthly(col, _shift(months, 1))
+
+
+def _monthly_ret(inputs: PanelInputs, months: list) -> np.ndarray:
+    # m 月为 m-1 月的收益率 close[m-1] / close[m-2] - 1
+    axis = _shift(months[:1], 2) + _shift(months, 1)
+    return rolling.lag_ratio(inputs.monthly('close', axis), 1)[1:]
+
+
+register_variable('close', _monthly_col('close'), lookback=1)
+register_variable('turnover', _monthly_col('换手率'), lookback=1)
+register_variable('ret', _monthly_ret, lookback=2)
+
+
+"""
+内部函数
+"""
+def _variable(inputs: PanelInputs, name: str, months: list) -> np.ndarray:
+    """
+    变量面板：依次查 VARIABLES、日频月度特征、factor_store、旧版 N_T 宽表
+    """
+    if name in VARIABLES:
+        return np.asarray(VARIABLES[name][0](inputs, months), dtype=np.float64)
+    if name in daily_features.DAILY_FEATURES:
+        return inputs.daily_feature(name, months)
+    if factor_store.has_store(name):
+        wide = factor_store.read_store(name, 'N_T').set_index('code')
+    elif os.path.exists(factors.fpath(name)):
+        wide = pd.read_csv(factors.fpath(name), dtype={'code': str}).set_index('code')
+    else:
+        raise KeyError(f"未知变量: {name}")
+    return wide.T.reindex(index=months, columns=inputs.codes).to_numpy(dtype=np.float64)
+
+
+def _lookback(node: Node) -> int:
+    """
+    计算根节点需要的历史月数（沿各路径累加各算子的历史期数，取最大值）
+    """
+    if node.op == 'const':
+        return 0
+    if node.op == 'var':
+        return VARIABLES[node.value][1] if node.value in VARIABLES else 0
+    op = OPERATORS[node.op]
+    need = max([_lookback(a) for a in node.args[:op.n_inputs]] + [0])
+    if op.lookback is not None:
+        need += op.lookback(*[a.value for a in node.args[op.n_inputs:]])
+    return need
+
+
+_TOKEN = re.compile(r"\s*(?:(?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+                    r"|(?P<name>[A-Za-z_][A-Za-z0-9_]*)"
+                    r"|(?P<str>'[^']*'|\"[^\"]*\")"
+                    r"|(?P<op>[-+*/(),]))")
+
+
+class _Parser:
+    """
+    递归下降解析
+        expr  := term (('+' | '-') term)*
+        term  := unary (('*' | '/') unary)*
+        unary := '-' unary | atom
+        atom  := 数字 | 变量 | 函数名 '(' expr (',' expr)* ')' | '(' expr ')'
+    """
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            m = _TOKEN.match(text, pos)
+            if m is None or m.end() == pos:
+                raise ValueError(f"无法解析的字符 位置 {pos}: {self.text!r}")
+            kind = m.lastgroup
+            self.tokens.append((kind, m.group(kind), m.start(kind)))
+            pos = m.end()
+        self.i = 0
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ValueError("表达式为空")
+        node = self._expr()
+        if self.i < len(self.tokens):
+            self._error("多余的内容")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.i] if self.i < len(self.tokens) else (None, None, len(self.text))
+
+    def _take(self, value: str = None):
+        tok = self._peek()
+        if tok[0] is None or (value is not None and tok[1] != value):
+            self._error(f"需要 {value!r}" if value else "表达式不完整")
+        self.i += 1
+        return tok
+
+    def _error(self, msg: str):
+        raise ValueError(f"{msg} 位置 {self._peek()[2]}: {self.text!r}")
+
+    def _expr(self) -> Node:
+        node = self._term()
+        while self._peek()[1] in ('+', '-') and self._peek()[0] == 'op':
+            op = self._take()[1]
+            node = Node('add' if op == '+' else 'sub', (node, self._term()))
+        return node
+
+    def _term(self) -> Node:
+        node = self._unary()
+        while self._peek()[1] in ('*', '/') and self._peek()[0] == 'op':
+            op = self._take()[1]
+            node = Node('mul' if op == '*' else 'div', (node, self._unary()))
+        return node
+
+    def _unary(self) -> Node:
+        if self._peek()[0] == 'op' and self._peek()[1] == '-':
+            self._take()
+            arg = self._unary()
+            return Node('const', value=-arg.value) if arg.op == 'const' else Node('neg', (arg,))
+        return self._atom()
+
+    def _atom(self) -> Node:
+        kind, value, pos = self._take()
+        if kind == 'num':
+            return Node('const', value=float(value))
+        if kind == 'str':
+            return Node('var', value=value[1:-1])
+        if kind == 'op' and value == '(':
+            node = self._expr()
+            self._take(')')
+            return node
+        if kind == 'name':
+            if self._peek()[1] != '(':
+                return Node('var', value=value)
+            self._take('(')
+            args = [self._expr()]
+            while self._peek()[1] == ',':
+                self._take()
+                args.append(self._expr())
+            self._take(')')
+            return self._call(value, args, pos)
+        self.i -= 1
+        self._error("需要数字、变量或函数")
+
+    def _call(self, name: str, args: list, pos: int) -> Node:
+        if name not in OPERATORS:
+            raise ValueError(f"未知函数 {name} 位置 {pos}: {self.text!r}")
+        op = OPERATORS[name]
+        if len(args) != op.n_inputs + op.n_params:
+            raise ValueError(f"{name} 需要 {op.n_inputs + op.n_params} 个参数，实际 {len(args)} 个: {self.text!r}")
+        if any(a.op != 'const' for a in args[op.n_inputs:]):
+            raise ValueError(f"{name} 的最后 {op.n_params} 个参数须为数字: {self.text!r}")
+        return Node(name, args)
@@ -0,0 +1,116 @@
+"""
+行业分类变量 -- 用一列整数行业代码代替约100列行业哑变量
+回归时按行业组内去均值吸收行业效应（Frisch–Waugh–Lovell），其余变量的系数、残差与带全部哑变量的回归相同；
+行业效应由组内残差均值还原，并按与 build_industry_dummies_rm 相同的基准行业换算为 const 和 ind_xx 系数。
+不用 scipy.sparse 的稀疏哑变量矩阵求正规方程：去均值后只剩其余 k 个变量的 k×k 方程，
+不需要稀疏求解器，也不必把约100个行业系数放进正规方程。
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import factors
+
+# concat 后行业代码所在的列
+INDUSTRY_COL = 'industry_code'
+
+
+def industry_labels() -> pd.DataFrame:
+    """
+    行业代码对应的行业名称
+    :return: DataFrame(index=industry_code, col=['industry', 'base'])，base=1 为基准行业
+    """
+    path = factors.fpath('industry_code_labels')
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"文件不存在: {path}，请先运行 build_industry_codes()")
+    return pd.read_csv(path, index_col=0)
+
+
+def coef_names(labels: pd.DataFrame = None) -> pd.Series:
+    """
+    行业代码 -> 系数名称 'ind_行业名'（与哑变量列名相同）
+    """
+    labels = industry_labels() if labels is None else labels
+    return 'ind_' + labels['industry'].astype(str)
+
+
+def dummies(codes: pd.Series, labels: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    单期的行业哑变量（不含基准行业），用于需要显式暴露矩阵的场合（如风险模型）
+    :param codes: Series(index=code, value=行业代码)
+    :return: DataFrame(index=code, col=['ind_xx', ...])
+    """
+    labels = industry_labels() if labels is None else labels
+    names = coef_names(labels)
+    keep = labels.index[labels['base'] == 0]
+    mat = (codes.to_numpy()[:, None] == keep.to_numpy()[None, :]).astype(np.float64)
+    return pd.DataFrame(mat, index=codes.index, columns=names.loc[keep].to_numpy())
+
+
+def within_regress(y: np.ndarray, z: np.ndarray, groups: np.ndarray, w: np.ndarray = None,
+                   labels: pd.DataFrame = None):
+    """
+    吸收行业效应的（加权）最小二乘，等价于 y ~ const + z + 行业哑变量（去掉基准行业）
+    系数和 t 值的列与哑变量回归相同：const、z、各非基准行业的 ind_xx；
+    当期没有股票的行业系数为 NaN，基准行业当期没有股票时 const 和全部 ind_xx 无法识别，均为 NaN
+    （多期平均系数时跳过这些期，不以虚构的截距预测）
+    :param y: ndarray(n)
+    :param z: ndarray(n, k) 其余解释变量
+    :param groups: ndarray(n) 行业代码
+    :param w: ndarray(n) 权重，None 为 OLS
+    :param labels: industry_labels()，None 时读取
+    :return: (系数 Series(index=['const']+z 列序号+行业系数名), t 值 Series(index 同系数), 残差 ndarray(n))
+    """
+    labels = industry_labels() if labels is None else labels
+    w = np.ones(len(y)) if w is None else np.asarray(w, dtype=np.float64)
+    g, present = pd.factorize(groups, sort=True)
+    n_groups = len(present)
+    wsum = np.bincount(g, weights=w, minlength=n_groups)
+
+    # 组内加权均值
+    def group_mean(x):
+        if x.ndim == 1:
+            return np.bincount(g, weights=w * x, minlength=n_groups) / wsum
+        return np.stack([np.bincount(g, weights=w * x[:, j], minlength=n_groups) for j in range(x.shape[1])],
+                        axis=1) / wsum[:, None]
+
+    zbar = group_mean(z)
+    yd = y - group_mean(y)[g]
+    zd = z - zbar[g]
+    sw = np.sqrt(w)
+    beta, *_ = np.linalg.lstsq(zd * sw[:, None], yd * sw, rcond=None)
+    resid = yd - zd @ beta
+
+    # 自由度扣除组数
+    dof = len(y) - z.shape[1] - n_groups
+    sigma2 = np.sum(w * resid ** 2) / dof if dof > 0 else np.nan
+    cov_beta = np.linalg.pinv((zd * w[:, None]).T @ zd) * sigma2
+
+    # 行业效应 e_g = 组内 (y - zβ) 的加权均值，与 β 不相关：
+    # Var(e_g) = σ²/W_g + z̄_g' V z̄_g，Cov(e_g, e_h) = z̄_g' V z̄_h（g≠h）
+    effect = group_mean(y) - zbar @ beta
+    names = coef_names(labels)
+    others = names.loc[labels.index[labels['base'] == 0]]
+    base = labels.index[labels['base'] == 1]
+    pos = pd.Series(np.arange(n_groups), index=present)
+    b = pos.get(base[0]) if len(base) else None
+
+    const = se_const = np.nan
+    ind = pd.Series(np.nan, index=others.to_numpy())
+    se_ind = pd.Series(np.nan, index=others.to_numpy())
+    if b is not None:
+        const = effect[b]
+        se_const = np.sqrt(sigma2 / wsum[b] + zbar[b] @ cov_beta @ zbar[b])
+        for code, name in others.items():
+            j = pos.get(code)
+            if j is None:
+                continue
+            dz = zbar[j] - zbar[b]
+            ind[name] = effect[j] - effect[b]
+            se_ind[name] = np.sqrt(sigma2 / wsum[j] + sigma2 / wsum[b] + dz @ cov_beta @ dz)
+
+    params = pd.concat([pd.Series([const], index=['const']), pd.Series(beta), ind])
+    se = np.concatenate([[se_const], np.sqrt(np.diag(cov_beta)), se_ind.to_numpy()])
+    tvalues = pd.Series(params.to_numpy() / se, index=params.index)
+    return params, tvalues, resid
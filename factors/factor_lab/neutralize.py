@@ -0,0 +1,120 @@
+"""
+因子中性化 -- 对行业和对数市值回归取残差，所有期一次完成
+每期的回归 y ~ 行业哑变量 + log(size) 等价于：先按 (期, 行业) 组内去均值（吸收行业截距），
+再对去均值后的 log(size) 做回归；各期的正规方程按期累加后用一次批量 np.linalg 求解，不逐期调用 OLS。
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import factors
+from factors import factor_cache
+from .industry import INDUSTRY_COL
+
+
+def residualize(y: np.ndarray, dates: np.ndarray, groups: np.ndarray = None, x: np.ndarray = None) -> np.ndarray:
+    """
+    各期分别回归 y ~ 组哑变量 + x 取残差（groups 为 None 时为 y ~ 常数 + x）
+    :param y: ndarray(n, m)，m 个待中性化的列
+    :param dates: ndarray(n) 期序号 0..T-1
+    :param groups: ndarray(n) 组（行业）代码，None 表示只有截距
+    :param x: ndarray(n, k) 连续解释变量，None 表示只去组均值
+    :return: ndarray(n, m) 残差
+    """
+    y = np.asarray(y, dtype=np.float64)
+    dates = np.asarray(dates)
+    if groups is None:
+        cells = dates
+    else:
+        groups = np.asarray(groups, dtype=np.int64)
+        cells = pd.factorize(dates.astype(np.int64) * (groups.max() + 1) + groups)[0]
+    yd = _demean(y, cells)
+    if x is None or x.shape[1] == 0:
+        return yd
+    xd = _demean(np.asarray(x, dtype=np.float64), cells)
+
+    # 各期正规方程 X'X (T, k, k)、X'y (T, k, m)，批量求伪逆
+    n_dates = int(dates.max()) + 1
+    k, m = xd.shape[1], yd.shape[1]
+    xtx = np.stack([np.bincount(dates, weights=xd[:, i] * xd[:, j], minlength=n_dates)
+                    for i in range(k) for j in range(k)], axis=1).reshape(n_dates, k, k)
+    xty = np.stack([np.bincount(dates, weights=xd[:, i] * yd[:, j], minlength=n_dates)
+                    for i in range(k) for j in range(m)], axis=1).reshape(n_dates, k, m)
+    beta = np.linalg.pinv(xtx) @ xty
+    return yd - np.einsum('nk,nkm->nm', xd, beta[dates])
+
+
+def neutralize(vals: pd.DataFrame, industry: bool = True, size: bool = True) -> pd.DataFrame:
+    """
+    对行业和对数市值中性化
+    :param vals: DataFrame(index=(code, date), col=[因子...])，例如 Factor.get_data() 或 concat 的结果
+    :param industry: 是否对行业中性化
+    :param size: 是否对对数市值中性化
+    :return: DataFrame(index=(code, date), col=[因子...])，缺少行业或市值的行被去掉
+    """
+    vals = vals.dropna()
+    codes = vals.index.get_level_values('code')
+    keep = np.ones(len(vals), dtype=bool)
+
+    groups = None
+    if industry:
+        groups = industry_codes().reindex(codes).to_numpy(dtype=np.float64)
+        keep &= ~np.isnan(groups)
+    x = None
+    if size:
+        log_size = _size().data[['size']]
+        x = log_size.reindex(vals.index).to_numpy(dtype=np.float64)
+        keep &= ~np.isnan(x[:, 0])
+
+    vals = vals[keep]
+    dates = pd.factorize(vals.index.get_level_values('date'))[0]
+    resid = residualize(vals.to_numpy(dtype=np.float64), dates,
+                        None if groups is None else groups[keep].astype(np.int64),
+                        None if x is None else x[keep])
+    return pd.DataFrame(resid, index=vals.index, columns=vals.columns)
+
+
+def industry_codes() -> pd.Series:
+    """
+    各股票的整数行业代码：优先读取 industry_code.csv，否则由行业哑变量 industry.csv 还原
+    （全为0的股票属于被删除的基准行业）
+    :return: Series(index=code, value=行业代码)
+    """
+    if os.path.exists(factors.fpath('industry_code')):
+        return factors.IndustryCode().data[INDUSTRY_COL].droplevel('date')
+    dummies = factors.Industry().data.droplevel('date')
+    mat = dummies.to_numpy() != 0
+    codes = np.where(mat.any(axis=1), mat.argmax(axis=1), mat.shape[1])
+    return pd.Series(codes, index=dummies.index, name=INDUSTRY_COL)
+
+
+def input_signature(industry: bool = True, size: bool = True) -> tuple:
+    """
+    中性化所用数据的签名，用于缓存键；数据不存在时为 None
+    """
+    parts = []
+    if industry:
+        name = 'industry_code' if os.path.exists(factors.fpath('industry_code')) else 'industry'
+        parts.append(factor_cache.source_signature(name, factors.fpath(name)))
+    if size:
+        parts.append(factor_cache.source_signature('size', factors.fpath('size')))
+    return None if any(p is None for p in parts) else tuple(parts)
+
+
+"""
+内部函数
+"""
+def _demean(values: np.ndarray, cells: np.ndarray) -> np.ndarray:
+    """
+    按 cells 分组去均值
+    """
+    count = np.bincount(cells)
+    sums = np.stack([np.bincount(cells, weights=values[:, j], minlength=len(count))
+                     for j in range(values.shape[1])], axis=1)
+    return values - (sums / count[:, None])[cells]
+
+
+def _size() -> factors.Factor:
+    # 未标准化的对数流通市值
+    return factors.Factor('size', 'N_T', standardize=False)
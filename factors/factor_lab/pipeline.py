@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 import factors
 from factors import factor_lab
+from factors.factor_lab import industry
+from factors import precision
 
 def revenue(vals:list[factors.Factor],
             period:int = 12,
@@ -83,7 +85,7 @@ def revenue(vals:list[factors.Factor],
 def risk(vals:list[factors.Factor], period:int=12):
     # 1.构建收益率和变量
     change = factors.Change()
-    size = factors.Size().get_data()
+    size = factors.Size().get_data(copy=False)
     w = np.exp(0.5 * size)
 
     df = factor_lab.concat(vals)
@@ -110,6 +112,10 @@ def risk(vals:list[factors.Factor], period:int=12):
         # residuals: Series(index=(date, code), value=eps)
 
         df_t = df.xs(date, level='date')
+        if industry.INDUSTRY_COL in df_t.columns:
+            # 行业代码列只在当期展开为哑变量
+            df_t = pd.concat([df_t.drop(columns=[industry.INDUSTRY_COL]),
+                              industry.dummies(df_t[industry.INDUSTRY_COL])], axis=1)
         par_t = params[i - period + 1:i + 1]
 
         # =========================
@@ -152,11 +158,11 @@ def risk(vals:list[factors.Factor], period:int=12):
         fallback = float(spec_var.median()) if spec_var.notna().any() else 1e-6
         spec_var = spec_var.reindex(codes).fillna(fallback).clip(lower=1e-12)
 
-        D = pd.DataFrame(np.diag(spec_var.to_numpy()), index=codes, columns=codes)  # N x N
-
         # ---------- 4) 拼 Σ = X F X^T + D ----------
-        Sigma = X.to_numpy() @ F.to_numpy() @ X.to_numpy().T + D.to_numpy()
-        result = pd.DataFrame(Sigma, index=codes, columns=codes)
+        # D 为对角阵，直接加到对角线上；按 float64 计算，按 precision 的类型存放
+        Sigma = X.to_numpy() @ F.to_numpy() @ X.to_numpy().T
+        Sigma[np.diag_indices_from(Sigma)] += spec_var.to_numpy()
+        result = pd.DataFrame(Sigma.astype(precision.dtype(), copy=False), index=codes, columns=codes)
 
         # 现在 result 就是当期 date 的协方差矩阵 Σ，可用来后续风险评估/优化
         # 例如：sigmas[date] = result
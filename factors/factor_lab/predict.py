@@ -1,4 +1,5 @@
 import pandas as pd
+from .industry import INDUSTRY_COL, coef_names
 
 def predict(vals:pd.DataFrame,
             params:pd.Series,
@@ -7,16 +8,26 @@ def predict(vals:pd.DataFrame,
     预测各股票收益率（涨幅）
     :param vals: concat得到的因子预测变量值
     :param params: 当前date时，各预测变量的系数，以及截距项const
+                   （行业代码回归中基准行业无股票的期 const 为 NaN，多期平均时被跳过；直接用该期系数预测结果为 NaN）
     :param date: 当前日期
     :return: DataFrame(index=(date,code),col=prediction)，其中date索引统一为当前date
     """
     vals = vals.xs(date, level='date')
 
+    # 行业代码列：按行业取对应的 ind_xx 系数（基准行业及缺失为0）
+    industry = 0
+    if INDUSTRY_COL in vals.columns:
+        names = coef_names()
+        industry = vals[INDUSTRY_COL].map(names).map(params).fillna(0)
+        vals = vals.drop(columns=[INDUSTRY_COL])
+        params = params.drop([c for c in names if c in params.index])
+
     if 'const' in params:
         b = params.drop('const')
         result = (vals * b).sum(axis=1) + params['const']
     else:
         result = (vals * params).sum(axis=1)
+    result = result + industry
     result = pd.DataFrame(result.rename('prediction'))
     result['date'] = date
     result = result.set_index('date', append=True)  # 将date设为索引，保持原有索引
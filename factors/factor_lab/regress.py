@@ -2,27 +2,33 @@ import numpy as np
 import pandas as pd
 import factors
 import statsmodels.api as sm
+from .industry import INDUSTRY_COL, industry_labels, within_regress
 
 def ols_regress(change:factors.Factor, vals:pd.DataFrame):
 
     t_values = []
     coefs = []
+    labels = industry_labels() if INDUSTRY_COL in vals.columns else None
     date_list = sorted(list(set(change.get_date_index())&set(vals.index.get_level_values('date').unique())))
     for i, date in enumerate(date_list):
 
-        change_t = change.get_data(date)
+        change_t = change.get_data(date, copy=False)
 
         val = vals.xs(date, level='date')
-        val = pd.concat([val, change_t], axis=1, join='inner')
+        val = pd.concat([val, change_t], axis=1, join='inner').astype(np.float64)  # 回归按 float64 计算
         y = val['change']
         z = val.drop(columns=['change'])
 
-        z_with_const = sm.add_constant(z)  # 添加截距项
-        model = sm.OLS(y, z_with_const)
-        results = model.fit()
+        if labels is not None:
+            # 行业代码列：组内去均值吸收行业效应
+            params, tvalues, _ = _within(y, z, None, labels)
+        else:
+            z_with_const = sm.add_constant(z)  # 添加截距项
+            model = sm.OLS(y, z_with_const)
+            results = model.fit()
+            params, tvalues = results.params, results.tvalues[:]
 
-        t_values.append(results.tvalues[:])
-        params = results.params
+        t_values.append(tvalues)
         params['date'] = date
         coefs.append(params)
 
@@ -55,29 +61,34 @@ def wls_regress(change:factors.Factor, vals:pd.DataFrame, w:pd.DataFrame):
     t_values = []
     coefs = []
     resid_rows = []
+    labels = industry_labels() if INDUSTRY_COL in vals.columns else None
     date_list = sorted(list(set(change.get_date_index()) & set(vals.index.get_level_values('date').unique())))
     for i, date in enumerate(date_list):
 
-        change_t = change.get_data(date)
+        change_t = change.get_data(date, copy=False)
         w_t = w.xs(date, level='date')
         val = vals.xs(date, level='date')
-        val = pd.concat([val, change_t, w_t], axis=1, join='inner')
+        val = pd.concat([val, change_t, w_t], axis=1, join='inner').astype(np.float64)  # 回归按 float64 计算
         y = val['change']
         w_t = val['w']
         z = val.drop(columns=['change','w'])
 
-        z_with_const = sm.add_constant(z)  # 添加截距项
-        model = sm.WLS(y, z_with_const, weights=w_t)
-        results = model.fit()
+        if labels is not None:
+            # 行业代码列：组内加权去均值吸收行业效应
+            params, tvalues, eps = _within(y, z, w_t, labels)
+        else:
+            z_with_const = sm.add_constant(z)  # 添加截距项
+            model = sm.WLS(y, z_with_const, weights=w_t)
+            results = model.fit()
+            params, tvalues = results.params, results.tvalues[:]
+            eps = y - results.predict(z_with_const)
 
         # 记录t值、系数和截距
-        t_values.append(results.tvalues[:])
-        params = results.params
+        t_values.append(tvalues)
         params['date'] = date
         coefs.append(params)
 
         # 计算残差
-        eps = y - results.predict(z_with_const)
         eps.name = 'eps'
         eps.index = pd.MultiIndex.from_product([[date], eps.index], names=['date', 'code'])
         resid_rows.append(eps)
@@ -104,3 +115,21 @@ def wls_regress(change:factors.Factor, vals:pd.DataFrame, w:pd.DataFrame):
     # print(coefs)
     # print()
     return coefs, residuals
+
+
+"""
+内部函数
+"""
+def _within(y: pd.Series, z: pd.DataFrame, w, labels: pd.DataFrame):
+    """
+    单期回归，行业代码列按组内去均值吸收，系数与带行业哑变量的回归相同
+    :return: (params Series(const, 各变量, ind_xx), tvalues Series(与 params 相同的列), 残差 Series(index=code))
+             基准行业当期没有股票时 const 和 ind_xx 为 NaN，见 within_regress
+    """
+    groups = z[INDUSTRY_COL].to_numpy()
+    z = z.drop(columns=[INDUSTRY_COL])
+    params, tvalues, resid = within_regress(y.to_numpy(dtype=np.float64), z.to_numpy(dtype=np.float64), groups,
+                                            None if w is None else w.to_numpy(dtype=np.float64), labels)
+    params.index = ['const'] + list(z.columns) + list(params.index[1 + z.shape[1]:])
+    tvalues.index = params.index
+    return params, tvalues, pd.Series(resid, index=y.index)
@@ -0,0 +1,229 @@
+"""
+按月分区的因子存储 -- factor_data/{name}/{YYYYMM}.csv，每月一个长表文件 col=['code', name]
+增量更新只写入新月份文件，不再重写整张 N_T 宽表；
+读取时可还原为 N_T 宽表或 NT_K 长表供 Factor 使用。
+各月的输入指纹记录在 factor_data/{name}/_fingerprints.json（见 factor_builder.fingerprint）。
+与 N_T 宽表 factor_data/{name}.csv 的关系：分区存储存在时是因子的数据源，宽表只在以下时候参与：
+    写入分区前 prepare_store：存储不存在时由宽表初始化（构建区间之外的已有月份得以保留），
+    读取前 sync_store：宽表在上次同步后被外部更新（如每月更新的数据包）时用宽表重新写入分区，
+    export_wide：需要单文件时按需导出（读取全部分区重写宽表，构建时默认不导出）。
+同步时宽表的 (修改时间, 大小) 记录在 _source.json。
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+current_file_path = os.path.dirname(os.path.abspath(__file__))
+STORE_ROOT = current_file_path + "/factor_data/"
+
+
+def spath(name: str) -> str:
+    """
+    因子分区存储目录
+    """
+    return STORE_ROOT + f"{name}/"
+
+
+def wide_path(name: str) -> str:
+    """
+    因子的 N_T 宽表路径
+    """
+    return STORE_ROOT + f"{name}.csv"
+
+
+def has_store(name: str) -> bool:
+    return os.path.isdir(spath(name)) and len(store_months(name)) > 0
+
+
+def store_months(name: str) -> list:
+    """
+    已存储的月份
+    :return: list[str YYYYMM]，升序
+    """
+    path = spath(name)
+    if not os.path.isdir(path):
+        return []
+    months = [f[:-4] for f in os.listdir(path) if f.endswith('.csv') and f[:-4].isdigit()]
+    return sorted(months)
+
+
+def write_month(name: str, month: str, data: pd.DataFrame):
+    """
+    写入（覆盖）一个月的因子值
+    :param name: 因子名称
+    :param month: 月份 YYYYMM
+    :param data: DataFrame(col=['code', name]) 或 DataFrame(col=['股票代码', name])
+    """
+    data = data.rename(columns={'股票代码': 'code'}).loc[:, ['code', name]]
+    path = spath(name)
+    os.makedirs(path, exist_ok=True)
+    file = path + f"{month}.csv"
+    data.to_csv(file + '.tmp', index=False)
+    os.replace(file + '.tmp', file)
+
+
+def read_month(name: str, month: str) -> pd.DataFrame:
+    """
+    :return: DataFrame(col=['code', name])
+    """
+    return pd.read_csv(spath(name) + f"{month}.csv", dtype={'code': str, name: float})
+
+
+def read_store(name: str, dshape: str = 'NT_K', start: str = None, end: str = None) -> pd.DataFrame:
+    """
+    读取分区存储的因子
+    :param name: 因子名称
+    :param dshape: 'NT_K' 返回 DataFrame(index=(code, date), col=[name])，顺序与宽表 stack 结果相同
+                   'N_T'  返回 DataFrame(col=['code', month1, month2, ...])，与 _build_factor 写出的宽表相同
+    :param start: 开始月份 YYYYMM，None 不限制
+    :param end: 结束月份 YYYYMM，None 不限制
+    """
+    months = [m for m in store_months(name)
+              if (start is None or m >= start) and (end is None or m <= end)]
+    if not months:
+        raise FileNotFoundError(f"因子存储不存在或为空: {spath(name)}")
+
+    parts = []
+    for m in months:
+        part = read_month(name, m)
+        part['date'] = m
+        parts.append(part)
+    data = pd.concat(parts, ignore_index=True)
+
+    if dshape == 'NT_K':
+        # 与宽表 stack 的顺序一致：股票按首次出现顺序，同一股票内按月份
+        order = np.argsort(pd.factorize(data['code'])[0], kind='stable')
+        data = data.iloc[order]
+        return data.set_index(['code', 'date'])[[name]]
+    if dshape == 'N_T':
+        # 保持首次出现的股票顺序
+        codes = data['code'].drop_duplicates()
+        wide = data.pivot(index='code', columns='date', values=name).reindex(codes)
+        wide.columns.name = None
+        return wide.reset_index()
+    raise ValueError(f"不支持的数据格式: {dshape}")
+
+
+def read_fingerprints(name: str) -> dict:
+    """
+    已记录的各月输入指纹
+    :return: {月份: 指纹}，未记录时为空
+    """
+    file = spath(name) + "_fingerprints.json"
+    if not os.path.exists(file):
+        return {}
+    with open(file, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_fingerprints(name: str, fingerprints: dict):
+    """
+    更新（合并）各月输入指纹
+    """
+    merged = {**read_fingerprints(name), **fingerprints}
+    path = spath(name)
+    os.makedirs(path, exist_ok=True)
+    file = path + "_fingerprints.json"
+    with open(file + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(merged.items())), f, indent=0)
+    os.replace(file + '.tmp', file)
+
+
+def seed_store(name: str, csv_path: str, overwrite: bool = False) -> list:
+    """
+    由已有的 N_T 宽表初始化分区存储
+    :param name: 因子名称
+    :param csv_path: 宽表路径 col=['code', month1, month2, ...]
+    :param overwrite: 是否覆盖已存储的月份（宽表中没有的月份总是保留）
+    :return: 写入的月份
+    """
+    wide = pd.read_csv(csv_path, dtype={'code': str})
+    existing = set() if overwrite else set(store_months(name))
+    written = []
+    for col in wide.columns:
+        if col == 'code' or not col.isdigit() or col in existing:
+            continue
+        write_month(name, col, wide[['code', col]].rename(columns={col: name}))
+        written.append(col)
+    _write_source(name, csv_path)
+    return written
+
+
+def prepare_store(name: str, csv_path: str = None) -> list:
+    """
+    写入分区前调用：存储不存在而宽表存在时由宽表初始化，否则按 sync_store 同步
+    :param name: 因子名称
+    :param csv_path: 宽表路径，默认 wide_path(name)
+    :return: 由宽表写入的月份
+    """
+    csv_path = wide_path(name) if csv_path is None else csv_path
+    if not has_store(name):
+        return seed_store(name, csv_path) if os.path.exists(csv_path) else []
+    return sync_store(name, csv_path)
+
+
+def sync_store(name: str, csv_path: str = None) -> list:
+    """
+    宽表在上次同步后被更新时，用宽表重新写入分区存储（宽表中的月份覆盖，其余月份保留）；存储不存在时不创建
+    未记录同步状态的旧版存储，宽表比所有月份文件都新时视为已更新
+    :param name: 因子名称
+    :param csv_path: 宽表路径，默认 wide_path(name)
+    :return: 重新写入的月份
+    """
+    csv_path = wide_path(name) if csv_path is None else csv_path
+    if not has_store(name) or not os.path.exists(csv_path):
+        return []
+    synced = _read_source(name)
+    if synced is None:
+        newest = max(os.stat(spath(name) + f"{m}.csv").st_mtime_ns for m in store_months(name))
+        stale = os.stat(csv_path).st_mtime_ns > newest
+    else:
+        stale = synced != _file_signature(csv_path)
+    if not stale:
+        if synced is None:
+            _write_source(name, csv_path)
+        return []
+    return seed_store(name, csv_path, overwrite=True)
+
+
+def export_wide(name: str, csv_path: str = None) -> pd.DataFrame:
+    """
+    将分区存储导出为 N_T 宽表（读取全部分区并重写整个文件，代价随历史长度增长，只在需要单文件时调用）
+    :param csv_path: 宽表路径，默认 wide_path(name)
+    """
+    csv_path = wide_path(name) if csv_path is None else csv_path
+    wide = read_store(name, 'N_T')
+    wide.to_csv(csv_path + '.tmp', index=False)
+    os.replace(csv_path + '.tmp', csv_path)
+    _write_source(name, csv_path)
+    return wide
+
+
+"""
+内部函数
+"""
+def _file_signature(path: str) -> list:
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _read_source(name: str):
+    """
+    上次同步时宽表的 [修改时间, 大小]，未记录时为 None
+    """
+    file = spath(name) + "_source.json"
+    if not os.path.exists(file):
+        return None
+    with open(file, encoding='utf-8') as f:
+        return json.load(f).get('csv')
+
+
+def _write_source(name: str, csv_path: str):
+    path = spath(name)
+    os.makedirs(path, exist_ok=True)
+    file = path + "_source.json"
+    with open(file + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'csv': _file_signature(csv_path)}, f)
+    os.replace(file + '.tmp', file)
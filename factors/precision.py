@@ -0,0 +1,50 @@
+"""
+数值精度策略 -- 因子面板存放和面板运算使用的浮点类型
+'float64'（默认）或 'float32'，也可由环境变量 FACTOR_PRECISION 设定。
+float32 时：Factor 数据、concat 结果、get_cube 稠密数组、risk 的协方差矩阵以 float32 存放，内存减半；
+对数值敏感的步骤仍以 float64 计算：标准化内核、中性化与回归的正规方程、风险模型的 X F X'、优化器，
+各自在内部转换为 float64，结果再转回存放类型。磁盘缓存始终为 float64。
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+FLOAT_DTYPES = {'float64': np.float64, 'float32': np.float32}
+
+_precision = os.environ.get('FACTOR_PRECISION', 'float64')
+if _precision not in FLOAT_DTYPES:
+    raise ValueError(f"不支持的精度: FACTOR_PRECISION={_precision}，可选 {list(FLOAT_DTYPES)}")
+
+
+def set_precision(name: str):
+    """
+    :param name: 'float64' 或 'float32'，已读取的 Factor 需 reload() 后生效
+    """
+    global _precision
+    if name not in FLOAT_DTYPES:
+        raise ValueError(f"不支持的精度: {name}，可选 {list(FLOAT_DTYPES)}")
+    _precision = name
+
+
+def get_precision() -> str:
+    return _precision
+
+
+def dtype():
+    """
+    面板存放的浮点类型
+    """
+    return FLOAT_DTYPES[_precision]
+
+
+def cast_frame(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    浮点列转为存放类型，整数等其他列不变
+    """
+    if data is None:
+        return None
+    target = dtype()
+    cols = {c: target for c, t in data.dtypes.items() if pd.api.types.is_float_dtype(t) and t != target}
+    return data.astype(cols) if cols else data
+
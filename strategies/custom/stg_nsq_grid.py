@@ -175,34 +175,14 @@ class StgNsqGrid(Strategy):
         # 如需输出自定义统计可在此实现
         pass
 
-from tools.datapath import data_path
-import os
 def get_TSLA(start_time:str='19900101', end_time:str='20991231'):
     """
-    获取纳斯达克指数月线数据
+    获取特斯拉日线数据（code 统一为 'nsq'，以便直接用于本策略）
     :param start_time:
     :param end_time:
-    :param attr:
-    :return:
+    :return: DataFrame(index=(date, code), col=['open','close'])
     """
-
-    datas = pd.DataFrame({
-        'date': pd.Series(dtype='str'),
-        'open': pd.Series(dtype='float'),
-        'close': pd.Series(dtype='float')
-    })
-
-    file_path = data_path + 'TSLA.csv'
-    if not os.path.exists(file_path):
-        return None
-    data = pd.read_csv(file_path).loc[:,  ['date','open','close']]
-    data['date'] = pd.to_datetime(data['date'], format='%m/%d/%Y').dt.strftime('%Y%m%d')
-    data = data.loc[(data['date'] >= start_time) & (data['date'] <= end_time)]
-
-    datas = pd.concat([datas, data], ignore_index=True)
-    datas['code'] = 'nsq'  # 添加date列，所有行赋值为'all'
-    datas = datas.set_index(['date', 'code'])  # 将date设为索引，保持原有索引
-    return datas
+    return foreign_data.get_foreign('TSLA', 'd', start_time, end_time, code='nsq')
 
 
 
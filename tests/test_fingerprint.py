@@ -0,0 +1,43 @@
+"""
+FactorSpec.version() 覆盖因子实际依赖的代码：修改经对象调用的 PanelInputs 方法、data_api 的读取函数、
+被引用的辅助模块都会改变版本，修改无关的函数不会
+"""
+import inspect
+
+import pytest
+
+import data_api
+from factors.factor_builder import fallback, panel
+from factors.factor_builder.registry import FACTOR_REGISTRY
+
+
+def _edit(monkeypatch, target):
+    # 模拟修改 target 的源码
+    getsource = inspect.getsource
+    monkeypatch.setattr(inspect, 'getsource',
+                        lambda obj: getsource(obj) + "\n# edited" if obj is target else getsource(obj))
+
+
+@pytest.mark.parametrize('target', [panel.PanelInputs.financial, panel.PanelInputs.monthly,
+                                    data_api.get_financial_data, data_api.get_monthly_hfq,
+                                    fallback.coalesce])
+def test_dependency_edit_changes_version(monkeypatch, target):
+    spec = FACTOR_REGISTRY['size']
+    before = spec.version()
+    _edit(monkeypatch, target)
+    assert spec.version() != before
+
+
+def test_unrelated_edit_keeps_version(monkeypatch):
+    spec = FACTOR_REGISTRY['size']
+    before = spec.version()
+    _edit(monkeypatch, panel._panel_VOL)
+    assert spec.version() == before
+
+
+def test_dependency_factor_edit_changes_version(monkeypatch):
+    # ABTO 依赖 TO，TO 的代码变化也使 ABTO 的版本变化
+    spec = FACTOR_REGISTRY['ABTO']
+    before = spec.version()
+    _edit(monkeypatch, FACTOR_REGISTRY['TO'].reference)
+    assert spec.version() != before
@@ -0,0 +1,70 @@
+"""
+行业代码组内去均值回归（regress._within）与带行业哑变量的 statsmodels 回归在同一面板上的全部输出一致：
+系数、t 值（const、各变量、ind_xx）和残差；基准行业当期无股票时 const 和 ind_xx 为 NaN
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+
+from factors.factor_lab import industry
+from factors.factor_lab.regress import _within
+
+N_CODES, N_INDUSTRIES = 300, 6
+
+
+def _labels() -> pd.DataFrame:
+    return pd.DataFrame({'industry': [f"行业{i}" for i in range(N_INDUSTRIES)],
+                         'base': [1] + [0] * (N_INDUSTRIES - 1)},
+                        index=pd.Index(range(N_INDUSTRIES), name=industry.INDUSTRY_COL))
+
+
+def _panel(seed: int = 0):
+    rng = np.random.default_rng(seed)
+    codes = pd.Index([f"{i:06d}" for i in range(N_CODES)], name='code')
+    groups = rng.integers(0, N_INDUSTRIES, size=N_CODES)
+    z = pd.DataFrame(rng.normal(size=(N_CODES, 2)), index=codes, columns=['f0', 'f1'])
+    effects = rng.normal(scale=0.05, size=N_INDUSTRIES)
+    y = pd.Series(z.to_numpy() @ [0.03, -0.02] + effects[groups] + rng.normal(scale=0.05, size=N_CODES),
+                  index=codes, name='change')
+    w = pd.Series(np.exp(rng.normal(scale=0.5, size=N_CODES)), index=codes, name='w')
+    return y, z, groups, w
+
+
+def _dummy_fit(y, z, groups, w, labels):
+    dummies = industry.dummies(pd.Series(groups, index=z.index), labels)
+    x = sm.add_constant(pd.concat([z, dummies], axis=1))
+    results = sm.OLS(y, x).fit() if w is None else sm.WLS(y, x, weights=w).fit()
+    return results.params, results.tvalues, y - results.predict(x)
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_within_matches_dummy_regression(weighted):
+    labels = _labels()
+    y, z, groups, w = _panel()
+    w = w if weighted else None
+    params, tvalues, resid = _within(y, z.assign(**{industry.INDUSTRY_COL: groups}), w, labels)
+    ref_params, ref_tvalues, ref_resid = _dummy_fit(y, z, groups, w, labels)
+
+    assert list(params.index) == list(ref_params.index)
+    assert list(tvalues.index) == list(ref_tvalues.index)
+    np.testing.assert_allclose(params.to_numpy(), ref_params.to_numpy(), rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(tvalues.to_numpy(), ref_tvalues.to_numpy(), rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(resid.to_numpy(), ref_resid.to_numpy(), rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.filterwarnings('ignore:The design matrix is rank-deficient')
+def test_missing_base_industry_flags_intercept():
+    labels = _labels()
+    y, z, groups, w = _panel(1)
+    keep = groups != 0
+    y, z, groups = y[keep], z[keep], groups[keep]
+    params, tvalues, resid = _within(y, z.assign(**{industry.INDUSTRY_COL: groups}), None, labels)
+
+    industry_cols = [c for c in params.index if c.startswith('ind_')]
+    assert np.isnan(params['const']) and params[industry_cols].isna().all()
+    assert np.isnan(tvalues['const']) and tvalues[industry_cols].isna().all()
+    # 斜率和残差不受影响
+    ref_params, _, ref_resid = _dummy_fit(y, z, groups, None, labels)
+    np.testing.assert_allclose(params[['f0', 'f1']].to_numpy(), ref_params[['f0', 'f1']].to_numpy(), rtol=1e-9)
+    np.testing.assert_allclose(resid.to_numpy(), ref_resid.to_numpy(), rtol=1e-9, atol=1e-12)
@@ -0,0 +1,82 @@
+"""
+float32 与 float64 精度下的结果差异有界：小规模模拟面板经 Factor -> concat -> ols_regress/predict
+和 risk -> mvw2，比较两种精度下的预测收益、协方差矩阵和组合权重
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import factors
+from factors import precision
+from factors.factor_lab import concat, ols_regress, predict, mvw2, risk
+
+N_CODES, N_FACTORS, PERIOD = 200, 3, 12
+CODES = [f"{i:06d}" for i in range(N_CODES)]
+DATES = [f"2020{m:02d}" for m in range(1, 13)] + ['202101', '202102', '202103']
+
+
+class _Panel(factors.Factor):
+    """
+    由内存中的 DataFrame(index=(code, date)) 构造的变量，读取时与文件数据相同地按精度转换
+    """
+    def __init__(self, name: str, frame: pd.DataFrame):
+        self._frame = frame
+        super().__init__(name, 'NT_K', standardize=False, verbose=False, use_cache=False)
+
+    def _load_data(self):
+        self.data = self._frame
+
+
+def _synthetic():
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_product([CODES, DATES], names=['code', 'date'])
+    exposures = rng.normal(size=(len(index), N_FACTORS))
+    beta = rng.normal(scale=0.02, size=(len(DATES), N_FACTORS))
+    date_pos = np.tile(np.arange(len(DATES)), N_CODES)
+    change = (exposures * beta[date_pos]).sum(axis=1) + rng.normal(scale=0.05, size=len(index))
+    vals = [pd.DataFrame({f"f{k}": exposures[:, k]}, index=index) for k in range(N_FACTORS)]
+    size = pd.DataFrame({'size': rng.normal(scale=0.5, size=len(index))}, index=index)
+    return vals, pd.DataFrame({'change': change}, index=index), size
+
+
+def _run(name: str, monkeypatch):
+    precision.set_precision(name)
+    vals, change, size = _synthetic()
+    monkeypatch.setattr(factors, 'Change', lambda: _Panel('change', change))
+    monkeypatch.setattr(factors, 'Size', lambda: _Panel('size', size))
+
+    panels = [_Panel(f"f{k}", v) for k, v in enumerate(vals)]
+    df = concat(panels)
+    assert all(t == precision.dtype() for t in df.dtypes)
+
+    params = ols_regress(factors.Change(), df)
+    pred = predict(df, params.iloc[:PERIOD].mean(), DATES[-1])['prediction']
+    sigmas = risk(panels, period=PERIOD)
+    assert all(s.to_numpy().dtype == precision.dtype() for s in sigmas.values())
+    weights = mvw2(pred, {DATES[-1]: sigmas[DATES[-1]]}, lam=1.0)
+    return pred, sigmas, weights
+
+
+@pytest.fixture
+def restore_precision():
+    name = precision.get_precision()
+    yield
+    precision.set_precision(name)
+
+
+def test_float32_matches_float64(monkeypatch, restore_precision):
+    pred64, sig64, w64 = _run('float64', monkeypatch)
+    pred32, sig32, w32 = _run('float32', monkeypatch)
+
+    pred_diff = np.abs(pred64 - pred32.astype(np.float64)).max() / np.abs(pred64).max()
+    assert pred_diff < 1e-5, pred_diff
+
+    assert sig64.keys() == sig32.keys()
+    for date in sig64:
+        a = sig64[date].to_numpy()
+        b = sig32[date].reindex(index=sig64[date].index, columns=sig64[date].columns).to_numpy(dtype=np.float64)
+        sigma_diff = np.abs(a - b).max() / np.abs(a).max()
+        assert sigma_diff < 1e-5, (date, sigma_diff)
+
+    w_diff = np.abs(w64 - w32.reindex(w64.index)).max()
+    assert w_diff < 1e-4, w_diff
@@ -3,4 +3,4 @@
 """
 from .safe_div import safe_div
 
-__all__ = ['quarter_tool','datapath','safe_div']
\ No newline at end of file
+__all__ = ['quarter_tool','datapath','safe_div','synthetic_data']
\ No newline at end of file
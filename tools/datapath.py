@@ -4,8 +4,10 @@ import os
 # current_file_path = os.path.dirname(os.path.abspath(__file__))
 # data_path = current_file_path+"/../dataset/"
 
-# 指定系统中数据库绝对路径
-data_path = "D:/Projects/PythonProject/A-share_database/"
+# 指定系统中数据库绝对路径（可用环境变量 ASHARE_DATA_PATH 覆盖，例如指向 tools.synthetic_data 生成的模拟数据库）
+data_path = os.environ.get("ASHARE_DATA_PATH", "D:/Projects/PythonProject/A-share_database/")
+if not data_path.endswith(("/", "\\")):
+    data_path = data_path + "/"
 
 stock_path = data_path + "股票列表.csv"
 index_path = data_path + "指数列表.csv"
@@ -13,6 +15,7 @@ name_path = data_path + "name.csv"
 st_path = data_path + "退市股票列表.csv"
 con_daily_index_path = data_path + "每日指标.csv"
 limit_path = data_path + "limit.csv"
+cache_path = data_path + "cache/"  # 解析后的二进制缓存
 
 def pv_daily_index_path(code:str)->str:
     return data_path + f"每日指标/{code}.csv"
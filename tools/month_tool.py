@@ -1,6 +1,8 @@
 """
 辅助方法 求当前/前/后某月的字符串
+*_array 版本对 int YYYYMM / YYYYMMDD 数组整体计算，结果为 int32 YYYYMM
 """
+import numpy as np
 
 def cur_month(date:str):
     return date[0:6]
@@ -32,6 +34,60 @@ def next_month(month:str, n:int=1):
     return y+m
 
 
+def cur_month_array(dates):
+    """
+    日期数组所在月
+    :param dates: int 数组 YYYYMM / YYYYMMDD（可混合）
+    :return: int32 数组 YYYYMM
+    """
+    dates = np.asarray(dates).astype(np.int64)
+    return np.where(dates >= 10**7, dates // 100, dates).astype(np.int32)
+
+def month_index_array(dates):
+    """
+    日期数组对应的绝对月序号 year*12 + (month-1)，便于做月份差
+    :param dates: int 数组 YYYYMM / YYYYMMDD
+    :return: int64 数组
+    """
+    months = cur_month_array(dates).astype(np.int64)
+    return (months // 100) * 12 + months % 100 - 1
+
+def month_from_index_array(index):
+    """
+    month_index_array 的逆运算
+    :param index: int 数组 year*12 + (month-1)
+    :return: int32 数组 YYYYMM
+    """
+    index = np.asarray(index).astype(np.int64)
+    return ((index // 12) * 100 + index % 12 + 1).astype(np.int32)
+
+def shift_month_array(dates, n):
+    """
+    日期数组向后平移 n 个月（n 为负时向前），n 可以是与 dates 同形状的数组
+    :param dates: int 数组 YYYYMM / YYYYMMDD
+    :param n: 平移月数
+    :return: int32 数组 YYYYMM
+    """
+    return month_from_index_array(month_index_array(dates) + np.asarray(n, dtype=np.int64))
+
+def prev_month_array(dates, n=1):
+    """
+    prev_month 的数组版本
+    :param dates: int 数组 YYYYMM / YYYYMMDD
+    :param n: 过去月数
+    :return: int32 数组 YYYYMM
+    """
+    return shift_month_array(dates, -np.asarray(n, dtype=np.int64))
+
+def next_month_array(dates, n=1):
+    """
+    next_month 的数组版本
+    :param dates: int 数组 YYYYMM / YYYYMMDD
+    :param n: 未来月数
+    :return: int32 数组 YYYYMM
+    """
+    return shift_month_array(dates, n)
+
 
 if __name__ == '__main__':
     # print(cur_month('20250630'))
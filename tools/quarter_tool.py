@@ -1,6 +1,14 @@
 """
 辅助方法 求当前/前/后一期的字符串
+*_array 版本对 int YYYYMM / YYYYMMDD 数组整体计算，结果为 int32 YYYYMMDD 期数
 """
+import numpy as np
+
+# 各期末的 MMDD
+_QUARTER_ENDS = np.array([331, 630, 930, 1231], dtype=np.int64)
+# fixed_quarter 中 月份 -> (年份偏移, 期末序号)，下标 0 不使用
+_FIXED_YEAR_SHIFT = np.array([0, -1, -1, -1, -1, 0, 0, 0, 0, 0, 0, 0, 0], dtype=np.int64)
+_FIXED_QUARTER = np.array([0, 2, 2, 2, 2, 0, 0, 0, 0, 1, 1, 2, 2], dtype=np.int64)
 
 def prev_quarter(quarter:str):
     choices = ['0331','0630', '0930', '1231']
@@ -62,6 +70,66 @@ def fixed_quarter(date:str):
         d = choices[2]
     return y + d
 
+def quarter_index_array(quarters):
+    """
+    期数数组对应的绝对期序号 year*4 + (季度-1)
+    :param quarters: int 数组 YYYYMMDD，须为 0331/0630/0930/1231 之一
+    :return: int64 数组，非法期数为 -1
+    """
+    quarters = np.asarray(quarters).astype(np.int64)
+    q = np.searchsorted(_QUARTER_ENDS, quarters % 10000)
+    valid = (q < 4) & (_QUARTER_ENDS[np.minimum(q, 3)] == quarters % 10000)
+    return np.where(valid, (quarters // 10000) * 4 + q, -1)
+
+def quarter_from_index_array(index):
+    """
+    quarter_index_array 的逆运算
+    :param index: int 数组 year*4 + (季度-1)
+    :return: int32 数组 YYYYMMDD，序号为负时为 -1
+    """
+    index = np.asarray(index).astype(np.int64)
+    quarters = (index // 4) * 10000 + _QUARTER_ENDS[index % 4]
+    return np.where(index >= 0, quarters, -1).astype(np.int32)
+
+def shift_quarter_array(quarters, n):
+    """
+    期数数组向后平移 n 期（n 为负时向前）
+    :param quarters: int 数组 YYYYMMDD 期数
+    :param n: 平移期数，可以是与 quarters 同形状的数组
+    :return: int32 数组 YYYYMMDD，非法期数为 -1（同 prev_quarter）
+    """
+    index = quarter_index_array(quarters)
+    shifted = quarter_from_index_array(index + np.asarray(n, dtype=np.int64))
+    return np.where(index >= 0, shifted, -1).astype(np.int32)
+
+def prev_quarter_array(quarters, n=1):
+    return shift_quarter_array(quarters, -np.asarray(n, dtype=np.int64))
+
+def next_quarter_array(quarters, n=1):
+    return shift_quarter_array(quarters, n)
+
+def current_quarter_array(dates):
+    """
+    current_quarter 的数组版本：日期所属的最近一个已结束期（期末 <= 日期）
+    :param dates: int 数组 YYYYMMDD / YYYYMM（YYYYMM 视为当月 00 日，与字符串版本一致）
+    :return: int32 数组 YYYYMMDD
+    """
+    dates = np.asarray(dates).astype(np.int64)
+    dates = np.where(dates >= 10**7, dates, dates * 100)
+    q = np.searchsorted(_QUARTER_ENDS, dates % 10000, side='right') - 1
+    return quarter_from_index_array((dates // 10000) * 4 + q)
+
+def fixed_quarter_array(dates):
+    """
+    fixed_quarter 的数组版本：按约定在该日期应该使用的期数
+    :param dates: int 数组 YYYYMMDD / YYYYMM
+    :return: int32 数组 YYYYMMDD
+    """
+    dates = np.asarray(dates).astype(np.int64)
+    months = np.where(dates >= 10**7, dates // 100, dates)
+    m = months % 100
+    return quarter_from_index_array((months // 100 + _FIXED_YEAR_SHIFT[m]) * 4 + _FIXED_QUARTER[m])
+
 
 if __name__ == '__main__':
     for m in range(1,13):
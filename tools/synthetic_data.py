@@ -0,0 +1,554 @@
+"""
+模拟A股数据库生成 -- 按 datapath 中各数据加载接口要求的文件布局，生成一份可复现的假数据库
+用于在没有真实数据库的机器上做性能测试与回归测试
+
+生成内容:
+    股票列表.csv / 指数列表.csv / 退市股票列表.csv / name.csv
+    daily/{code}_daily.csv                  每只股票不复权日线
+    复权因子_前复权/{ts_code}.csv             前复权因子
+    monthly/ monthly_qfq/ monthly_hfq/       每只股票不复权/前复权/后复权月线
+    每日指标/{ts_code}.csv 与 每日指标.csv     每日指标（单股与合并）
+    历史详细数据_CSV/全部上市公司财务信息_{q}.csv  季度财务数据
+    财务数据/转换结果/{q}.csv                  季度财务指标（v2）
+    指数_月_kline/{code}_月.csv               指数月线
+    ndq_d.csv / ndq_m.csv                    纳斯达克指数日线/月线
+    limit.csv                                月初开盘涨跌停记录
+
+使用:
+    build_synthetic_database('/tmp/ashare_db', n_stocks=300, start_year=2012, n_years=5, seed=0)
+    然后设置环境变量 ASHARE_DATA_PATH=/tmp/ashare_db 再运行各模块
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 板块前缀及权重（包含会被部分加载器跳过的创业板/科创板）
+BOARDS = [('000', 0.14), ('001', 0.03), ('002', 0.20), ('600', 0.22),
+          ('601', 0.08), ('603', 0.10), ('300', 0.16), ('688', 0.07)]
+
+INDUSTRIES = ['银行', '全国地产', 'IT设备', '专用机械', '中成药', '化学制药', '元器件', '软件服务',
+              '汽车配件', '电气设备', '化工原料', '建筑工程', '食品', '白酒', '证券', '保险',
+              '电器仪表', '半导体', '通信设备', '医疗保健', '水泥', '钢加工', '煤炭开采', '有色',
+              '纺织', '供气供热', '公路', '仓储物流', '互联网', '农业综合']
+
+AREAS = ['深圳', '上海', '北京', '浙江', '江苏', '广东', '山东', '福建', '四川', '湖北', '安徽', '河南']
+
+NATURES = ['民营企业', '地方国有企业', '中央国有企业', '外资企业', '集体企业']
+
+INDEXES = [('000001', '上证指数'), ('399001', '深证成指'), ('000300', '沪深300')]
+
+MONTHLY_COLS = ["日期", "股票代码", "开盘", "收盘", "最高", "最低",
+                "成交量", "成交额", "振幅", "涨跌幅", "涨跌额", "换手率"]
+
+DAILY_INDEX_COLS = ['开盘价', '最高价', '最低价', '收盘价', '昨收价',
+                    '涨跌额', '涨跌幅', '成交量(手)', '成交额(千元)', '换手率', '换手率(自由流通股)', '量比',
+                    '市盈率', '市盈率TTM', '市净率', '市销率', '市销率TTM', '股息率', '股息率TTM',
+                    '总股本(万股)', '流通股本(万股)', '自由流通股本(万股)', '总市值(万元)', '流通市值(万元)']
+
+QUARTER_ENDS = ['0331', '0630', '0930', '1231']
+
+
+def build_synthetic_database(out_dir: str,
+                             n_stocks: int = 300,
+                             start_year: int = 2012,
+                             n_years: int = 5,
+                             seed: int = 0,
+                             full_market_daily_index: bool = False):
+    """
+    生成模拟数据库
+    :param out_dir: 输出目录（相当于 datapath.data_path）
+    :param n_stocks: 股票数量
+    :param start_year: 起始年份
+    :param n_years: 年数
+    :param seed: 随机种子，相同参数与种子生成的文件完全一致
+    :param full_market_daily_index: 合并的 每日指标.csv 是否包含 3/68/9 开头股票（update_daily_index 默认跳过）
+    :return: 股票代码列表 pd.Series
+    """
+    rng = np.random.default_rng(seed)
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    # 1.交易日历（工作日随机剔除少量节假日）
+    days = pd.bdate_range(f"{start_year}-01-01", f"{start_year + n_years - 1}-12-31")
+    days = days[rng.random(len(days)) > 0.03]
+    n_days = len(days)
+
+    # 2.股票基本信息
+    info = _stock_info(rng, n_stocks, days)
+    print(f"[synthetic] {n_stocks} stocks, {n_days} days -> {out}")
+
+    # 3.行情（T x N）
+    px = _simulate_prices(rng, info, days)
+
+    # 4.财务数据（季度）
+    fin = _simulate_financials(rng, info, days, px)
+
+    # 5.写文件
+    _write_lists(out, rng, info, days)
+    _write_daily(out, info, days, px)
+    _write_monthly(out, info, days, px)
+    _write_daily_index(out, rng, info, days, px, fin, full_market_daily_index)
+    _write_financials(out, info, fin)
+    _write_index_kline(out, rng, days, px)
+    _write_nasdaq(out, rng, start_year, n_years)
+    print("[synthetic] done.")
+    return info['code']
+
+
+# ---------- 基本信息 ----------
+def _stock_info(rng, n_stocks, days):
+    prefixes = np.array([b[0] for b in BOARDS])
+    weights = np.array([b[1] for b in BOARDS])
+    boards = rng.choice(prefixes, size=n_stocks, p=weights / weights.sum())
+
+    codes = []
+    used = set()
+    for b in boards:
+        while True:
+            code = b + str(rng.integers(1, 1000)).zfill(3)
+            if code not in used:
+                used.add(code)
+                codes.append(code)
+                break
+    codes = sorted(codes)
+    boards = np.array([c[:3] for c in codes])
+
+    info = pd.DataFrame({'code': codes})
+    info['ts_code'] = [c + ('.SH' if c.startswith('6') else '.SZ') for c in codes]
+    info['name'] = [f"模拟{c[-4:]}" for c in codes]
+    info['industry'] = rng.choice(INDUSTRIES, size=n_stocks)
+    info['area'] = rng.choice(AREAS, size=n_stocks)
+    info['nature'] = rng.choice(NATURES, size=n_stocks)
+    info['limit'] = np.where(np.isin(boards, ['300', '688']), 0.2, 0.1)
+
+    # 上市日（约25%在样本期内上市）
+    n_days = len(days)
+    list_idx = np.where(rng.random(n_stocks) < 0.25, rng.integers(0, int(n_days * 0.6) + 1, n_stocks), 0)
+    info['list_idx'] = list_idx
+    info['list_date'] = [(days[i] - pd.Timedelta(days=0 if i > 0 else 365 * 3)).strftime('%Y%m%d')
+                         for i in list_idx]
+
+    # 股本（股）
+    info['shares'] = np.exp(rng.normal(np.log(8e8), 1.0, n_stocks)).round(-4)
+    info['float_ratio'] = rng.uniform(0.4, 1.0, n_stocks)
+    info['free_ratio'] = rng.uniform(0.4, 0.9, n_stocks)
+    return info
+
+
+# ---------- 行情 ----------
+def _simulate_prices(rng, info, days):
+    n_days, n = len(days), len(info)
+    ind_codes = pd.Categorical(info['industry']).codes
+
+    # 收益率 = 市场 + 行业 + 个股
+    mkt = rng.normal(0.0003, 0.012, n_days)
+    ind = rng.normal(0.0, 0.008, (n_days, ind_codes.max() + 1))
+    beta = rng.uniform(0.6, 1.4, n)
+    vol = rng.uniform(0.012, 0.03, n)
+    ret = mkt[:, None] * beta + ind[:, ind_codes] + rng.standard_t(4, (n_days, n)) * vol / np.sqrt(2)
+    limit = info['limit'].to_numpy()
+    ret = np.clip(ret, -limit + 0.001, limit - 0.001)
+
+    # 有效交易日（上市前 / 停牌 无数据）
+    valid = np.arange(n_days)[:, None] >= info['list_idx'].to_numpy()[None, :]
+    for j in np.nonzero(rng.random(n) < 0.08)[0]:
+        s = rng.integers(0, n_days)
+        valid[s:s + rng.integers(5, 60), j] = False
+    ret = np.where(valid, ret, 0.0)
+
+    # 后复权连续价格
+    p0 = np.exp(rng.normal(np.log(12), 0.7, n))
+    adj_close = p0 * np.cumprod(1 + ret, axis=0)
+
+    # 除权除息事件 -> 不复权价格与前复权因子
+    ratio = np.ones((n_days, n))
+    split = np.ones((n_days, n))
+    for j in range(n):
+        for _ in range(rng.integers(0, 4)):
+            t = rng.integers(1, n_days)
+            if rng.random() < 0.25:
+                ratio[t, j] *= 0.5  # 10送10
+                split[t, j] *= 2.0
+            else:
+                ratio[t, j] *= rng.uniform(0.97, 0.995)  # 现金分红
+    cum = np.cumprod(ratio, axis=0)  # 到t为止的累计除权比例
+    raw_close = adj_close * cum
+    qfq_factor = cum / cum[-1]  # 最新一日为 1
+
+    # 开高低
+    gap = rng.normal(0, 0.004, (n_days, n))
+    prev_raw = np.vstack([raw_close[:1], raw_close[:-1] * ratio[1:]])
+    raw_open = prev_raw * (1 + gap)
+    hi = np.maximum(raw_open, raw_close) * (1 + np.abs(rng.normal(0, 0.006, (n_days, n))))
+    lo = np.minimum(raw_open, raw_close) * (1 - np.abs(rng.normal(0, 0.006, (n_days, n))))
+
+    # 量额
+    shares = info['shares'].to_numpy() * np.cumprod(split, axis=0)  # 送转后股本增加
+    float_sh = shares * info['float_ratio'].to_numpy()
+    turn = np.exp(rng.normal(np.log(0.015), 0.6, (n_days, n))) * (1 + 20 * np.abs(ret))
+    vol_sh = (float_sh * turn).round(-2)
+    amount = vol_sh * (raw_open + raw_close) / 2
+
+    return {
+        'valid': valid, 'ret': ret, 'ratio': ratio,
+        'raw_open': raw_open, 'raw_close': raw_close, 'raw_high': hi, 'raw_low': lo,
+        'qfq_factor': qfq_factor, 'volume': vol_sh, 'amount': amount,
+        'shares': shares, 'float_shares': float_sh,
+        'free_shares': float_sh * info['free_ratio'].to_numpy(),
+        'turnover': vol_sh / float_sh * 100, 'mkt': mkt,
+    }
+
+
+# ---------- 财务 ----------
+def _quarter_list(start_year, end_year):
+    return [f"{y}{q}" for y in range(start_year, end_year + 1) for q in QUARTER_ENDS]
+
+
+def _announce_date(rng, quarter):
+    """按披露规则随机生成公告日 YYYYMMDD"""
+    y, q = int(quarter[:4]), quarter[4:]
+    if q == '0331':
+        d = pd.Timestamp(f"{y}-04-15") + pd.Timedelta(days=int(rng.integers(0, 16)))
+    elif q == '0630':
+        d = pd.Timestamp(f"{y}-07-15") + pd.Timedelta(days=int(rng.integers(0, 48)))
+    elif q == '0930':
+        d = pd.Timestamp(f"{y}-10-15") + pd.Timedelta(days=int(rng.integers(0, 17)))
+    else:
+        d = pd.Timestamp(f"{y + 1}-03-01") + pd.Timedelta(days=int(rng.integers(0, 45)))
+    return d.strftime('%Y%m%d')
+
+
+def _simulate_financials(rng, info, days, px):
+    """
+    生成季度财务数据
+    :return: dict(quarter -> DataFrame(每只股票一行，含公告日和各科目，利润表/现金流量表为年初累计值))
+    """
+    n = len(info)
+    quarters = _quarter_list(days[0].year - 2, days[-1].year)
+    day_str = days.strftime('%Y%m%d')
+
+    # 资产规模与初始市值挂钩，使估值指标（PE/PB）落在合理区间
+    mv0 = px['raw_close'][0] * px['shares'][0]
+    assets = mv0 * np.exp(rng.normal(0.0, 0.7, n))
+    lev = rng.uniform(0.3, 0.75, n)
+    asset_turn = rng.uniform(0.05, 0.35, n)
+    margin = rng.normal(0.08, 0.08, n)
+    cost_ratio = rng.uniform(0.55, 0.9, n)
+
+    out = {}
+    ytd = {}
+    for qi, q in enumerate(quarters):
+        growth = rng.normal(0.015, 0.04, n)
+        assets = assets * (1 + growth)
+        revenue_q = assets * asset_turn * rng.uniform(0.8, 1.2, n)
+        profit_q = revenue_q * (margin + rng.normal(0, 0.03, n))
+        cfo_q = profit_q * rng.normal(1.0, 0.6, n)
+        dep_q = assets * rng.uniform(0.002, 0.008, n)
+
+        if q.endswith('0331'):
+            ytd = {k: np.zeros(n) for k in ['rev', 'cost', 'profit', 'cfo', 'dep', 'sell', 'admin']}
+        ytd['rev'] = ytd['rev'] + revenue_q
+        ytd['cost'] = ytd['cost'] + revenue_q * cost_ratio
+        ytd['profit'] = ytd['profit'] + profit_q
+        ytd['cfo'] = ytd['cfo'] + cfo_q
+        ytd['dep'] = ytd['dep'] + dep_q
+        ytd['sell'] = ytd['sell'] + revenue_q * rng.uniform(0.02, 0.06, n)
+        ytd['admin'] = ytd['admin'] + revenue_q * rng.uniform(0.03, 0.07, n)
+
+        liab = assets * lev * rng.uniform(0.95, 1.05, n)
+        equity = assets - liab
+        cur_assets = assets * rng.uniform(0.35, 0.6, n)
+        cur_liab = liab * rng.uniform(0.5, 0.8, n)
+
+        # 季末股本
+        q_end = q[:4] + q[4:]
+        t = min(max(np.searchsorted(day_str, q_end, side='right') - 1, 0), len(days) - 1)
+        shares = px['shares'][t]
+
+        df = pd.DataFrame({
+            'code': info['code'],
+            'ann': [_announce_date(rng, q) for _ in range(n)],
+            '其中：营业收入': ytd['rev'], '其中：营业成本': ytd['cost'],
+            '归属于母公司所有者的净利润': ytd['profit'],
+            '经营活动产生的现金流量净额': ytd['cfo'],
+            '固定资产折旧、油气资产折耗、生产性生物资产折旧': ytd['dep'],
+            '销售费用': ytd['sell'], '管理费用': ytd['admin'],
+            '资产总计': assets, '负债合计': liab, '所有者权益合计': equity,
+            '流动资产合计': cur_assets, '流动负债合计': cur_liab,
+            '非流动负债合计': liab - cur_liab,
+            '固定资产': assets * rng.uniform(0.1, 0.3, n),
+            '在建工程': assets * rng.uniform(0.0, 0.05, n),
+            '工程物资': np.where(rng.random(n) < 0.7, 0.0, assets * 0.002),
+            '生产性生物资产': np.where(rng.random(n) < 0.95, 0.0, assets * 0.01),
+            '交易性金融资产': assets * rng.uniform(0.0, 0.05, n),
+            '应收票据': cur_assets * rng.uniform(0.0, 0.05, n),
+            '应收账款': cur_assets * rng.uniform(0.05, 0.3, n),
+            '其他应收款': cur_assets * rng.uniform(0.0, 0.05, n),
+            '应收关联公司款': np.zeros(n),
+            '应收利息': cur_assets * rng.uniform(0.0, 0.01, n),
+            '应收股利': np.zeros(n),
+            '长期借款': (liab - cur_liab) * rng.uniform(0.3, 0.8, n),
+            '应付债券': (liab - cur_liab) * rng.uniform(0.0, 0.2, n),
+            '长期应付款': (liab - cur_liab) * rng.uniform(0.0, 0.1, n),
+            '总股本': shares,
+            '自由流通股(股)': px['free_shares'][t],
+            '每股净资产': equity / shares,
+            'profit_q': profit_q, 'revenue_q': revenue_q, 'equity': equity,
+        })
+        # 未上市 / 随机缺失
+        listed = info['list_idx'].to_numpy() <= t
+        keep = listed & (rng.random(n) > 0.03)
+        df = df.loc[keep].reset_index(drop=True)
+        # 少量空值
+        for col in ['应收关联公司款', '应收股利', '工程物资']:
+            df.loc[rng.random(len(df)) < 0.01, col] = np.nan
+        out[q] = df
+    return out
+
+
+# ---------- 写文件 ----------
+def _write_csv(df: pd.DataFrame, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False)
+
+
+def _write_lists(out, rng, info, days):
+    stock_list = pd.DataFrame({
+        '股票代码': info['code'], 'TS代码': info['ts_code'], '股票名称': info['name'],
+        '地域': info['area'], '所属行业': info['industry'], '上市日期': info['list_date'],
+        '实控人企业性质': info['nature'],
+    })
+    _write_csv(stock_list, out / "股票列表.csv")
+    _write_csv(pd.DataFrame({'symbol_num': [c for c, _ in INDEXES], 'name': [n for _, n in INDEXES]}),
+               out / "指数列表.csv")
+    _write_csv(pd.DataFrame({'symbol': ['000005', '600001'], 'name': ['退市模拟A', '退市模拟B']}),
+               out / "退市股票列表.csv")
+
+    # 各月份股票名称（部分股票一段时间带ST）
+    months = sorted(set(days.strftime('%Y%m')))
+    names = pd.DataFrame({'code': info['ts_code']})
+    st_start = np.where(rng.random(len(info)) < 0.05, rng.integers(0, len(months), len(info)), len(months))
+    cols = {}
+    for i, m in enumerate(months):
+        is_st = (st_start <= i) & (i < st_start + 12)
+        cols[m] = np.where(is_st, '*ST' + info['name'], info['name'])
+    names = pd.concat([names, pd.DataFrame(cols)], axis=1)
+    _write_csv(names, out / "name.csv")
+
+
+def _stock_frame(days, j, arrays: dict, valid):
+    mask = valid[:, j]
+    return pd.DataFrame({k: v[mask, j] for k, v in arrays.items()}, index=days[mask])
+
+
+def _write_daily(out, info, days, px):
+    valid = px['valid']
+    for j, row in info.iterrows():
+        code, ts_code = row['code'], row['ts_code']
+        d = _stock_frame(days, j, {
+            '开盘': px['raw_open'], '收盘': px['raw_close'], '最高': px['raw_high'], '最低': px['raw_low'],
+            '成交量': px['volume'] / 100, '成交额': px['amount'], '换手率': px['turnover'],
+            '涨跌幅': px['ret'] * 100,
+        }, valid)
+        if d.empty:
+            continue
+        prev = d['收盘'] / (1 + d['涨跌幅'] / 100)
+        d['涨跌额'] = d['收盘'] - prev
+        d['振幅'] = (d['最高'] - d['最低']) / prev * 100
+        d.insert(0, '股票代码', code)
+        d.insert(0, '日期', d.index.strftime('%Y-%m-%d'))
+        _write_csv(d[MONTHLY_COLS].round(4), out / f"daily/{code}_daily.csv")
+
+        fac = pd.DataFrame({'股票代码': ts_code, '交易日期': days.strftime('%Y%m%d'),
+                            '复权因子': px['qfq_factor'][:, j].round(6)})
+        _write_csv(fac[valid[:, j]], out / f"复权因子_前复权/{ts_code}.csv")
+
+
+def _to_monthly(d: pd.DataFrame) -> pd.DataFrame:
+    """日线 -> 月线（与 build_data.build_monthly 规则一致）"""
+    from data_api.build_data import _recompute_monthly_derived_one_stock
+
+    ym = d.index.to_period('M')
+    m = d.groupby(ym).agg({'开盘': 'first', '收盘': 'last', '最高': 'max', '最低': 'min',
+                           '成交量': 'sum', '成交额': 'sum', '换手率': 'sum'})
+    m['日期'] = d.index.to_series().groupby(ym).last().dt.strftime('%Y-%m-%d').to_numpy()
+    m = _recompute_monthly_derived_one_stock(m.reset_index(drop=True))
+    return m
+
+
+def _write_monthly(out, info, days, px):
+    valid = px['valid']
+    for j, row in info.iterrows():
+        code = row['code']
+        base = _stock_frame(days, j, {
+            'o': px['raw_open'], 'c': px['raw_close'], 'h': px['raw_high'], 'l': px['raw_low'],
+            'f': px['qfq_factor'], '成交量': px['volume'] / 100, '成交额': px['amount'], '换手率': px['turnover'],
+        }, valid)
+        if base.empty:
+            continue
+        hfq_base = base['f'].iloc[0]
+        for kind, adj in [('monthly', 1.0), ('monthly_qfq', base['f']), ('monthly_hfq', base['f'] / hfq_base)]:
+            d = pd.DataFrame({'开盘': base['o'] * adj, '收盘': base['c'] * adj,
+                              '最高': base['h'] * adj, '最低': base['l'] * adj,
+                              '成交量': base['成交量'], '成交额': base['成交额'], '换手率': base['换手率']},
+                             index=base.index)
+            m = _to_monthly(d)
+            m['股票代码'] = code
+            suffix = '' if kind == 'monthly' else kind[len('monthly'):]
+            _write_csv(m[MONTHLY_COLS].round(4), out / f"{kind}/{code}_monthly{suffix}.csv")
+
+    # 月初开盘涨跌停记录（基于不复权月线）
+    from data_api.limit_up_down import build_month_open_limit_df
+    parts = []
+    for code in info['code']:
+        fp = out / f"monthly/{code}_monthly.csv"
+        if fp.exists():
+            parts.append(pd.read_csv(fp, dtype={'股票代码': str, '日期': str}))
+    monthly = pd.concat(parts, ignore_index=True)
+    monthly['date'] = monthly['日期'].str.replace('-', '').str.slice(0, 6)
+    monthly = monthly.rename(columns={'股票代码': 'code', '开盘': 'open', '收盘': 'close'})
+    build_month_open_limit_df(monthly.set_index(['date', 'code'])[['open', 'close']],
+                              save_path=str(out / "limit.csv"))
+
+
+def _report_table(fin):
+    """
+    各股票历次财报的TTM口径数据
+    :return: dict(code -> DataFrame(col=['ann', 'ttm_profit', 'ttm_rev', 'equity', 'annual']) 按公告日排序)
+    """
+    parts = [df[['code', 'ann', 'profit_q', 'revenue_q', 'equity']].assign(q=q) for q, df in fin.items()]
+    rep = pd.concat(parts, ignore_index=True).sort_values(['code', 'q'])
+    g = rep.groupby('code')
+    rep['ttm_profit'] = g['profit_q'].transform(lambda s: s.rolling(4, min_periods=4).sum())
+    rep['ttm_rev'] = g['revenue_q'].transform(lambda s: s.rolling(4, min_periods=4).sum())
+    rep['annual'] = rep['ttm_profit'].where(rep['q'].str.endswith('1231'))
+    rep['annual'] = rep.groupby('code')['annual'].ffill()
+    rep = rep.sort_values(['code', 'ann'])
+    return {code: df for code, df in rep.groupby('code')}
+
+
+def _latest_report(rep, day_str):
+    """每个交易日可见的最新一期财报（按公告日）-> (TTM净利润, TTM营收, 净资产, 年报净利润)"""
+    n = len(day_str)
+    if rep is None or rep.empty:
+        return (np.full(n, np.nan),) * 4
+    idx = np.searchsorted(rep['ann'].to_numpy(), day_str, side='right') - 1
+    ok = idx >= 0
+    res = []
+    for col in ['ttm_profit', 'ttm_rev', 'equity', 'annual']:
+        v = np.full(n, np.nan)
+        v[ok] = rep[col].to_numpy()[idx[ok]]
+        res.append(v)
+    return tuple(res)
+
+
+def _write_daily_index(out, rng, info, days, px, fin, full_market):
+    valid = px['valid']
+    day_str = np.asarray(days.strftime('%Y%m%d'))
+    reports = _report_table(fin)
+    merged = []
+    for j, row in info.iterrows():
+        code, ts_code = row['code'], row['ts_code']
+        mask = valid[:, j]
+        if not mask.any():
+            continue
+        ttm_profit, ttm_rev, equity, annual = _latest_report(reports.get(code), day_str)
+        close = px['raw_close'][:, j]
+        total_mv = close * px['shares'][:, j]
+        float_mv = close * px['float_shares'][:, j]
+        ret = px['ret'][:, j]
+        dy = rng.uniform(0, 3)
+        d = pd.DataFrame({
+            '股票代码': ts_code, '交易日期': day_str,
+            '开盘价': px['raw_open'][:, j], '最高价': px['raw_high'][:, j],
+            '最低价': px['raw_low'][:, j], '收盘价': close,
+            '昨收价': close / (1 + ret),
+            '涨跌额': close - close / (1 + ret), '涨跌幅': ret * 100,
+            '成交量(手)': px['volume'][:, j] / 100, '成交额(千元)': px['amount'][:, j] / 1000,
+            '换手率': px['turnover'][:, j],
+            '换手率(自由流通股)': px['volume'][:, j] / px['free_shares'][:, j] * 100,
+            '量比': np.exp(rng.normal(0, 0.3, len(days))),
+            '市盈率': np.where(annual > 0, total_mv / annual, np.nan),
+            '市盈率TTM': np.where(ttm_profit > 0, total_mv / ttm_profit, np.nan),
+            '市净率': np.where(equity > 0, total_mv / equity, np.nan),
+            '市销率': np.where(ttm_rev > 0, total_mv / ttm_rev, np.nan),
+            '市销率TTM': np.where(ttm_rev > 0, total_mv / ttm_rev, np.nan),
+            '股息率': dy, '股息率TTM': dy,
+            '总股本(万股)': px['shares'][:, j] / 1e4,
+            '流通股本(万股)': px['float_shares'][:, j] / 1e4,
+            '自由流通股本(万股)': px['free_shares'][:, j] / 1e4,
+            '总市值(万元)': total_mv / 1e4, '流通市值(万元)': float_mv / 1e4,
+        })[mask]
+        d[DAILY_INDEX_COLS] = d[DAILY_INDEX_COLS].round(4)
+        _write_csv(d, out / f"每日指标/{ts_code}.csv")
+
+        # 合并文件（与 pv_data.update_daily_index 输出一致）
+        if full_market or not (code.startswith('68') or code.startswith('3') or code.startswith('9')):
+            d = d.rename(columns={'交易日期': 'date', '股票代码': 'code'})
+            d['code'] = code
+            merged.append(d[['date', 'code'] + DAILY_INDEX_COLS])
+    _write_csv(pd.concat(merged, ignore_index=True), out / "每日指标.csv")
+
+
+def _write_financials(out, info, fin):
+    ts_map = info.set_index('code')['ts_code']
+    for q, df in fin.items():
+        v1 = df.drop(columns=['ann', 'profit_q', 'revenue_q', 'equity', 'code'])
+        v1.insert(0, '财报公告日期', df['ann'].str.slice(2, 8).astype(int))
+        v1.insert(0, '股票简称', '模拟' + df['code'].str.slice(2, 6))
+        v1.insert(0, '股票代码', df['code'].astype(int))
+        _write_csv(v1, out / f"历史详细数据_CSV/全部上市公司财务信息_{q}.csv")
+
+        # v2：财务指标
+        roe = df['归属于母公司所有者的净利润'] / df['equity'] * 100
+        v2 = pd.DataFrame({
+            '股票代码': df['code'].map(ts_map),
+            '公告日期': df['ann'].astype(int),
+            '报告期': int(q),
+            '财务指标数据_加权平均净资产收益率': roe.round(4),
+            '财务指标数据_基本每股收益': (df['归属于母公司所有者的净利润'] / df['总股本']).round(4),
+            '财务指标数据_每股净资产': df['每股净资产'].round(4),
+        })
+        v2.loc[v2.sample(frac=0.02, random_state=int(q) % 9973).index, '财务指标数据_加权平均净资产收益率'] = np.nan
+        _write_csv(v2, out / f"财务数据/转换结果/{q}.csv")
+
+
+def _write_index_kline(out, rng, days, px):
+    for code, _ in INDEXES:
+        level = 3000 * np.cumprod(1 + px['mkt'] * rng.uniform(0.9, 1.1) + rng.normal(0, 0.002, len(days)))
+        d = pd.DataFrame({'close': level}, index=days)
+        ym = days.to_period('M')
+        m = pd.DataFrame({
+            '日期': d.index.to_series().groupby(ym).last().dt.strftime('%Y-%m-%d').to_numpy(),
+            '代码': code,
+            '开盘': d['close'].shift(1).bfill().groupby(ym).first().to_numpy(),
+            '收盘': d['close'].groupby(ym).last().to_numpy(),
+            '最高': d['close'].groupby(ym).max().to_numpy(),
+            '最低': d['close'].groupby(ym).min().to_numpy(),
+        })
+        _write_csv(m.round(2), out / f"指数_月_kline/{code}_月.csv")
+
+
+def _write_nasdaq(out, rng, start_year, n_years):
+    days = pd.bdate_range(f"{start_year}-01-01", f"{start_year + n_years - 1}-12-31")
+    close = 5000 * np.cumprod(1 + rng.normal(0.0005, 0.013, len(days)))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.003, len(days)))
+    d = pd.DataFrame({'date': days.strftime('%Y-%m-%d'), 'open': open_, 'close': close})
+    _write_csv(d.round(2), out / "ndq_d.csv")
+
+    ym = days.to_period('M')
+    m = pd.DataFrame({
+        'date': d.groupby(ym)['date'].last().to_numpy(),
+        'open': d.groupby(ym)['open'].first().to_numpy(),
+        'close': d.groupby(ym)['close'].last().to_numpy(),
+    })
+    _write_csv(m.round(2), out / "ndq_m.csv")
+
+
+if __name__ == '__main__':
+    build_synthetic_database(os.environ.get("ASHARE_DATA_PATH", "./synthetic_db"),
+                             n_stocks=300, start_year=2012, n_years=5, seed=0)